@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Tip, ContactMessage
+from .models import Tip, ContactMessage, TrainingJob, CropPrice, RainfallReading, QueryEvent, QueryRollup, Scheme, SchemeSnapshot
 
 @admin.register(Tip)
 class TipAdmin(admin.ModelAdmin):
@@ -13,3 +13,51 @@ class ContactMessageAdmin(admin.ModelAdmin):
     list_display = ("name", "email", "created_at")
     search_fields = ("name", "email", "message")
     readonly_fields = ("created_at",)
+
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "progress", "accuracy", "version", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "started_at", "finished_at")
+
+
+@admin.register(CropPrice)
+class CropPriceAdmin(admin.ModelAdmin):
+    list_display = ("date", "commodity", "variety", "market", "price", "state")
+    list_filter = ("state", "date")
+    search_fields = ("commodity", "market", "variety")
+
+
+@admin.register(RainfallReading)
+class RainfallReadingAdmin(admin.ModelAdmin):
+    list_display = ("date", "region", "rainfall_mm", "period")
+    list_filter = ("date",)
+    search_fields = ("region",)
+
+
+@admin.register(QueryEvent)
+class QueryEventAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "kind", "region", "crop", "detail")
+    list_filter = ("kind",)
+    search_fields = ("region", "crop", "detail")
+
+
+@admin.register(QueryRollup)
+class QueryRollupAdmin(admin.ModelAdmin):
+    list_display = ("day", "kind", "dimension", "key", "count")
+    list_filter = ("kind", "dimension", "day")
+    search_fields = ("key",)
+
+
+@admin.register(Scheme)
+class SchemeAdmin(admin.ModelAdmin):
+    list_display = ("position", "title", "department", "first_seen")
+    search_fields = ("title", "department")
+
+
+@admin.register(SchemeSnapshot)
+class SchemeSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("checked_at", "ok", "items", "changed", "failures")
+    list_filter = ("ok", "changed")
+    readonly_fields = ("checked_at",)
@@ -0,0 +1,359 @@
+"""
+Aggregation engine for the market and crop datasets.
+
+Each dataset is loaded once into a pandas DataFrame whose numeric column is parsed with
+vectorized code (``parse_number_series``) and cached until its source changes. Sources
+are tried in the order the market page uses: for prices the partitioned price store
+(``manage.py ingest_prices``) when its manifest lists rows, then the CropPrice table,
+then the local CSV via the shared market-data cache; for rainfall the RainfallReading
+table, then its CSV. Group-by, top-N and time-window rollups then run on that frame, so
+the dashboard charts, the insights CSV export and the JSON API all report the same
+numbers from one code path.
+
+Checking a table for changes costs a COUNT/MAX query, so the result is reused while the
+page-cache generation of the dataset's group ("prices", "rainfall") is unchanged, for at
+most ANALYTICS_SOURCE_TTL seconds. Loads, ingests and model saves bump that generation,
+so they are seen at once; the TTL bounds how long a change made by another process
+with its own cache can go unnoticed.
+
+Time windows are measured back from the newest date in the data. With no window, a
+rollup covers the latest snapshot only (the same rows the market pages show). From the
+price store only the last ANALYTICS_STORE_MONTHS months up to its newest date (per the
+manifest) are read, so the frame does not grow with the store's whole history.
+
+Optional settings:
+    ANALYTICS_SOURCE_TTL    seconds a table's change check is reused (default 60)
+    ANALYTICS_STORE_MONTHS  months of the price store loaded, 0 for all (default 12)
+"""
+from __future__ import annotations
+
+import datetime
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from django.conf import settings
+
+from core import page_cache
+from core.scrapers.fetch import INTERACTIVE_DEADLINE
+from core.scrapers.parsing import parse_number_series
+
+AGGREGATIONS = ("mean", "max", "min", "sum", "count", "median")
+FREQUENCIES = {"day": "D", "week": "W", "month": "MS"}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    value: Optional[str]  # numeric column, None for count-only datasets
+    groups: Tuple[str, ...]
+    load: Callable[[], Tuple[Any, Callable[[], pd.DataFrame]]]  # -> (cache signature, build frame)
+    positive_only: bool = False  # drop zero/negative values (e.g. "price not quoted")
+
+
+@dataclass(frozen=True)
+class Rollup:
+    dataset: str
+    group_by: str
+    agg: str
+    labels: List[str]
+    values: List[float]
+
+    def as_chart_data(self) -> Optional[Dict[str, list]]:
+        return {"labels": self.labels, "values": self.values} if self.labels else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "dataset": self.dataset,
+            "group_by": self.group_by,
+            "agg": self.agg,
+            "rows": [{"label": label, "value": value} for label, value in zip(self.labels, self.values)],
+        }
+
+
+class AggregationError(ValueError):
+    pass
+
+
+_db_signatures: Dict[str, Tuple[str, float, Optional[tuple]]] = {}  # model label -> (generation, checked, sig)
+
+
+def _db_signature(model, group: str) -> Optional[tuple]:
+    from django.db.models import Count, Max
+
+    generation = page_cache.generation(group)
+    now = time.monotonic()
+    ttl = float(getattr(settings, "ANALYTICS_SOURCE_TTL", 60))
+    known = _db_signatures.get(model._meta.label)
+    if known is not None and known[0] == generation and now - known[1] < ttl:
+        return known[2]
+    try:
+        found = model.objects.aggregate(n=Count("id"), last=Max("id"), changed=Max("updated_at"))
+    except Exception:
+        # Table missing (migrations not applied) or DB unavailable
+        return None
+    sig = None if not found["n"] else ("db", found["n"], found["last"], found["changed"])
+    _db_signatures[model._meta.label] = (generation, now, sig)
+    return sig
+
+
+def _csv_signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return ("csv", path, st.st_mtime_ns, st.st_size)
+
+
+def _store_signature() -> Optional[tuple]:
+    from core.scrapers import ingest
+
+    path = ingest.store_dir() / ingest.MANIFEST_NAME
+    if not ingest.manifest().get("rows"):
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return ("store", str(path), st.st_mtime_ns, st.st_size)
+
+
+def _store_start() -> Optional[datetime.date]:
+    """First day of the oldest price-store month to load, or None to load every month."""
+    from core.scrapers import ingest
+
+    months = int(getattr(settings, "ANALYTICS_STORE_MONTHS", 12))
+    latest = ingest.latest_date()
+    if months <= 0 or latest is None:
+        return None
+    index = latest.year * 12 + latest.month - months  # the first month loaded, as months since year 0
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _load_prices():
+    from core.models import CropPrice
+    from core.scrapers import ingest, prices
+
+    sig = _store_signature()
+    if sig is not None:
+        def build() -> pd.DataFrame:
+            columns = ["date", "state", "market", "commodity", "variety", "price"]
+            # Only the partitions of the trailing months are opened
+            return ingest.read_prices(start=_store_start())[columns].reset_index(drop=True)
+        return sig, build
+
+    sig = _db_signature(CropPrice, "prices")
+    if sig is not None:
+        def build() -> pd.DataFrame:
+            df = pd.DataFrame.from_records(
+                CropPrice.objects.values_list("date", "state", "market", "commodity", "variety", "price"),
+                columns=["date", "state", "market", "commodity", "variety", "price"],
+            )
+            df["price"] = parse_number_series(df["price"])
+            return df
+        return sig, build
+
+    sig = _csv_signature(prices.PRICES_CSV_PATH)
+    if sig is not None:
+        def build() -> pd.DataFrame:
+            records = prices.market_cache.get(prices.PRICES_CSV_PATH, prices._parse_prices_csv, namespace="prices")
+            return _records_frame(records.rows(), "price", state=None)
+        return sig, build
+
+    # No table rows and no CSV: whatever get_crop_prices falls back to (sample data), uncached
+    return None, lambda: _records_frame(prices.get_crop_prices(region=None, deadline=INTERACTIVE_DEADLINE),
+                                        "price", state=None)
+
+
+def _load_rainfall():
+    from core.models import RainfallReading
+    from core.scrapers import rainfall
+
+    sig = _db_signature(RainfallReading, "rainfall")
+    if sig is not None:
+        def build() -> pd.DataFrame:
+            df = pd.DataFrame.from_records(
+                RainfallReading.objects.values_list("date", "region", "period", "source", "rainfall_mm"),
+                columns=["date", "region", "period", "source", "rainfall_mm"],
+            )
+            df["rainfall_mm"] = parse_number_series(df["rainfall_mm"])
+            return df
+        return sig, build
+
+    sig = _csv_signature(rainfall.RAINFALL_CSV_PATH)
+    if sig is not None:
+        def build() -> pd.DataFrame:
+            records = rainfall.market_cache.get(rainfall.RAINFALL_CSV_PATH, rainfall._parse_rainfall_csv,
+                                                namespace="rainfall")
+            return _records_frame(records.rows(), "rainfall_mm")
+        return sig, build
+
+    return None, lambda: _records_frame(rainfall.get_rainfall(region=None, deadline=INTERACTIVE_DEADLINE),
+                                        "rainfall_mm")
+
+
+def _crop_dataset_csv() -> str:
+    return os.path.join(settings.BASE_DIR, "core", "ml", "data", "crop_dataset.csv")
+
+
+def _load_crops():
+    from core.ml.ingest import dataset_signature, read_dataset
+
+    path = _crop_dataset_csv()
+
+    def build() -> pd.DataFrame:
+        try:
+            df = read_dataset(path, columns=["crop"]).astype(str)
+        except Exception:
+            df = pd.DataFrame({"crop": ["wheat", "rice", "maize", "wheat", "rice"]})
+        df["crop"] = df["crop"].str.strip().str.title()
+        df["date"] = None
+        return df
+    # The base CSV and its append segments (see core.ml.ingest)
+    return dataset_signature(path), build
+
+
+def _records_frame(rows: List[Dict[str, str]], value: str, **extra) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows) if rows else pd.DataFrame(columns=[value])
+    for column, default in extra.items():
+        df[column] = default
+    df["date"] = None  # CSV and scraped rows carry no observation date
+    df[value] = parse_number_series(df[value])
+    return df
+
+
+DATASETS: Dict[str, Dataset] = {
+    "prices": Dataset("prices", "price", ("commodity", "market", "variety", "state"), _load_prices, positive_only=True),
+    "rainfall": Dataset("rainfall", "rainfall_mm", ("region", "period", "source"), _load_rainfall),
+    "crops": Dataset("crops", None, ("crop",), _load_crops),
+}
+
+
+class FrameCache:
+    """Parsed frame per dataset, rebuilt only when the source signature changes."""
+
+    def __init__(self) -> None:
+        self._frames: Dict[str, Tuple[Any, pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, dataset: Dataset) -> pd.DataFrame:
+        sig, build = dataset.load()
+        with self._lock:
+            cached = self._frames.get(dataset.name)
+            if sig is not None and cached is not None and cached[0] == sig:
+                self.hits += 1
+                return cached[1]
+        df = build()
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        with self._lock:
+            self.builds += 1
+            if sig is not None:
+                self._frames[dataset.name] = (sig, df)
+        return df
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+        _db_signatures.clear()
+
+
+frames = FrameCache()
+
+
+def _dataset(name: str) -> Dataset:
+    try:
+        return DATASETS[name]
+    except KeyError:
+        raise AggregationError(f"Unknown dataset {name!r}; expected one of {tuple(DATASETS)}") from None
+
+
+def _window(df: pd.DataFrame, days: Optional[int]) -> pd.DataFrame:
+    """Rows within `days` of the newest date, or the newest snapshot when days is None."""
+    dates = df["date"] if "date" in df.columns else None
+    if dates is None or not dates.notna().any():
+        return df  # undated source: the whole file is one snapshot
+    latest = dates.max()
+    if days is None:
+        return df[dates == latest]
+    return df[dates > latest - pd.Timedelta(days=days)]
+
+
+def _values(df: pd.DataFrame, dataset: Dataset) -> pd.DataFrame:
+    if dataset.value is None:
+        return df
+    df = df[df[dataset.value].notna()]
+    if dataset.positive_only:
+        df = df[df[dataset.value] > 0]
+    return df
+
+
+def _check_limits(top: Optional[int] = None, days: Optional[int] = None) -> None:
+    if top is not None and top < 1:
+        raise AggregationError(f"top must be a positive integer, got {top}")
+    if days is not None and days < 1:
+        raise AggregationError(f"days must be a positive integer, got {days}")
+
+
+def _check(dataset: Dataset, group_by: Optional[str], agg: str) -> None:
+    if group_by is not None and group_by not in dataset.groups:
+        raise AggregationError(f"{dataset.name} cannot be grouped by {group_by!r}; expected one of {dataset.groups}")
+    if agg not in AGGREGATIONS:
+        raise AggregationError(f"Unsupported aggregation {agg!r}; expected one of {AGGREGATIONS}")
+    if dataset.value is None and agg != "count":
+        raise AggregationError(f"{dataset.name} only supports count")
+
+
+def rollup(
+    dataset: str,
+    group_by: str,
+    agg: str = "mean",
+    top: Optional[int] = None,
+    days: Optional[int] = None,
+    ascending: bool = False,
+) -> Rollup:
+    """
+    Aggregate the dataset's value per group_by, sorted by value (descending unless
+    ascending) and cut to the top N. days selects a trailing time window.
+    """
+    ds = _dataset(dataset)
+    _check(ds, group_by, agg)
+    _check_limits(top, days)
+    df = _values(_window(frames.get(ds), days), ds)
+    keys = df[group_by].fillna("").astype(str).str.strip().replace("", "Unknown")
+    if agg == "count":
+        result = keys.value_counts()
+    else:
+        result = df[ds.value].groupby(keys, sort=False).agg(agg)
+    # Stable tie-break on label keeps output deterministic across sources
+    result = result.sort_index(kind="stable").sort_values(ascending=ascending, kind="stable")
+    if top is not None:
+        result = result.head(top)
+    values = [int(v) if agg == "count" else float(v) for v in result.tolist()]
+    return Rollup(ds.name, group_by, agg, [str(k) for k in result.index], values)
+
+
+def timeline(dataset: str, freq: str = "day", agg: str = "mean", days: Optional[int] = None) -> Rollup:
+    """Aggregate the dataset's value per day/week/month over dated rows (all history unless days)."""
+    ds = _dataset(dataset)
+    _check(ds, None, agg)
+    _check_limits(days=days)
+    if freq not in FREQUENCIES:
+        raise AggregationError(f"Unsupported frequency {freq!r}; expected one of {tuple(FREQUENCIES)}")
+    df = frames.get(ds)
+    df = df[df["date"].notna()] if "date" in df.columns else df.iloc[0:0]
+    if days is not None and len(df):
+        df = df[df["date"] > df["date"].max() - pd.Timedelta(days=days)]
+    df = _values(df, ds)
+    grouper = pd.Grouper(key="date", freq=FREQUENCIES[freq])
+    if agg == "count":
+        result = df.groupby(grouper).size()
+    else:
+        result = df.groupby(grouper)[ds.value].agg(agg).dropna()
+    values = [int(v) if agg == "count" else float(v) for v in result.tolist()]
+    return Rollup(ds.name, "date", agg, [ts.date().isoformat() for ts in result.index], values)
@@ -0,0 +1,68 @@
+"""
+Content-addressed cache for rendered chart images.
+
+A chart is identified by the sha256 of its spec name, spec version and input data.
+The image is rendered once, stored as <key>.<fmt> under CHART_CACHE_DIR, and served from
+/charts/<key>.<fmt> with a long-lived Cache-Control, ETag and Last-Modified. Because the
+URL changes whenever the data does, browsers and proxies can cache it forever, and a
+repeat dashboard load with unchanged data does no matplotlib work at all.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+
+CHART_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+CHART_FORMATS = ("png", "svg")
+
+
+def cache_dir() -> pathlib.Path:
+    return pathlib.Path(getattr(settings, "CHART_CACHE_DIR", pathlib.Path(settings.MEDIA_ROOT) / "charts"))
+
+
+def chart_key(spec: str, data: Any) -> str:
+    payload = json.dumps({"spec": spec, "data": data}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chart_path(key: str, fmt: str = "png") -> Optional[pathlib.Path]:
+    if not CHART_KEY_RE.match(key) or fmt not in CHART_FORMATS:
+        return None
+    return cache_dir() / f"{key}.{fmt}"
+
+
+def image_key(spec: str, data: Any, fmt: str = "png") -> str:
+    return chart_key(f"{spec}:{fmt}", data)
+
+
+def is_stored(key: str, fmt: str = "png") -> bool:
+    path = chart_path(key, fmt)
+    return path is not None and path.exists()
+
+
+def store(key: str, image: bytes, fmt: str = "png") -> pathlib.Path:
+    """Atomically write a rendered image under its key."""
+    path = chart_path(key, fmt)
+    if path is None:
+        raise ValueError(f"Invalid chart key/format: {key!r}.{fmt}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{key}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(image)
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_or_render(spec: str, data: Any, render: Callable[[], bytes], fmt: str = "png") -> str:
+    """Return the cache key for (spec, data), calling render() only if no image is stored yet."""
+    key = image_key(spec, data, fmt)
+    if not is_stored(key, fmt):
+        store(key, render(), fmt)
+    return key
+
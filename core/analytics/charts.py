@@ -1,80 +1,99 @@
+# Analytics utilities for creating charts for Phase 4
 from __future__ import annotations
 
-import base64
 import io
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
-
-import matplotlib
-matplotlib.use("Agg")  # headless backend
-import matplotlib.pyplot as plt  # noqa: E402
-import pandas as pd  # noqa: E402
-
-
-@dataclass
-class ChartImages:
-    bar_most_recommended_b64: str
-    line_price_trends_b64: str
-    pie_region_queries_b64: str
-
-
-def _fig_to_base64(fig) -> str:
-    buf = io.BytesIO()
-    fig.tight_layout()
-    fig.savefig(buf, format="png", dpi=160)
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode("ascii")
-
-
-def build_from_dataset(
-    dataset_csv_path: str,
-    region_query_counts: Dict[str, int] | None = None,
-) -> ChartImages:
-    """
-    Build charts using the training dataset for bar chart, and synthetic data for prices & regions if needed.
-    - dataset_csv_path should have a 'crop' column (e.g., core/ml/data/crop_dataset.csv)
-    - region_query_counts: optional dict like {"Delhi": 10, "Mumbai": 5}
-    """
-    # Load dataset for crop counts
+import time
+from typing import Callable, Dict, List, Tuple
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# matplotlib and pandas are imported on first draw, not with this module: the URLconf
+# imports it through the chart registry, and most processes never render anything.
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")  # headless backend
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_figure(draw: Callable, data, figsize: Tuple[float, float], fmt: str = "png", dpi: int = 160) -> bytes:
+    """Create a figure, let draw(fig, ax, data) fill it, and return the encoded image."""
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported chart format {fmt!r}")
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=figsize)
     try:
-        df = pd.read_csv(dataset_csv_path)
-    except Exception:
-        df = pd.DataFrame({"crop": ["wheat", "rice", "maize", "wheat", "rice"]})
-
-    crop_counts = df["crop"].astype(str).str.strip().str.title().value_counts().sort_values(ascending=False)
-
-    # Bar: Most recommended crops
-    fig1, ax1 = plt.subplots(figsize=(6, 3.5))
-    crop_counts.plot(kind="bar", color="#16a34a", ax=ax1)
-    ax1.set_title("Most Recommended Crops")
-    ax1.set_xlabel("Crop")
-    ax1.set_ylabel("Count")
-    bar_b64 = _fig_to_base64(fig1)
-
-    # Line: Price trends (synthetic demo series)
-    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=12, freq="MS")
-    series = pd.Series([2000, 2050, 1980, 2100, 2150, 2200, 2180, 2250, 2300, 2280, 2350, 2400], index=dates)
-    fig2, ax2 = plt.subplots(figsize=(6, 3.5))
-    ax2.plot(series.index, series.values, marker="o", color="#2563eb")
-    ax2.set_title("Price Trend (Demo)")
-    ax2.set_xlabel("Month")
-    ax2.set_ylabel("Price (₹/qtl)")
-    ax2.grid(alpha=0.3)
-    for x, y in zip(series.index, series.values):
-        ax2.annotate(f"{int(y)}", (x, y), textcoords="offset points", xytext=(0, 6), ha="center", fontsize=8)
-    fig2.autofmt_xdate()
-    line_b64 = _fig_to_base64(fig2)
-
-    # Pie: Region queries
-    rq = region_query_counts or {"Delhi": 12, "Mumbai": 7, "Bengaluru": 5, "Chennai": 4}
-    labels = list(rq.keys())
-    sizes = list(rq.values())
-    fig3, ax3 = plt.subplots(figsize=(5, 3.5))
-    ax3.pie(sizes, labels=labels, autopct="%1.0f%%", startangle=140)
-    ax3.set_title("Region Queries (Demo)")
-    pie_b64 = _fig_to_base64(fig3)
-
-    return ChartImages(bar_most_recommended_b64=bar_b64,
-                       line_price_trends_b64=line_b64,
-                       pie_region_queries_b64=pie_b64)
+        draw(fig, ax, data)
+        fig.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi)
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
+
+
+def render_timed(draw: Callable, data, figsize: Tuple[float, float], fmt: str = "png") -> Tuple[bytes, float]:
+    """render_figure plus its wall time in ms. Needs no Django setup, so it can run in a worker process."""
+    started = time.perf_counter()
+    image = render_figure(draw, data, figsize, fmt=fmt)
+    return image, (time.perf_counter() - started) * 1000.0
+
+
+def draw_crop_counts(fig, ax, crop_counts: Dict[str, int]) -> None:
+    """Bar: most recommended crops."""
+    import pandas as pd
+
+    pd.Series(crop_counts).plot(kind="bar", color="#16a34a", ax=ax)
+    ax.set_title("Most Recommended Crops")
+    ax.set_xlabel("Crop")
+    ax.set_ylabel("Count")
+
+
+def draw_price_trend(fig, ax, series: Dict[str, float]) -> None:
+    """Line: price series keyed by ISO date."""
+    import pandas as pd
+
+    index = pd.to_datetime(list(series.keys()))
+    values = list(series.values())
+    ax.plot(index, values, marker="o", color="#2563eb")
+    ax.set_title("Price Trend")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price (₹/qtl)")
+    ax.grid(alpha=0.3)
+    for x, y in zip(index, values):
+        ax.annotate(f"{int(y)}", (x, y), textcoords="offset points", xytext=(0, 6), ha="center", fontsize=8)
+    fig.autofmt_xdate()
+
+
+def draw_region_pie(fig, ax, region_query_counts: Dict[str, int]) -> None:
+    ax.pie(list(region_query_counts.values()), labels=list(region_query_counts.keys()), autopct="%1.0f%%", startangle=140)
+    ax.set_title("Region Queries")
+
+
+def draw_rainfall(fig, ax, data: Dict[str, List]) -> None:
+    """Region vs rainfall: connected scatter, as shown on the admin dashboard."""
+    labels, values = data["labels"], data["values"]
+    x = list(range(len(labels)))
+    # Scatter points
+    ax.scatter(x, values, color="#6FB3D1", s=60, edgecolors="#2563EB", linewidths=0.6)
+    # Connect the dots with a line
+    ax.plot(x, values, color="#2563EB", linewidth=1.2, alpha=0.7)
+    ax.set_ylabel("Rainfall (mm)")
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, rotation=20, ha="right", fontsize=9)
+    ax.grid(True, which="both", axis="both", linestyle="--", alpha=0.3)
+
+
+def draw_prices(fig, ax, data: Dict[str, List]) -> None:
+    """Commodity vs average price bar chart with value labels."""
+    bars = ax.bar(data["labels"], data["values"], color="#6FAF6F")
+    ax.set_ylabel("Avg Price (₹/quintal)")
+    ax.tick_params(axis="x", labelrotation=20, labelsize=9)
+    for label in ax.get_xticklabels():
+        label.set_ha("right")
+    # Add value labels on bars
+    for b in bars:
+        h = b.get_height()
+        ax.text(b.get_x() + b.get_width() / 2, h, f"{h:.0f}", ha="center", va="bottom", fontsize=8)
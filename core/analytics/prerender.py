@@ -0,0 +1,206 @@
+"""
+Off-request pre-rendering of the admin dashboard charts.
+
+matplotlib is CPU-bound and holds the GIL, so drawing inside a request stalls every
+other request on that worker. Instead, whenever an input changes (dataset upload,
+retraining, price/rainfall refresh) `schedule()` queues a pre-render: a dispatcher
+thread loads each dashboard chart's data, skips charts whose content-addressed image
+already exists, and draws the rest in a process pool. The result is recorded in a
+small manifest next to the images, which the dashboard view reads without drawing
+anything. Per-chart render times are logged and kept in the manifest. A chart whose
+loader has no data gets an ``"empty": true`` entry, so the dashboard can say so instead
+of waiting for an image that will never be drawn.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import reverse
+from django.utils import timezone
+
+from .chart_cache import cache_dir, chart_path, is_stored, store
+from .charts import render_timed
+from .registry import RenderPlan, charts
+
+logger = logging.getLogger(__name__)
+
+# (chart name, format, size) for every image the dashboard shows
+DASHBOARD_CHARTS: Tuple[Tuple[str, str, str], ...] = (
+    ("rainfall_by_region", "png", "md"),
+    ("avg_price_by_commodity", "png", "md"),
+)
+MANIFEST_NAME = "dashboard.json"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_dispatcher: Optional[ThreadPoolExecutor] = None
+_pending: Optional[Future] = None
+_lock = threading.Lock()
+
+
+def _workers() -> int:
+    return max(1, int(getattr(settings, "CHART_RENDER_WORKERS", min(2, os.cpu_count() or 1))))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: forking a threaded web worker is unsafe, and the render task needs no Django state
+            _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+    global _dispatcher
+    with _lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.shutdown(wait=True)
+    _reset_pool()
+
+
+atexit.register(shutdown)
+
+
+def manifest_path():
+    return cache_dir() / MANIFEST_NAME
+
+
+def read_manifest() -> Dict[str, dict]:
+    try:
+        with open(manifest_path(), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest: Dict[str, dict]) -> None:
+    path = manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{MANIFEST_NAME}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def ready_charts() -> Dict[str, dict]:
+    """
+    Settled manifest entries: charts whose image is on disk, each with a 'url', and charts
+    that had no data to draw ('empty'). Never draws.
+    """
+    ready = {}
+    for name, entry in read_manifest().items():
+        if entry.get("empty"):
+            ready[name] = entry
+            continue
+        path = chart_path(entry.get("key", ""), entry.get("fmt", "png"))
+        if path is not None and path.exists():
+            ready[name] = dict(entry, url=reverse("chart_image", args=[entry["key"], entry["fmt"]]))
+    return ready
+
+
+def submit(plan: RenderPlan) -> Future:
+    """Draw plan in the render pool; the future resolves to (image bytes, render ms)."""
+    try:
+        return _get_pool().submit(render_timed, plan.draw, plan.data, plan.figsize, plan.fmt)
+    except BrokenProcessPool:
+        # A worker died earlier (e.g. OOM); start a fresh pool once
+        _reset_pool()
+        return _get_pool().submit(render_timed, plan.draw, plan.data, plan.figsize, plan.fmt)
+
+
+def prerender(specs: Iterable[Tuple[str, str, str]] = DASHBOARD_CHARTS, reason: str = "") -> Dict[str, dict]:
+    """
+    Bring the stored images for specs up to date with their data and return the manifest,
+    each entry flagged with whether it was drawn by this run.
+
+    Runs in the caller's thread; only the drawing is sent to the process pool. Charts with
+    no data are recorded as empty, charts whose image already exists are reused.
+    """
+    started = time.perf_counter()
+    manifest = read_manifest()
+    futures = {}
+    drawn = set()
+    for name, fmt, size in specs:
+        try:
+            plan = charts.plan(name, fmt=fmt, size=size)
+        except Exception:
+            logger.exception("Loading data for chart %s failed", name)
+            continue
+        if plan is None:
+            if not (manifest.get(name) or {}).get("empty"):
+                manifest[name] = {"empty": True, "fmt": fmt, "size": size, "rendered_at": timezone.now().isoformat()}
+            continue
+        if is_stored(plan.key, fmt):
+            entry = manifest.get(name) or {}
+            if entry.get("key") != plan.key:
+                manifest[name] = {"key": plan.key, "fmt": fmt, "size": size, "render_ms": None,
+                                  "rendered_at": timezone.now().isoformat()}
+            continue
+        futures[name] = (plan, submit(plan))
+
+    for name, (plan, future) in futures.items():
+        try:
+            image, render_ms = future.result()
+        except BrokenProcessPool:
+            _reset_pool()
+            logger.error("Chart render pool died while drawing %s", name)
+            continue
+        except Exception:
+            logger.exception("Rendering chart %s failed", name)
+            continue
+        store(plan.key, image, plan.fmt)
+        drawn.add(name)
+        manifest[name] = {"key": plan.key, "fmt": plan.fmt, "size": plan.size, "render_ms": round(render_ms, 1),
+                          "rendered_at": timezone.now().isoformat()}
+        logger.info("Rendered chart %s (%s, %s) in %.1f ms", name, plan.fmt, plan.size, render_ms)
+
+    _write_manifest(manifest)
+    logger.info("Chart pre-render%s finished in %.1f ms (%d drawn)",
+                f" after {reason}" if reason else "", (time.perf_counter() - started) * 1000.0, len(drawn))
+    return {name: dict(entry, rendered=name in drawn) for name, entry in manifest.items()}
+
+
+def _run(reason: str) -> Dict[str, dict]:
+    try:
+        return prerender(reason=reason)
+    except Exception:
+        logger.exception("Chart pre-render after %s failed", reason or "request")
+        raise
+    finally:
+        close_old_connections()
+
+
+def schedule(reason: str = "") -> Future:
+    """
+    Queue a background pre-render and return immediately.
+
+    Triggers that arrive while a run is still waiting to start share that run, since it
+    will read the newest data anyway.
+    """
+    global _dispatcher, _pending
+    with _lock:
+        if _pending is not None and not _pending.running() and not _pending.done():
+            return _pending
+        if _dispatcher is None:
+            _dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-prerender")
+        _pending = _dispatcher.submit(_run, reason)
+        return _pending
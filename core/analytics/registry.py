@@ -0,0 +1,145 @@
+"""
+Registry of named, independently renderable charts.
+
+Each chart is a unit with a data loader and a draw function. Nothing is computed until
+a chart is asked for, either by the pre-render pool (core.analytics.prerender) or by
+the image endpoint ``/charts/<name>/?format=svg&size=lg``. Rendered images go through
+the content-addressed cache in chart_cache, so the same data, format and size are only
+drawn once.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import charts as chart_draw
+from .chart_cache import get_or_render, image_key
+
+
+FORMATS: Tuple[str, ...] = ("png", "svg")
+SIZES: Dict[str, float] = {"sm": 0.75, "md": 1.0, "lg": 1.5}
+
+
+@dataclass(frozen=True)
+class Chart:
+    name: str
+    title: str
+    figsize: Tuple[float, float]
+    load: Callable[[], Any]  # returns the chart's input data, or None when there is nothing to draw
+    draw: Callable[[Any, Any, Any], None]  # draw(fig, ax, data)
+    version: int = 1
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """Everything needed to draw one chart image, picklable for a worker process."""
+    name: str
+    fmt: str
+    size: str
+    key: str
+    figsize: Tuple[float, float]
+    draw: Callable[[Any, Any, Any], None]
+    data: Any
+
+
+class ChartRegistry:
+    def __init__(self) -> None:
+        self._charts: Dict[str, Chart] = {}
+
+    def register(self, chart: Chart) -> Chart:
+        self._charts[chart.name] = chart
+        return chart
+
+    def get(self, name: str) -> Chart:
+        return self._charts[name]
+
+    def names(self) -> List[str]:
+        return list(self._charts)
+
+    def _check(self, fmt: str, size: str) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported chart format {fmt!r}; expected one of {FORMATS}")
+        if size not in SIZES:
+            raise ValueError(f"Unsupported chart size {size!r}; expected one of {tuple(SIZES)}")
+
+    def _figsize(self, chart: Chart, size: str) -> Tuple[float, float]:
+        scale = SIZES[size]
+        return (chart.figsize[0] * scale, chart.figsize[1] * scale)
+
+    def _spec(self, chart: Chart, size: str) -> str:
+        return f"{chart.name}:v{chart.version}:{size}"
+
+    def render(self, name: str, fmt: str = "png", size: str = "md", data: Any = None) -> Optional[bytes]:
+        """Draw the chart now, bypassing the cache. None if its loader has no data."""
+        self._check(fmt, size)
+        chart = self.get(name)
+        data = chart.load() if data is None else data
+        if data is None:
+            return None
+        return chart_draw.render_figure(chart.draw, data, self._figsize(chart, size), fmt=fmt)
+
+    def plan(self, name: str, fmt: str = "png", size: str = "md") -> Optional[RenderPlan]:
+        """Load the chart's current data and work out its cache key, without drawing."""
+        self._check(fmt, size)
+        chart = self.get(name)
+        data = chart.load()
+        if data is None:
+            return None
+        return RenderPlan(name, fmt, size, image_key(self._spec(chart, size), data, fmt),
+                          self._figsize(chart, size), chart.draw, data)
+
+    def image_key(self, name: str, fmt: str = "png", size: str = "md") -> Optional[str]:
+        """Content-addressed cache key for the chart's current data, rendering on a miss."""
+        self._check(fmt, size)
+        chart = self.get(name)
+        data = chart.load()
+        if data is None:
+            return None
+        return get_or_render(self._spec(chart, size), data, lambda: self.render(name, fmt, size, data=data), fmt=fmt)
+
+
+def _load_crop_counts() -> Optional[Dict[str, int]]:
+    """What users were actually recommended (last 30 days), else the training set's crop mix."""
+    from core import telemetry
+    from . import aggregates
+
+    recommended = telemetry.top("crop", kind="suggestion", days=30, limit=10)
+    if recommended:
+        return recommended
+    result = aggregates.rollup("crops", "crop", agg="count")
+    return dict(zip(result.labels, result.values)) or None
+
+
+def _load_region_queries() -> Optional[Dict[str, int]]:
+    from core import telemetry
+
+    return telemetry.top("region", kind="market", days=30, limit=8) or None
+
+
+def _load_price_trend() -> Optional[Dict[str, float]]:
+    """Mean daily price over the last year of loaded data; needs at least two dated points."""
+    from . import aggregates
+
+    result = aggregates.timeline("prices", freq="day", agg="mean", days=365)
+    return dict(zip(result.labels, result.values)) if len(result.labels) >= 2 else None
+
+
+def _load_rainfall_by_region(top_n: int = 8) -> Optional[Dict[str, list]]:
+    from . import aggregates
+
+    # Max per region reflects the peak reading
+    return aggregates.rollup("rainfall", "region", agg="max", top=top_n).as_chart_data()
+
+
+def _load_avg_price_by_commodity(top_n: int = 8) -> Optional[Dict[str, list]]:
+    from . import aggregates
+
+    return aggregates.rollup("prices", "commodity", agg="mean", top=top_n).as_chart_data()
+
+
+charts = ChartRegistry()
+charts.register(Chart("crop_counts", "Most Recommended Crops", (6, 3.5), _load_crop_counts, chart_draw.draw_crop_counts))
+charts.register(Chart("price_trend", "Price Trend", (6, 3.5), _load_price_trend, chart_draw.draw_price_trend, version=2))
+charts.register(Chart("region_queries", "Region Queries", (5, 3.5), _load_region_queries, chart_draw.draw_region_pie, version=2))
+charts.register(Chart("rainfall_by_region", "Rainfall Information", (6, 3), _load_rainfall_by_region, chart_draw.draw_rainfall))
+charts.register(Chart("avg_price_by_commodity", "Commodity vs Price", (6, 3), _load_avg_price_by_commodity, chart_draw.draw_prices))
@@ -0,0 +1,230 @@
+"""
+Load test: WSGI vs ASGI concurrency for /market-data/ on slow upstream sources.
+
+Starts a local stub HTTP server whose price and rainfall tables answer after --delay
+seconds, points the market page's web fallbacks at it with no local data (a fresh
+install) and has --concurrency clients send --requests requests in total:
+
+    wsgi  Django's WSGIHandler behind a pool of --threads threads, the model of a gunicorn
+          gthread worker: every request holds a thread while the upstream is slow
+    asgi  Django's ASGIHandler on one event loop, the model of a uvicorn worker: waiting
+          requests hold nothing but a coroutine
+
+Both handlers are driven in-process, so no server package is needed and the numbers
+isolate Django's request handling. Runs against a throwaway test database.
+
+    python core/benchmark_asgi.py [--requests 200] [--concurrency 50] [--threads 8] [--delay 1.0]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if __package__ in (None, ""):
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+PAGES = {
+    "/prices": "<table><tr><th>Commodity</th><th>Variety</th><th>Price</th><th>Market</th></tr>"
+               + "".join(f"<tr><td>Wheat</td><td>Lokwan</td><td>{2000 + i}</td><td>Market {i}</td></tr>" for i in range(40))
+               + "</table>",
+    "/rainfall": "<table><tr><th>City</th><th>Rainfall</th><th>Period</th></tr>"
+                 + "".join(f"<tr><td>City {i}</td><td>{i}.5</td><td>Last 24h</td></tr>" for i in range(40))
+                 + "</table>",
+}
+
+
+class SlowUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = self.peak = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _UpstreamHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            body = PAGES.get(self.path, "").encode()
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _summary(latencies: List[float], wall: float, errors: int, peak: int) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "req_per_s": len(latencies) / wall,
+        "p50_ms": statistics.median(ordered) * 1000.0,
+        "p95_ms": ordered[int(len(ordered) * 0.95) - 1] * 1000.0,
+        "wall_s": wall,
+        "errors": errors,
+        "upstream_peak": peak,
+    }
+
+
+def run_wsgi(path: str, requests: int, concurrency: int, threads: int) -> Tuple[List[float], int]:
+    from wsgiref.util import setup_testing_defaults
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    app = WSGIHandler()
+    server_threads = threading.BoundedSemaphore(threads)
+    errors = 0
+
+    def call() -> float:
+        nonlocal errors
+        environ = {"PATH_INFO": path, "QUERY_STRING": "", "HTTP_HOST": "localhost"}
+        setup_testing_defaults(environ)
+        status = []
+        started = time.perf_counter()
+        with server_threads:  # a request waits for a free worker thread, then keeps it
+            b"".join(app(environ, lambda s, headers, exc_info=None: status.append(s)))
+        if not status[0].startswith("200"):
+            errors += 1
+        return time.perf_counter() - started
+
+    def client(n: int) -> List[float]:
+        return [call() for _ in range(n)]
+
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        return [t for part in clients.map(client, shares) for t in part], errors
+
+
+def run_asgi(path: str, requests: int, concurrency: int) -> Tuple[List[float], int]:
+    from django.core.handlers.asgi import ASGIHandler
+
+    app = ASGIHandler()
+    errors = 0
+
+    async def call() -> float:
+        nonlocal errors
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "headers": [(b"host", b"localhost")],
+            "client": ("127.0.0.1", 40000), "server": ("localhost", 80),
+        }
+        body_sent = False
+        statuses = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # client stays connected; Django cancels this wait
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        if statuses != [200]:
+            errors += 1
+        return time.perf_counter() - started
+
+    async def client(n: int) -> List[float]:
+        return [await call() for _ in range(n)]
+
+    async def main() -> List[float]:
+        shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        parts = await asyncio.gather(*(client(n) for n in shares))
+        return [t for part in parts for t in part]
+
+    return asyncio.run(main()), errors
+
+
+def run(requests: int = 200, concurrency: int = 50, threads: int = 8, delay: float = 1.0) -> Dict[str, Dict[str, float]]:
+    """Call after django.setup(), before the market scrapers are imported."""
+    from django.conf import settings
+
+    upstream = SlowUpstream(delay)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    store = tempfile.TemporaryDirectory()
+    settings.MARKET_PRICES_URL = f"{upstream.url}/prices"
+    settings.MARKET_RAINFALL_URL = f"{upstream.url}/rainfall"
+    # Each page fetches both tables from the one stub host; the politeness limit would cap both modes
+    settings.SCRAPER_HTTP_PER_HOST = 2 * concurrency
+    settings.PAGE_CACHE_TIMEOUT = 0
+    settings.PRICE_STORE_DIR = store.name
+
+    from core.scrapers import prices, rainfall
+
+    # A fresh install: no rows loaded and no local CSVs, so every request goes upstream
+    prices.PRICES_CSV_PATH = rainfall.RAINFALL_CSV_PATH = str(PROJECT_ROOT / "no-such-file.csv")
+
+    results = {}
+    try:
+        run_asgi("/market-data/", 2, 2)  # warm up imports, URLconf and the HTTP client
+        for mode in ("wsgi", "asgi"):
+            upstream.peak = 0
+            started = time.perf_counter()
+            if mode == "wsgi":
+                latencies, errors = run_wsgi("/market-data/", requests, concurrency, threads)
+            else:
+                latencies, errors = run_asgi("/market-data/", requests, concurrency)
+            results[mode] = _summary(latencies, time.perf_counter() - started, errors, upstream.peak)
+    finally:
+        upstream.shutdown()
+        upstream.server_close()
+        store.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads")
+    parser.add_argument("--delay", type=float, default=1.0, help="upstream response time in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "agrosmart.settings")
+    import django
+    from django.db import connection
+
+    django.setup()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        results = run(args.requests, args.concurrency, args.threads, args.delay)
+        print(f"{args.requests} requests, {args.concurrency} clients, upstream delay {args.delay * 1000:.0f} ms, "
+              f"WSGI threads {args.threads}")
+        print(f"{'mode':<6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'wall s':>9}{'errors':>8}{'upstream peak':>15}")
+        for mode, res in results.items():
+            print(f"{mode:<6}{res['req_per_s']:>9.1f}{res['p50_ms']:>10.1f}{res['p95_ms']:>10.1f}"
+                  f"{res['wall_s']:>9.2f}{res['errors']:>8}{res['upstream_peak']:>15}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,133 @@
+"""
+Benchmark tip search on a synthetic library (100k tips by default).
+
+Compares the old view's query (icontains on title/content, cut at 100 rows) with the FTS5
+search in core.tip_search, for a few queries, and compares deep pages reached by OFFSET
+with the same pages reached by keyset cursor. Runs against a throwaway in-memory test
+database; the project database is not touched.
+
+    python core/benchmark_search.py [--tips 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import pathlib
+import random
+import sys
+import time
+from typing import Callable, Dict
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if __package__ in (None, ""):
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Agronomy terms spread through a Zipf-distributed vocabulary, like real prose: a few
+# words are everywhere, most are rare
+TERMS = (
+    "soil water irrigation drip sprinkler mulch compost nitrogen potash phosphorus pest aphid "
+    "mite borer fungus blight rust weed harvest storage moisture seed sowing spacing yield "
+    "fertilizer manure organic pruning grafting canopy drainage salinity ph tillage rotation"
+).split()
+CROPS = ("Wheat", "Rice", "Maize", "Cotton", "Groundnut", "Cumin", "Castor", "Onion", "Potato", "Mango")
+SEASONS = ("Summer", "Winter", "Monsoon")
+CATEGORIES = ("soil", "watering", "pest", "harvest", "general")
+
+
+def _timed_ms(fn: Callable[[], object], repeat: int = 5) -> float:
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000.0
+
+
+def populate(n: int, seed: int = 7) -> None:
+    from core import tip_search
+    from core.models import Tip
+
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    for rank, term in enumerate(TERMS):
+        vocabulary[5 + rank * 40] = term
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+
+    def words(k: int) -> str:
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=k))
+
+    batch = []
+    for i in range(n):
+        batch.append(Tip(
+            title=words(5).capitalize(),
+            content=words(60),
+            category=rng.choice(CATEGORIES),
+            crop=", ".join(rng.sample(CROPS, k=rng.randint(0, 2))),
+            season=rng.choice(SEASONS + ("",)),
+        ))
+        if len(batch) == 5000:
+            Tip.objects.bulk_create(batch)
+            batch = []
+    Tip.objects.bulk_create(batch)
+    tip_search.rebuild_index()  # bulk_create skips the signal handlers
+
+
+def run(n: int = 100_000) -> Dict[str, Dict[str, float]]:
+    from django.db.models import Q
+
+    from core.models import Tip
+    from core.tip_search import search_tips
+
+    started = time.perf_counter()
+    populate(n)
+    load_s = time.perf_counter() - started
+
+    results: Dict[str, Dict[str, float]] = {"load+index": {"before_ms": float("nan"), "after_ms": load_s * 1000.0}}
+    queries = {"irrigation": {"q": "irrigation"}, "drip blight": {"q": "drip blight"},
+               "crop=cumin season=winter": {"crop": "cumin", "season": "winter"}}
+    for label, kwargs in queries.items():
+        def before():
+            qs = Tip.objects.all()
+            if kwargs.get("q"):
+                qs = qs.filter(Q(title__icontains=kwargs["q"]) | Q(content__icontains=kwargs["q"]))
+            if kwargs.get("crop"):
+                qs = qs.filter(crop__icontains=kwargs["crop"])
+            if kwargs.get("season"):
+                qs = qs.filter(season__icontains=kwargs["season"])
+            return list(qs[:100])
+
+        results[label] = {"before_ms": _timed_ms(before), "after_ms": _timed_ms(lambda: search_tips(**kwargs))}
+
+    # Newest-first listing. The old view sorted the whole table by created_at for its
+    # 100-row cap; deep pages by OFFSET are compared with the keyset cursor.
+    cursor = None
+    for _ in range(249):
+        cursor = search_tips(cursor=cursor).next_cursor
+    results["listing, first page"] = {
+        "before_ms": _timed_ms(lambda: list(Tip.objects.all()[:100])),
+        "after_ms": _timed_ms(lambda: search_tips()),
+    }
+    results["listing, page 250"] = {
+        "before_ms": _timed_ms(lambda: list(Tip.objects.all()[249 * 20:250 * 20])),
+        "after_ms": _timed_ms(lambda: search_tips(cursor=cursor)),
+    }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tips", type=int, default=100_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "agrosmart.settings")
+    import django
+    from django.db import connection
+
+    django.setup()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        print(f"{'query':<28}{'before (ms)':>14}{'after (ms)':>14}")
+        for name, res in run(args.tips).items():
+            print(f"{name:<28}{res['before_ms']:>14.2f}{res['after_ms']:>14.2f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
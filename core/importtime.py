@@ -0,0 +1,123 @@
+"""
+Startup profiling built on ``python -X importtime``.
+
+`profile_import()` starts a fresh interpreter, runs ``django.setup()`` and then imports
+the target module (``core.urls`` by default), so the numbers are what a new gunicorn
+worker or ``manage.py`` command pays for routing, on top of Django itself. The
+interpreter's import log is parsed into per-module self/cumulative times.
+
+The test suite fails when the target's cumulative import time exceeds
+STARTUP_IMPORT_BUDGET_MS or when it pulls in one of HEAVY_MODULES; those belong at
+their point of use (inside the view, command or worker that needs them).
+
+    python core/importtime.py [module] [--budget MS] [--top N]
+"""
+from __future__ import annotations
+
+import os
+import pathlib
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# Packages that must never load just because the URLconf was imported
+HEAVY_MODULES = (
+    "matplotlib", "pandas", "numpy", "sklearn", "joblib", "selenium", "webdriver_manager",
+    "requests", "bs4", "httpx", "lxml", "selectolax",
+)
+DEFAULT_BUDGET_MS = 250.0
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass(frozen=True)
+class ImportProfile:
+    module: str
+    records: Tuple[ImportRecord, ...]  # imports triggered by the target, in log order
+
+    @property
+    def total_ms(self) -> float:
+        """Cumulative import time of the target module itself."""
+        for record in reversed(self.records):
+            if record.name == self.module:
+                return record.cumulative_us / 1000.0
+        return 0.0
+
+    def loaded(self, package: str) -> bool:
+        return any(r.name == package or r.name.startswith(package + ".") for r in self.records)
+
+    def heavy(self, packages=HEAVY_MODULES) -> List[str]:
+        return [p for p in packages if self.loaded(p)]
+
+    def slowest(self, n: int = 15) -> List[ImportRecord]:
+        return sorted(self.records, key=lambda r: r.self_us, reverse=True)[:n]
+
+
+def parse_importtime(log: str) -> List[ImportRecord]:
+    """Parse "import time: self [us] | cumulative | imported package" lines."""
+    records = []
+    for line in log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        records.append(ImportRecord(stripped, int(fields[0]), int(fields[1]), (len(name) - len(stripped)) // 2))
+    return records
+
+
+def profile_import(module: str = "core.urls", settings_module: Optional[str] = None) -> ImportProfile:
+    """Cold-import module after django.setup() in a new interpreter and return its import profile."""
+    env = dict(os.environ)
+    env["DJANGO_SETTINGS_MODULE"] = settings_module or env.get("DJANGO_SETTINGS_MODULE", "agrosmart.settings")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    # The marker separates Django's own startup from the target import in the log
+    script = (
+        "import sys, django; django.setup(); "
+        "sys.stderr.write('import time: -- target --\\n'); sys.stderr.flush(); "
+        f"import {module}"
+    )
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=str(PROJECT_ROOT), env=env,
+                          capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    _setup, _marker, target = proc.stderr.partition("import time: -- target --\n")
+    return ImportProfile(module, tuple(parse_importtime(target)))
+
+
+def budget_ms() -> float:
+    from django.conf import settings
+
+    return float(getattr(settings, "STARTUP_IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile the cold import of a module after django.setup().")
+    parser.add_argument("module", nargs="?", default="core.urls")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_MS, help="fail above this many ms")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    profile = profile_import(args.module)
+    print(f"{'module':<60}{'self ms':>10}{'cumulative ms':>15}")
+    for record in profile.slowest(args.top):
+        print(f"{record.name:<60}{record.self_us / 1000:>10.1f}{record.cumulative_us / 1000:>15.1f}")
+    heavy = profile.heavy()
+    print(f"\n{args.module}: {profile.total_ms:.1f} ms (budget {args.budget:.0f} ms)")
+    if heavy:
+        print(f"heavy packages loaded: {', '.join(heavy)}")
+    sys.exit(1 if profile.total_ms > args.budget or heavy else 0)
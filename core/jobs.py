@@ -0,0 +1,140 @@
+"""
+Background model retraining.
+
+Retrain requests create a TrainingJob row and run on a single-thread executor inside
+the web process, so the HTTP request returns immediately. Progress, duration and the
+resulting accuracy are written back to the row, where any worker can read them.
+`python manage.py retrain_model` runs the same job synchronously (cron/worker use).
+
+A unique constraint allows one queued or running job at a time, so concurrent
+requests (in any worker) cannot both start one: the loser gets the existing job.
+
+A running job refreshes its heartbeat_at on every progress update and, during long
+stages such as fitting, every HEARTBEAT_INTERVAL. A job whose heartbeat is older than
+STALE_AFTER is taken to belong to a dead worker and marked failed ("Abandoned"). Every
+write by the run is conditional on the row still being active, so a run that was
+abandoned but turns out to be alive cannot bring its job back.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import TrainingJob
+
+logger = logging.getLogger(__name__)
+
+# A job with no heartbeat for this long is assumed to belong to a dead worker
+STALE_AFTER = datetime.timedelta(hours=1)
+HEARTBEAT_INTERVAL = datetime.timedelta(minutes=5)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+        return _executor
+
+
+ACTIVE = [TrainingJob.STATUS_QUEUED, TrainingJob.STATUS_RUNNING]
+
+
+def active_job() -> Optional[TrainingJob]:
+    cutoff = timezone.now() - STALE_AFTER
+    return TrainingJob.objects.filter(status__in=ACTIVE, heartbeat_at__gte=cutoff).first()
+
+
+def claim_job() -> tuple[TrainingJob, bool]:
+    """Create a queued job unless one is already in flight. Returns (job, created)."""
+    for _ in range(3):
+        existing = active_job()
+        if existing is not None:
+            return existing, False
+        # A job left active by a dead worker would hold the constraint forever
+        TrainingJob.objects.filter(status__in=ACTIVE, heartbeat_at__lt=timezone.now() - STALE_AFTER).update(
+            status=TrainingJob.STATUS_FAILED, error="Abandoned: no heartbeat for "
+            f"{STALE_AFTER.total_seconds() / 3600:g} h", finished_at=timezone.now())
+        try:
+            with transaction.atomic():
+                return TrainingJob.objects.create(), True
+        except IntegrityError:
+            continue  # another request claimed it first; return theirs
+    raise RuntimeError("Could not claim a training job")
+
+
+def enqueue_retrain() -> tuple[TrainingJob, bool]:
+    """Queue a retrain unless one is already in flight. Returns (job, created)."""
+    job, created = claim_job()
+    if created:
+        _get_executor().submit(run_job, job.pk)
+    return job, created
+
+
+def _beat(job_id: int, stop: threading.Event) -> None:
+    """Refresh the running job's heartbeat every HEARTBEAT_INTERVAL until stop is set."""
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL.total_seconds()):
+            TrainingJob.objects.filter(pk=job_id, status=TrainingJob.STATUS_RUNNING).update(
+                heartbeat_at=timezone.now())
+    except Exception:
+        logger.exception("Heartbeat for retraining job %s failed", job_id)
+    finally:
+        connection.close()
+
+
+def run_job(job_id: int) -> TrainingJob:
+    """Execute a queued job in the current thread and record the outcome."""
+    from .ml import train_model
+
+    try:
+        running = TrainingJob.objects.filter(pk=job_id, status=TrainingJob.STATUS_RUNNING)
+        now = timezone.now()
+        if not TrainingJob.objects.filter(pk=job_id, status=TrainingJob.STATUS_QUEUED).update(
+                status=TrainingJob.STATUS_RUNNING, started_at=now, heartbeat_at=now):
+            logger.warning("Retraining job %s is no longer queued; not running it", job_id)
+            return TrainingJob.objects.get(pk=job_id)
+
+        def progress(pct: int, stage: str) -> None:
+            running.update(progress=pct, stage=stage, heartbeat_at=timezone.now())
+
+        stop = threading.Event()
+        beat = threading.Thread(target=_beat, args=(job_id, stop), name=f"retrain-heartbeat-{job_id}", daemon=True)
+        beat.start()
+        try:
+            result = train_model.train_and_save(progress=progress)
+        except Exception as exc:
+            logger.exception("Retraining job %s failed", job_id)
+            outcome = {"status": TrainingJob.STATUS_FAILED, "error": str(exc)}
+        else:
+            outcome = {
+                "status": TrainingJob.STATUS_SUCCEEDED,
+                "version": str(result["version"]),
+                "accuracy": float(result["accuracy"]),
+                "rows": int(result["rows"]),
+                "progress": 100,
+                "stage": "Done",
+            }
+        finally:
+            stop.set()
+            beat.join()
+        # Only a job still marked running takes the outcome; an abandoned one stays failed
+        if not running.update(finished_at=timezone.now(), heartbeat_at=timezone.now(), **outcome):
+            logger.warning("Retraining job %s was marked abandoned while running; its outcome (%s) is not recorded",
+                           job_id, outcome["status"])
+        if outcome["status"] == TrainingJob.STATUS_SUCCEEDED:
+            # The new model is published either way
+            from .analytics import prerender
+            prerender.schedule("retrain")
+        return TrainingJob.objects.get(pk=job_id)
+    finally:
+        close_old_connections()
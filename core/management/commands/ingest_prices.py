@@ -0,0 +1,47 @@
+import datetime
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.scrapers.ingest import FORMATS, default_format, ingest_prices, store_dir
+
+
+class Command(BaseCommand):
+    help = ("Normalize, dedupe and store mandi price files/feeds from any state in the partitioned "
+            "price store that the market page queries by state and date range.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='+',
+                            help="CSV (.csv, .csv.gz) or saved HTML files, directories of them, or http(s) feed URLs. "
+                                 "Later sources win on duplicate (date, market, commodity, variety) rows.")
+        parser.add_argument('--state', default='',
+                            help="State for sources without a state column (or with blank states).")
+        parser.add_argument('--date', default=None,
+                            help="Observation date (YYYY-MM-DD) for sources without a date column; defaults to today.")
+        parser.add_argument('--workers', type=int, default=None, help="Normalizing processes.")
+        parser.add_argument('--format', choices=tuple(FORMATS), default=None,
+                            help=f"Partition file format (default: {default_format()}).")
+        parser.add_argument('--store', default=None, help=f"Store directory (default: {store_dir()}).")
+        parser.add_argument('--no-charts', action='store_true',
+                            help="Skip re-rendering the dashboard charts after ingesting.")
+
+    def handle(self, *args, **options):
+        try:
+            date = datetime.date.fromisoformat(options['date']) if options['date'] else datetime.date.today()
+        except ValueError as exc:
+            raise CommandError(f"Invalid --date: {exc}")
+
+        report = ingest_prices(options['sources'], state=options['state'], date=date, workers=options['workers'],
+                               root=options['store'], fmt=options['format'])
+        for source, error in report.errors:
+            self.stderr.write(self.style.WARNING(f"Skipped {source}: {error}"))
+        self.stdout.write(
+            f"{report.sources} sources: {report.rows_read} rows read, {report.rows_valid} valid, "
+            f"{report.duplicates} duplicates dropped"
+        )
+        message = f"Stored {report.rows_stored} rows in {report.partitions} partitions in {report.seconds:.2f}s"
+        if report.errors and not report.partitions:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
+        if report.partitions and not options['no_charts']:
+            call_command('render_charts', reason='price ingest', stdout=self.stdout)
@@ -0,0 +1,122 @@
+import csv
+import datetime
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import page_cache
+from core.models import CropPrice, RainfallReading
+from core.scrapers.parsing import parse_number
+
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'core', 'ml', 'data')
+
+# CSV heading -> model field
+PRICE_COLUMNS = {
+    'Commodity': 'commodity',
+    'Variety': 'variety',
+    'Price (₹/quintal)': 'price_text',
+    'Market': 'market',
+}
+RAINFALL_COLUMNS = {
+    'City': 'region',
+    'Rainfall (mm)': 'rainfall_text',
+    'Time Period': 'period',
+}
+
+# model -> (unique constraint fields, fields a re-load overwrites)
+NATURAL_KEYS = {
+    # updated_at is refreshed on upsert so change checks (core.analytics.aggregates) see reloads
+    CropPrice: (['date', 'market', 'commodity', 'variety', 'source'], ['state', 'price', 'price_text', 'updated_at']),
+    RainfallReading: (['date', 'region', 'period', 'source'], ['rainfall_mm', 'updated_at']),
+}
+
+
+class Command(BaseCommand):
+    help = "Bulk-load crop price and rainfall CSVs into the CropPrice / RainfallReading tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prices', default=os.path.join(DATA_DIR, 'gujarat_crop_prices.csv'),
+                            help="Price CSV (Commodity, Variety, Price (₹/quintal), Market). Pass '' to skip.")
+        parser.add_argument('--rainfall', default=os.path.join(DATA_DIR, 'gujarat_rainfall_data.csv'),
+                            help="Rainfall CSV (City, Rainfall (mm), Time Period). Pass '' to skip.")
+        parser.add_argument('--date', default=None, help="Observation date (YYYY-MM-DD) for rows; defaults to today.")
+        parser.add_argument('--state', default='Gujarat')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--replace', action='store_true',
+                            help="Delete rows previously loaded from the same file before inserting. Without it, rows "
+                                 "for the same day, market/region and file are updated in place.")
+        parser.add_argument('--no-charts', action='store_true',
+                            help="Skip re-rendering the dashboard charts after loading.")
+
+    def handle(self, *args, **options):
+        try:
+            date = datetime.date.fromisoformat(options['date']) if options['date'] else datetime.date.today()
+        except ValueError as exc:
+            raise CommandError(f"Invalid --date: {exc}")
+        batch_size = max(1, options['batch_size'])
+
+        if options['prices']:
+            n = self._load(options['prices'], CropPrice, PRICE_COLUMNS, batch_size, options['replace'],
+                           lambda row, source: self._price(row, source, date, options['state']))
+            self.stdout.write(self.style.SUCCESS(f"Loaded {n} crop prices from {options['prices']}"))
+            page_cache.invalidate('prices')
+        if options['rainfall']:
+            n = self._load(options['rainfall'], RainfallReading, RAINFALL_COLUMNS, batch_size, options['replace'],
+                           lambda row, source: self._rainfall(row, source, date))
+            self.stdout.write(self.style.SUCCESS(f"Loaded {n} rainfall readings from {options['rainfall']}"))
+            page_cache.invalidate('rainfall')
+        if not options['no_charts']:
+            call_command('render_charts', reason='market data refresh', stdout=self.stdout)
+
+    def _load(self, path, model, columns, batch_size, replace, build):
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        source = os.path.basename(path)
+        key_fields, update_fields = NATURAL_KEYS[model]
+        total = 0
+        with open(path, newline='', encoding='utf-8-sig') as fh, transaction.atomic():
+            reader = csv.DictReader(fh)
+            missing = [c for c in columns if c not in (reader.fieldnames or [])]
+            if missing:
+                raise CommandError(f"{path} is missing columns: {', '.join(missing)}")
+            if replace:
+                model.objects.filter(source=source).delete()
+            # Keyed on the natural key: a row repeated in the file keeps its last values
+            batch = {}
+            for row in reader:
+                values = {field: (row.get(col) or '').strip() for col, field in columns.items()}
+                obj = build(values, source)
+                if obj is None:
+                    continue
+                batch[tuple(getattr(obj, f) for f in key_fields)] = obj
+                if len(batch) >= batch_size:
+                    total += self._upsert(model, batch, key_fields, update_fields, batch_size)
+                    batch = {}
+            if batch:
+                total += self._upsert(model, batch, key_fields, update_fields, batch_size)
+        return total
+
+    @staticmethod
+    def _upsert(model, batch, key_fields, update_fields, batch_size):
+        # Rows already loaded for the same day and source are updated in place
+        model.objects.bulk_create(list(batch.values()), batch_size=batch_size, update_conflicts=True,
+                                  unique_fields=key_fields, update_fields=update_fields)
+        return len(batch)
+
+    @staticmethod
+    def _price(values, source, date, state):
+        if not values['commodity'] or not values['market']:
+            return None
+        return CropPrice(date=date, state=state, source=source,
+                         price=parse_number(values['price_text']), **values)
+
+    @staticmethod
+    def _rainfall(values, source, date):
+        if not values['region']:
+            return None
+        return RainfallReading(date=date, source=source, region=values['region'], period=values['period'],
+                               rainfall_mm=parse_number(values['rainfall_text']))
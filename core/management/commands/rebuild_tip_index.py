@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import page_cache, tip_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text index behind tip search (needed after bulk loads, which skip signals)."
+
+    def handle(self, *args, **options):
+        if not tip_search.fts_available() and not tip_search.create_index():
+            raise CommandError("SQLite FTS5 is not available; tip search uses substring filters instead.")
+        n = tip_search.rebuild_index()
+        page_cache.invalidate("tips")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {n} tips"))
@@ -0,0 +1,48 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.scrapers.browser import get_browser_pool
+from core.scrapers.schemes import REFRESH_INTERVAL, SCHEMES_URL, refresh_schemes
+
+
+class Command(BaseCommand):
+    help = "Scrape the government schemes page and store it as the snapshot served by /schemes/."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=SCHEMES_URL)
+        parser.add_argument('--html', default=None, help="Parse a saved HTML file instead of scraping.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, refreshing every --interval seconds (plus jitter).")
+        parser.add_argument('--interval', type=float, default=REFRESH_INTERVAL.total_seconds())
+        parser.add_argument('--jitter', type=float, default=0.1,
+                            help="Random extra delay as a fraction of --interval, so workers don't align.")
+
+    def handle(self, *args, **options):
+        html = None
+        if options['html']:
+            with open(options['html'], encoding='utf-8') as fh:
+                html = fh.read()
+        try:
+            while True:
+                snapshot = refresh_schemes(url=options['url'], html=html)
+                self._report(snapshot)
+                if not options['loop']:
+                    if not snapshot.ok:
+                        raise CommandError(f"Schemes refresh failed: {snapshot.error}")
+                    return
+                close_old_connections()
+                interval = options['interval']
+                time.sleep(interval + random.uniform(0, interval * max(0.0, options['jitter'])))
+        finally:
+            get_browser_pool().close()
+
+    def _report(self, snapshot):
+        if not snapshot.ok:
+            self.stderr.write(f"Refresh failed, keeping previous snapshot: {snapshot.error}")
+        elif snapshot.changed:
+            self.stdout.write(self.style.SUCCESS(f"Stored {snapshot.items} schemes (changed)."))
+        else:
+            self.stdout.write(f"{snapshot.items} schemes unchanged; nothing rewritten.")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import prerender
+
+
+class Command(BaseCommand):
+    help = "Pre-render the admin dashboard charts in the chart process pool and report render times."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reason', default='manual run')
+
+    def handle(self, *args, **options):
+        try:
+            manifest = prerender.prerender(reason=options['reason'])
+        finally:
+            prerender.shutdown()
+        empty = 0
+        for name, entry in sorted(manifest.items()):
+            if entry.get('empty'):
+                empty += 1
+                took = 'no data to draw'
+            else:
+                took = f"rendered in {entry['render_ms']} ms" if entry['rendered'] else 'unchanged, reused'
+            self.stdout.write(f"{name}: {took}")
+        self.stdout.write(self.style.SUCCESS(f"{len(manifest) - empty} dashboard chart(s) ready, {empty} without data"))
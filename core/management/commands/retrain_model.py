@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import prerender
+from core.jobs import claim_job, run_job
+from core.models import TrainingJob
+
+
+class Command(BaseCommand):
+    help = "Retrain the crop recommendation model now, recording the run as a TrainingJob."
+
+    def handle(self, *args, **options):
+        job, created = claim_job()
+        if not created:
+            raise CommandError(f"Training job #{job.pk} is already {job.status}")
+        job = run_job(job.pk)
+        if job.status != TrainingJob.STATUS_SUCCEEDED:
+            raise CommandError(f"Training job #{job.pk} failed: {job.error}")
+        # run_job queued a chart pre-render; let it finish before the process exits
+        try:
+            prerender.schedule('retrain').result()
+        except Exception as exc:
+            self.stderr.write(f"Chart pre-render failed: {exc}")
+        finally:
+            prerender.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f"Training job #{job.pk} published version {job.version} "
+            f"(accuracy {job.accuracy:.3f}, {job.rows} rows, {job.duration_seconds:.1f}s)"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_contactmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='0-100')),
+                ('stage', models.CharField(blank=True, max_length=120)),
+                ('version', models.CharField(blank=True, help_text='Artifact version produced by this run', max_length=32)),
+                ('accuracy', models.FloatField(blank=True, help_text='Training-set accuracy of the new model', null=True)),
+                ('rows', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
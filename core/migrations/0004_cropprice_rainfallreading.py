@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_trainingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CropPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('state', models.CharField(blank=True, default='Gujarat', max_length=64)),
+                ('market', models.CharField(max_length=120)),
+                ('commodity', models.CharField(max_length=120)),
+                ('variety', models.CharField(blank=True, max_length=120)),
+                ('price', models.FloatField(blank=True, help_text='Modal price in ₹/quintal', null=True)),
+                ('price_text', models.CharField(blank=True, help_text='Price as published', max_length=64)),
+                ('source', models.CharField(blank=True, max_length=120)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date', 'commodity', 'market'],
+                'indexes': [models.Index(fields=['commodity', 'market', '-date'], name='cropprice_commodity_market'), models.Index(fields=['market', '-date'], name='cropprice_market_date'), models.Index(fields=['-date', 'commodity'], name='cropprice_date_commodity'), models.Index(fields=['state', '-date'], name='cropprice_state_date'), models.Index(fields=['source'], name='cropprice_source')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RainfallReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('region', models.CharField(max_length=120)),
+                ('rainfall_mm', models.FloatField(blank=True, null=True)),
+                ('period', models.CharField(blank=True, max_length=64)),
+                ('source', models.CharField(blank=True, max_length=120)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date', '-rainfall_mm'],
+                'indexes': [models.Index(fields=['region', '-date'], name='rainfall_region_date'), models.Index(fields=['-date', '-rainfall_mm'], name='rainfall_date_mm'), models.Index(fields=['source'], name='rainfall_source')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_cropprice_rainfallreading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('kind', models.CharField(choices=[('suggestion', 'Crop suggestion'), ('market', 'Market data')], max_length=16)),
+                ('region', models.CharField(blank=True, max_length=120)),
+                ('crop', models.CharField(blank=True, max_length=120)),
+                ('detail', models.CharField(blank=True, help_text='Compact inputs, e.g. soil/season/rainfall or the price filter', max_length=255)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['kind', '-created_at'], name='queryevent_kind_created')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QueryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('suggestion', 'Crop suggestion'), ('market', 'Market data')], max_length=16)),
+                ('dimension', models.CharField(max_length=16)),
+                ('key', models.CharField(max_length=120)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', '-count'],
+                'indexes': [models.Index(fields=['dimension', '-day'], name='queryrollup_dimension_day')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'kind', 'dimension', 'key'), name='queryrollup_unique_key')],
+            },
+        ),
+    ]
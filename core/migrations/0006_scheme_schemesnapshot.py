@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_queryevent_queryrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('serial', models.CharField(blank=True, max_length=16)),
+                ('department', models.CharField(blank=True, max_length=255)),
+                ('title', models.CharField(max_length=500)),
+                ('url', models.URLField(blank=True, max_length=500)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['position'], name='scheme_position')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SchemeSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checked_at', models.DateTimeField(auto_now_add=True)),
+                ('ok', models.BooleanField(default=False)),
+                ('content_hash', models.CharField(blank=True, help_text='Hash of the whole list, in order', max_length=64)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('changed', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-checked_at'],
+                'indexes': [models.Index(fields=['ok', '-checked_at'], name='schemesnapshot_ok_checked')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+FTS_TABLE = "core_tip_fts"
+FTS_COLUMNS = "title, content, crop, season"
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    from django.db import DatabaseError
+
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{FTS_COLUMNS}, tokenize = 'porter unicode61 remove_diacritics 2')"
+            )
+        except DatabaseError:
+            return  # SQLite built without FTS5: tip search falls back to icontains
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) SELECT id, {FTS_COLUMNS} FROM core_tip")
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_scheme_schemesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tip',
+            index=models.Index(fields=['category', '-id'], name='tip_category_id'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_tip_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at', '-id'], name='contactmessage_created'),
+        ),
+        migrations.AddIndex(
+            model_name='tip',
+            index=models.Index(fields=['-created_at', '-id'], name='tip_created'),
+        ),
+        migrations.AddIndex(
+            model_name='tip',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='tip_category_created'),
+        ),
+        migrations.AddIndex(
+            model_name='tip',
+            index=models.Index(fields=['season', '-created_at', '-id'], name='tip_season_created'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:54
+
+from django.db import migrations, models
+from django.db.models import Max
+
+PRICE_KEY = ('date', 'market', 'commodity', 'variety', 'source')
+RAINFALL_KEY = ('date', 'region', 'period', 'source')
+
+
+def drop_duplicates(apps, schema_editor):
+    # Loads repeated without --replace left copies of each row; keep the newest of each
+    for name, key in (('CropPrice', PRICE_KEY), ('RainfallReading', RAINFALL_KEY)):
+        model = apps.get_model('core', name)
+        keep = model.objects.values(*key).order_by().annotate(keep=Max('id')).values('keep')
+        model.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tip_contactmessage_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cropprice',
+            constraint=models.UniqueConstraint(fields=('date', 'market', 'commodity', 'variety', 'source'), name='cropprice_unique_observation'),
+        ),
+        migrations.AddConstraint(
+            model_name='rainfallreading',
+            constraint=models.UniqueConstraint(fields=('date', 'region', 'period', 'source'), name='rainfall_unique_reading'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:58
+
+from django.db import migrations, models
+from django.utils import timezone
+
+ACTIVE = ['queued', 'running']
+
+
+def close_extra_active_jobs(apps, schema_editor):
+    # Only the newest queued/running job can stay active under the new constraint
+    TrainingJob = apps.get_model('core', 'TrainingJob')
+    newest = TrainingJob.objects.filter(status__in=ACTIVE).order_by('-created_at', '-id').first()
+    if newest is not None:
+        TrainingJob.objects.filter(status__in=ACTIVE).exclude(pk=newest.pk).update(
+            status='failed', error='Superseded by a newer job', finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_market_natural_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_extra_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trainingjob',
+            constraint=models.UniqueConstraint(models.Value(True), condition=models.Q(('status__in', ['queued', 'running'])), name='trainingjob_one_active'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:01
+
+from django.db import migrations, models
+
+
+def collapse_failure_runs(apps, schema_editor):
+    # Each run of consecutive failed refreshes becomes its newest row, counting the run
+    SchemeSnapshot = apps.get_model('core', 'SchemeSnapshot')
+    run = []
+
+    def close(run):
+        if run:
+            SchemeSnapshot.objects.filter(pk__in=run[:-1]).delete()
+            SchemeSnapshot.objects.filter(pk=run[-1]).update(failures=len(run))
+
+    for pk, ok in SchemeSnapshot.objects.order_by('checked_at', 'id').values_list('pk', 'ok').iterator():
+        if ok:
+            close(run)
+            run = []
+        else:
+            run.append(pk)
+    close(run)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_trainingjob_one_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schemesnapshot',
+            name='failures',
+            field=models.PositiveIntegerField(default=0, help_text='Consecutive failed refreshes this row stands for'),
+        ),
+        migrations.RunPython(collapse_failure_runs, migrations.RunPython.noop),
+    ]
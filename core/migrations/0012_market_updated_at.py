@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    # Existing rows were last written when they were created
+    for name in ('CropPrice', 'RainfallReading'):
+        model = apps.get_model('core', name)
+        model.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_schemesnapshot_failures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cropprice',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Last load or edit of this row'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='rainfallreading',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Last load or edit of this row'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:40
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def copy_started_at(apps, schema_editor):
+    # The last sign of life known for existing jobs is when they started (or were queued)
+    TrainingJob = apps.get_model('core', 'TrainingJob')
+    TrainingJob.objects.update(heartbeat_at=Coalesce('started_at', 'created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_market_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, help_text='Last progress report or heartbeat from the worker running this job'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_started_at, migrations.RunPython.noop),
+    ]
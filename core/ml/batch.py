@@ -0,0 +1,94 @@
+"""
+Vectorized batch scoring for the categorical crop recommendation model.
+
+Records are validated and one-hot encoded with NumPy array operations, then scored
+with a single predict_proba call regardless of batch size.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from .features import CATEGORICAL_ORDERS
+
+
+FEATURE_COUNT = sum(len(order) for _, order in CATEGORICAL_ORDERS)
+
+
+@dataclass
+class EncodedBatch:
+    X: np.ndarray            # (n_valid, FEATURE_COUNT) one-hot matrix
+    valid_index: np.ndarray  # positions of the valid records in the input
+    errors: Dict[int, str]   # input position -> validation message
+
+
+def encode_records(records: Sequence[Dict[str, Any]]) -> EncodedBatch:
+    """Validate and one-hot encode records of soil_type/season/rainfall_level."""
+    n = len(records)
+    valid = np.ones(n, dtype=bool)
+    errors: Dict[int, str] = {}
+    codes_per_field: List[np.ndarray] = []
+
+    for field, order in CATEGORICAL_ORDERS:
+        raw = np.array([str(r.get(field, "")) if isinstance(r, dict) else "" for r in records], dtype=str)
+        values = np.char.lower(np.char.strip(raw))
+        # (n, n_categories) equality matrix; a row with no match is an invalid value
+        matches = values[:, None] == np.array(order, dtype=str)[None, :]
+        ok = matches.any(axis=1)
+        for i in np.flatnonzero(~ok & valid):
+            errors[int(i)] = f"invalid {field} {str(raw[i])!r}; expected one of {order}"
+        valid &= ok
+        codes_per_field.append(matches.argmax(axis=1))
+
+    valid_index = np.flatnonzero(valid)
+    X = np.zeros((len(valid_index), FEATURE_COUNT), dtype=np.int8)
+    rows = np.arange(len(valid_index))
+    offset = 0
+    for (field, order), codes in zip(CATEGORICAL_ORDERS, codes_per_field):
+        X[rows, offset + codes[valid_index]] = 1
+        offset += len(order)
+    return EncodedBatch(X=X, valid_index=valid_index, errors=errors)
+
+
+def recommend_batch(model: Any, label_encoder: Any, records: Sequence[Dict[str, Any]],
+                    top_k: int = 3) -> Iterator[Dict[str, Any]]:
+    """
+    One result per input record, in input order. Valid records get the top_k crops with
+    probabilities; invalid ones get an "error" message instead.
+
+    Encoding and scoring happen here, eagerly, so errors surface before a caller starts
+    streaming; the returned iterator only formats the results.
+    """
+    batch = encode_records(records)
+    classes = label_encoder.inverse_transform(model.classes_)
+    top_k = max(1, min(top_k, len(classes)))
+
+    if len(batch.valid_index):
+        proba = model.predict_proba(batch.X)
+        # Highest-probability classes first; argsort is ascending so take the tail reversed
+        top_idx = np.argsort(proba, axis=1, kind="stable")[:, ::-1][:, :top_k]
+        top_scores = np.take_along_axis(proba, top_idx, axis=1)
+    else:
+        top_idx = top_scores = np.empty((0, top_k))
+
+    row_of = np.full(len(records), -1, dtype=np.int64)
+    row_of[batch.valid_index] = np.arange(len(batch.valid_index))
+    return _results(row_of, batch.errors, classes, top_idx, top_scores)
+
+
+def _results(row_of: np.ndarray, errors: Dict[int, str], classes, top_idx: np.ndarray,
+             top_scores: np.ndarray) -> Iterator[Dict[str, Any]]:
+    for i in range(len(row_of)):
+        row = row_of[i]
+        if row < 0:
+            yield {"index": i, "error": errors[i]}
+            continue
+        yield {
+            "index": i,
+            "crops": [
+                {"crop": str(classes[c]), "score": round(float(s), 6)}
+                for c, s in zip(top_idx[row], top_scores[row])
+            ],
+        }
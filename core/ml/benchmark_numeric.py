@@ -0,0 +1,77 @@
+"""
+Compare the numeric recommender with the existing DecisionTreeClassifier setup.
+
+Accuracy: both model types are fitted on the same stratified split of
+Crop_recommendation.csv (the categorical crop_dataset.csv is too small to evaluate).
+Latency: single-row scoring through sklearn predict() for the current categorical
+model, the sklearn forest, and the compiled forest used at serve time.
+
+    python core/ml/benchmark_numeric.py
+"""
+from __future__ import annotations
+
+import pathlib
+import sys
+import time
+from typing import Callable, Dict
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if __package__ in (None, ""):
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.ml.features import one_hot_row  # noqa: E402
+from core.ml.numeric_model import FOREST_PARAMS, compile_forest, load_numeric_dataset  # noqa: E402
+
+
+def _per_call_us(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def run(repeat: int = 2000) -> Dict[str, Dict[str, float]]:
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y = load_numeric_dataset()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    tree = DecisionTreeClassifier(max_depth=None, random_state=42).fit(X_train, y_train)
+    forest = RandomForestClassifier(**FOREST_PARAMS).fit(X_train, y_train)
+    compiled = compile_forest(forest, forest.classes_)
+
+    row = X_test[0]
+    results: Dict[str, Dict[str, float]] = {
+        "decision_tree": {
+            "accuracy": float((tree.predict(X_test) == y_test).mean()),
+            "latency_us": _per_call_us(lambda: tree.predict([row]), repeat),
+        },
+        "random_forest_sklearn": {
+            "accuracy": float((forest.predict(X_test) == y_test).mean()),
+            "latency_us": _per_call_us(lambda: forest.predict([row]), max(repeat // 10, 1)),
+        },
+        "random_forest_compiled": {
+            "accuracy": float(sum(compiled.predict_one(r) == t for r, t in zip(X_test, y_test)) / len(y_test)),
+            "latency_us": _per_call_us(lambda: compiled.predict_one(row), repeat),
+        },
+    }
+
+    model_path = PROJECT_ROOT / "core" / "ml" / "crop_model.joblib"
+    if model_path.exists():
+        categorical = joblib.load(model_path)
+        features = one_hot_row("clay", "winter", "low")
+        results["categorical_decision_tree"] = {
+            "accuracy": float("nan"),
+            "latency_us": _per_call_us(lambda: categorical.predict([features]), repeat),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'model':<28}{'accuracy':>10}{'latency (us)':>15}")
+    for name, res in run().items():
+        print(f"{name:<28}{res['accuracy']:>10.3f}{res['latency_us']:>15.1f}")
@@ -0,0 +1,48 @@
+"""
+Feature definitions shared by training and serving.
+
+Kept free of pandas/sklearn imports so the request path can encode inputs cheaply.
+"""
+from __future__ import annotations
+
+from itertools import product
+from typing import Iterator, List, Tuple
+
+
+SOIL_ORDER: List[str] = ["clay", "sandy", "loamy", "silt", "peat", "chalk"]
+SEASON_ORDER: List[str] = ["winter", "summer", "monsoon"]
+RAINFALL_ORDER: List[str] = ["low", "medium", "high"]
+
+CATEGORICAL_ORDERS: List[Tuple[str, List[str]]] = [
+    ("soil_type", SOIL_ORDER),
+    ("season", SEASON_ORDER),
+    ("rainfall_level", RAINFALL_ORDER),
+]
+
+_SOIL_POS = {v: i for i, v in enumerate(SOIL_ORDER)}
+_SEASON_POS = {v: i for i, v in enumerate(SEASON_ORDER)}
+_RAINFALL_POS = {v: i for i, v in enumerate(RAINFALL_ORDER)}
+
+COMBINATION_COUNT = len(SOIL_ORDER) * len(SEASON_ORDER) * len(RAINFALL_ORDER)
+
+
+def one_hot_row(soil: str, season: str, rainfall: str) -> List[int]:
+    features: List[int] = []
+    for value, allowed in [
+        (soil, SOIL_ORDER),
+        (season, SEASON_ORDER),
+        (rainfall, RAINFALL_ORDER),
+    ]:
+        for category in allowed:
+            features.append(1 if value == category else 0)
+    return features
+
+
+def combination_index(soil: str, season: str, rainfall: str) -> int:
+    """Position of an input in the dense soil x season x rainfall grid. Raises KeyError for unknown values."""
+    return (_SOIL_POS[soil] * len(SEASON_ORDER) + _SEASON_POS[season]) * len(RAINFALL_ORDER) + _RAINFALL_POS[rainfall]
+
+
+def all_combinations() -> Iterator[Tuple[str, str, str]]:
+    """Every categorical input, in combination_index order."""
+    return product(SOIL_ORDER, SEASON_ORDER, RAINFALL_ORDER)
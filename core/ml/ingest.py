@@ -0,0 +1,283 @@
+"""
+Streaming, validated ingestion of uploaded crop datasets.
+
+Uploads are decoded (strict UTF-8: a file with bad bytes is rejected, not patched with
+replacement characters) and parsed chunk by chunk (memory stays bounded by the chunk
+size), each row is normalized and checked against the categories train_model expects,
+and the accepted rows are written to a temp file. Only a complete, valid upload touches
+the live dataset, and only through an atomic rename.
+
+The dataset is the base CSV (e.g. crop_dataset.csv) plus append segments in a sibling
+directory (crop_dataset.csv.d/), read together by ``read_dataset()``:
+
+- ``append`` renames the upload into the segment directory under a unique name, so an
+  upload costs I/O for its own rows only and concurrent uploads never overwrite each
+  other. Once there are more than MAX_SEGMENTS segments they are folded into the base;
+- ``replace`` renames the upload over the base and drops every segment.
+
+Publishing, compaction and reads hold an flock on a sidecar lock file (.<name>.lock), so
+they are safe across worker processes, and a reader never sees a segment half folded
+into the base. Without fcntl (Windows) the lock only covers threads of one process.
+"""
+from __future__ import annotations
+
+import contextlib
+import csv
+import io
+import os
+import pathlib
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .features import CATEGORICAL_ORDERS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+DATASET_COLUMNS: List[str] = ["soil_type", "season", "rainfall_level", "crop"]
+MAX_ERROR_SAMPLES = 10
+MAX_SEGMENTS = 64
+MODE_APPEND = "append"
+MODE_REPLACE = "replace"
+
+_thread_lock = threading.Lock()  # stands in for flock where fcntl is unavailable
+
+
+class DatasetValidationError(ValueError):
+    """The upload cannot be ingested at all (bad header, nothing valid, ...)."""
+
+
+@dataclass
+class IngestResult:
+    accepted: int = 0
+    rejected: int = 0
+    errors: List[str] = field(default_factory=list)
+    mode: str = MODE_APPEND
+
+    def reject(self, line_no: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append(f"line {line_no}: {reason}")
+
+
+class _ChunkStream(io.RawIOBase):
+    """Expose an iterable of byte chunks (e.g. UploadedFile.chunks()) as a readable stream."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buf), len(self._pending))
+        buf[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def _validate_row(row: dict) -> Optional[List[str]]:
+    """Return the normalized row, or None if any column is missing/unknown."""
+    out = []
+    for name, allowed in CATEGORICAL_ORDERS:
+        value = (row.get(name) or "").strip().lower()
+        if value not in allowed:
+            return None
+        out.append(value)
+    crop = (row.get("crop") or "").strip().lower()
+    if not crop:
+        return None
+    out.append(crop)
+    return out
+
+
+def _row_error(row: dict) -> str:
+    for name, allowed in CATEGORICAL_ORDERS:
+        value = (row.get(name) or "").strip().lower()
+        if value not in allowed:
+            return f"invalid {name} {row.get(name)!r}"
+    return "missing crop"
+
+
+def segment_dir(dataset_path: pathlib.Path) -> pathlib.Path:
+    dataset_path = pathlib.Path(dataset_path)
+    return dataset_path.with_name(dataset_path.name + ".d")
+
+
+def _segments(dataset_path: pathlib.Path) -> List[pathlib.Path]:
+    try:
+        names = os.listdir(segment_dir(dataset_path))
+    except OSError:
+        return []
+    # Names start with a nanosecond timestamp, so sorting keeps upload order
+    return [segment_dir(dataset_path) / n for n in sorted(names) if n.endswith(".csv") and not n.startswith(".")]
+
+
+@contextlib.contextmanager
+def dataset_lock(dataset_path: pathlib.Path, shared: bool = False):
+    """Cross-process lock on the dataset: shared for readers, exclusive for writers."""
+    dataset_path = pathlib.Path(dataset_path)
+    if fcntl is None:
+        if shared:
+            yield
+        else:
+            with _thread_lock:
+                yield
+        return
+    dataset_path.parent.mkdir(parents=True, exist_ok=True)
+    # A fresh descriptor per call: flock locks belong to the open file, so threads exclude each other too
+    with open(dataset_path.with_name(f".{dataset_path.name}.lock"), "a") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def dataset_files(dataset_path: pathlib.Path) -> List[pathlib.Path]:
+    """The base CSV (when present) followed by the append segments, oldest first."""
+    dataset_path = pathlib.Path(dataset_path)
+    return ([dataset_path] if dataset_path.exists() else []) + _segments(dataset_path)
+
+
+def dataset_signature(dataset_path: pathlib.Path) -> Optional[Tuple[Tuple[str, int, int], ...]]:
+    """(name, mtime, size) of every dataset file, or None when there is no dataset."""
+    sig = []
+    for path in dataset_files(dataset_path):
+        try:
+            st = path.stat()
+        except OSError:
+            continue  # folded into the base meanwhile; the base's own entry changes too
+        sig.append((str(path), st.st_mtime_ns, st.st_size))
+    return tuple(sig) or None
+
+
+def read_dataset(dataset_path: pathlib.Path, columns: Iterable[str] = DATASET_COLUMNS):
+    """
+    The base CSV and its segments as one DataFrame of categorical columns. Headers are
+    matched ignoring case and padding. Raises FileNotFoundError without a dataset and
+    ValueError when a file lacks one of columns.
+    """
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    columns = list(columns)
+    frames = []
+    with dataset_lock(dataset_path, shared=True):
+        paths = dataset_files(dataset_path)
+        if not paths:
+            raise FileNotFoundError(f"Dataset not found at {dataset_path}")
+        for path in paths:
+            # Categorical dtype keeps one copy of each distinct string, even for millions of rows
+            df = pd.read_csv(path, dtype="category")
+            df.columns = [str(c).strip().lower() for c in df.columns]
+            missing = [c for c in columns if c not in df.columns]
+            if missing:
+                raise ValueError(f"{path.name} is missing columns: {', '.join(missing)}")
+            frames.append(df[columns])
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    return pd.DataFrame({c: union_categoricals([f[c] for f in frames], ignore_order=True) for c in columns})
+
+
+def ingest_dataset(chunks: Iterable[bytes], dataset_path: pathlib.Path, mode: str = MODE_APPEND) -> IngestResult:
+    """
+    Validate an uploaded CSV and merge it into dataset_path.
+
+    Raises DatasetValidationError (leaving the dataset untouched) when the header lacks
+    the required columns or no row is valid.
+    """
+    if mode not in (MODE_APPEND, MODE_REPLACE):
+        raise ValueError(f"Unknown ingest mode {mode!r}")
+    dataset_path = pathlib.Path(dataset_path)
+    dataset_path.parent.mkdir(parents=True, exist_ok=True)
+    result = IngestResult(mode=mode)
+
+    text = io.TextIOWrapper(io.BufferedReader(_ChunkStream(chunks)), encoding="utf-8-sig", errors="strict", newline="")
+    reader = csv.DictReader(text)
+    try:
+        fieldnames = reader.fieldnames
+    except UnicodeDecodeError as exc:
+        raise DatasetValidationError("CSV header is not valid UTF-8") from exc
+    header = [h.strip().lower() for h in (fieldnames or [])]
+    missing = [c for c in DATASET_COLUMNS if c not in header]
+    if missing:
+        raise DatasetValidationError(f"CSV is missing required columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    directory = segment_dir(dataset_path)
+    directory.mkdir(exist_ok=True)
+    tmp_path = directory / f".{uuid.uuid4().hex}.upload"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(DATASET_COLUMNS)
+            try:
+                for row in reader:
+                    if None in row:
+                        result.reject(reader.line_num, "too many fields")
+                        continue
+                    values = _validate_row(row)
+                    if values is None:
+                        result.reject(reader.line_num, _row_error(row))
+                        continue
+                    writer.writerow(values)
+                    result.accepted += 1
+            except UnicodeDecodeError as exc:
+                raise DatasetValidationError(f"CSV is not valid UTF-8 (after line {reader.line_num})") from exc
+            out.flush()
+            os.fsync(out.fileno())
+
+        if result.accepted == 0:
+            raise DatasetValidationError("No valid rows found in the uploaded CSV")
+
+        with dataset_lock(dataset_path):
+            if mode == MODE_REPLACE or not dataset_path.exists():
+                stale = _segments(dataset_path) if mode == MODE_REPLACE else []
+                os.replace(tmp_path, dataset_path)
+                for segment in stale:
+                    segment.unlink()
+            else:
+                os.replace(tmp_path, directory / f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.csv")
+                if len(_segments(dataset_path)) > MAX_SEGMENTS:
+                    _compact(dataset_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return result
+
+
+def _compact(dataset_path: pathlib.Path) -> None:
+    """Fold the segments into the base CSV (canonical column order). Caller holds the lock."""
+    segments = _segments(dataset_path)
+    merged = segment_dir(dataset_path) / f".{uuid.uuid4().hex}.compact"
+    try:
+        with open(merged, "w", encoding="utf-8", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(DATASET_COLUMNS)
+            for path in [dataset_path] + segments:
+                with open(path, "r", encoding="utf-8-sig", newline="") as src:
+                    reader = csv.DictReader(src)
+                    reader.fieldnames = [h.strip().lower() for h in (reader.fieldnames or [])]
+                    for row in reader:
+                        writer.writerow([row.get(c, "") for c in DATASET_COLUMNS])
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(merged, dataset_path)
+        for segment in segments:
+            segment.unlink()
+    finally:
+        if merged.exists():
+            merged.unlink()
@@ -0,0 +1,104 @@
+"""
+Precomputed prediction table for the categorical crop recommendation model.
+
+The input space is only soil x season x rainfall, so after training every combination
+is scored once and written next to the model as JSON. Serving then becomes a list
+index and never touches sklearn or numpy.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from .features import (
+    COMBINATION_COUNT,
+    RAINFALL_ORDER,
+    SEASON_ORDER,
+    SOIL_ORDER,
+    all_combinations,
+    combination_index,
+    one_hot_row,
+)
+
+
+LOOKUP_PATH = pathlib.Path(__file__).resolve().parent / "crop_lookup.json"
+FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class LookupTable:
+    version: str
+    model_sha256: str
+    classes: List[str]
+    crops: List[str]
+    probabilities: List[List[float]]
+
+    def predict(self, soil: str, season: str, rainfall: str) -> str:
+        return self.crops[combination_index(soil, season, rainfall)]
+
+    def predict_proba(self, soil: str, season: str, rainfall: str) -> Dict[str, float]:
+        row = self.probabilities[combination_index(soil, season, rainfall)]
+        return dict(zip(self.classes, row))
+
+
+def build_lookup_table(model: Any, label_encoder: Any, version: str, model_sha256: str) -> LookupTable:
+    """Score every input combination with a single predict/predict_proba call."""
+    X = [one_hot_row(*combo) for combo in all_combinations()]
+    y_pred = model.predict(X)
+    crops = [str(c) for c in label_encoder.inverse_transform(y_pred)]
+    classes = [str(c) for c in label_encoder.inverse_transform(model.classes_)]
+    proba = model.predict_proba(X)
+    probabilities = [[float(p) for p in row] for row in proba]
+    return LookupTable(version=version, model_sha256=model_sha256, classes=classes,
+                       crops=crops, probabilities=probabilities)
+
+
+def verify_lookup_table(table: LookupTable, model: Any, label_encoder: Any) -> None:
+    """Raise ValueError if the table disagrees with the model on any input."""
+    if len(table.crops) != COMBINATION_COUNT or len(table.probabilities) != COMBINATION_COUNT:
+        raise ValueError(f"Lookup table must have {COMBINATION_COUNT} entries")
+    combos = list(all_combinations())
+    expected = label_encoder.inverse_transform(model.predict([one_hot_row(*c) for c in combos]))
+    for combo, want in zip(combos, expected):
+        got = table.predict(*combo)
+        if got != str(want):
+            raise ValueError(f"Lookup table mismatch for {combo}: table={got!r} model={want!r}")
+        proba = table.predict_proba(*combo)
+        if proba.get(got, 0.0) < max(proba.values()):
+            raise ValueError(f"Lookup table probabilities disagree with prediction for {combo}")
+
+
+def save_lookup_table(table: LookupTable, path: pathlib.Path = LOOKUP_PATH) -> None:
+    payload = {
+        "format": FORMAT_VERSION,
+        "version": table.version,
+        "model_sha256": table.model_sha256,
+        "soil_order": SOIL_ORDER,
+        "season_order": SEASON_ORDER,
+        "rainfall_order": RAINFALL_ORDER,
+        "classes": table.classes,
+        "crops": table.crops,
+        "probabilities": table.probabilities,
+    }
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh)
+    os.replace(tmp_path, path)
+
+
+def load_lookup_table(path: pathlib.Path = LOOKUP_PATH) -> LookupTable:
+    with open(path, "r", encoding="utf-8") as fh:
+        payload = json.load(fh)
+    orders: Tuple[List[str], ...] = (payload.get("soil_order"), payload.get("season_order"), payload.get("rainfall_order"))
+    if payload.get("format") != FORMAT_VERSION or orders != (SOIL_ORDER, SEASON_ORDER, RAINFALL_ORDER):
+        raise ValueError(f"Lookup table at {path} was built for a different feature layout")
+    return LookupTable(
+        version=payload["version"],
+        model_sha256=payload["model_sha256"],
+        classes=payload["classes"],
+        crops=payload["crops"],
+        probabilities=payload["probabilities"],
+    )
@@ -0,0 +1,214 @@
+"""
+Numeric agronomic recommender trained on Crop_recommendation.csv
+(N, P, K, temperature, humidity, ph, rainfall -> crop label).
+
+Training fits a RandomForestClassifier and exports it as flat node arrays in a compressed
+.npz file. Serving walks those arrays directly instead of going through sklearn, which
+keeps single-request scoring in the tens of microseconds.
+
+    python core/ml/numeric_model.py
+"""
+from __future__ import annotations
+
+import math
+import os
+import pathlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+APP_ROOT = pathlib.Path(__file__).resolve().parent
+NUMERIC_DATA_PATH = APP_ROOT / "data" / "Crop_recommendation.csv"
+NUMERIC_MODEL_PATH = APP_ROOT / "numeric_model.npz"
+
+NUMERIC_FEATURES: List[str] = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+LABEL_COLUMN = "label"
+
+# Plausible readings, inclusive: well beyond the training data (e.g. rainfall 20-300 mm) but
+# excluding values that can only be typos or unit mistakes
+NUMERIC_RANGES: Dict[str, Tuple[float, float]] = {
+    "N": (0.0, 500.0),
+    "P": (0.0, 500.0),
+    "K": (0.0, 500.0),
+    "temperature": (-20.0, 60.0),
+    "humidity": (0.0, 100.0),
+    "ph": (0.0, 14.0),
+    "rainfall": (0.0, 5000.0),
+}
+
+FOREST_PARAMS = {"n_estimators": 40, "max_depth": 12, "min_samples_leaf": 2, "random_state": 42}
+
+
+@dataclass
+class CompiledForest:
+    """Flattened tree ensemble: node i of tree t lives at roots[t] + i in the arrays."""
+    classes: List[str]
+    roots: List[int]
+    feature: List[int]
+    threshold: List[float]
+    left: List[int]
+    right: List[int]
+    leaf_proba: np.ndarray  # (n_nodes, n_classes), only leaf rows are meaningful
+
+    def predict_proba_one(self, x: Sequence[float]) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds; match that exactly
+        xs = np.asarray(x, dtype=np.float32).tolist()
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        leaves = []
+        for node in self.roots:
+            while left[node] != -1:
+                node = left[node] if xs[feature[node]] <= threshold[node] else right[node]
+            leaves.append(node)
+        return self.leaf_proba[leaves].mean(axis=0)
+
+    def predict_one(self, x: Sequence[float]) -> str:
+        return self.classes[int(self.predict_proba_one(x).argmax())]
+
+    def top_k(self, x: Sequence[float], k: int = 3) -> List[Tuple[str, float]]:
+        proba = self.predict_proba_one(x)
+        order = np.argsort(proba, kind="stable")[::-1][:k]
+        return [(self.classes[i], float(proba[i])) for i in order]
+
+
+def parse_inputs(payload: Mapping[str, Any]) -> List[float]:
+    """NUMERIC_FEATURES values from payload, in order. ValueError names the first bad field."""
+    values = []
+    for name in NUMERIC_FEATURES:
+        if name not in payload:
+            raise ValueError(f'"{name}" is required')
+        raw = payload[name]
+        if isinstance(raw, bool):
+            raise ValueError(f'"{name}" must be a number')
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f'"{name}" must be a number') from None
+        if not math.isfinite(value):
+            raise ValueError(f'"{name}" must be a finite number')
+        lo, hi = NUMERIC_RANGES[name]
+        if not lo <= value <= hi:
+            raise ValueError(f'"{name}" must be between {lo:g} and {hi:g}')
+        values.append(value)
+    return values
+
+
+def compile_forest(forest, classes: Sequence[str]) -> CompiledForest:
+    """Concatenate every estimator's tree_ arrays, rebasing child indices per tree."""
+    roots, feature, threshold, left, right, proba = [], [], [], [], [], []
+    offset = 0
+    for est in forest.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        roots.append(offset)
+        is_leaf = tree.children_left == -1
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        values = tree.value[:, 0, :]
+        proba.append(values / values.sum(axis=1, keepdims=True))
+        offset += n
+    return CompiledForest(
+        classes=[str(c) for c in classes],
+        roots=roots,
+        feature=np.concatenate(feature).astype(np.int32).tolist(),
+        threshold=np.concatenate(threshold).tolist(),
+        left=np.concatenate(left).astype(np.int32).tolist(),
+        right=np.concatenate(right).astype(np.int32).tolist(),
+        leaf_proba=np.concatenate(proba).astype(np.float32),
+    )
+
+
+def save_compiled(compiled: CompiledForest, path: pathlib.Path = NUMERIC_MODEL_PATH) -> None:
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(
+        tmp_path,
+        classes=np.array(compiled.classes),
+        features=np.array(NUMERIC_FEATURES),
+        roots=np.array(compiled.roots, dtype=np.int32),
+        feature=np.array(compiled.feature, dtype=np.int16),
+        threshold=np.array(compiled.threshold, dtype=np.float64),
+        left=np.array(compiled.left, dtype=np.int32),
+        right=np.array(compiled.right, dtype=np.int32),
+        leaf_proba=compiled.leaf_proba,
+    )
+    os.replace(tmp_path, path)
+
+
+def load_compiled(path: pathlib.Path = NUMERIC_MODEL_PATH) -> CompiledForest:
+    with np.load(path) as data:
+        if data["features"].tolist() != NUMERIC_FEATURES:
+            raise ValueError(f"Numeric model at {path} was trained on different features")
+        return CompiledForest(
+            classes=data["classes"].tolist(),
+            roots=data["roots"].tolist(),
+            feature=data["feature"].tolist(),
+            threshold=data["threshold"].tolist(),
+            left=data["left"].tolist(),
+            right=data["right"].tolist(),
+            leaf_proba=data["leaf_proba"],
+        )
+
+
+_cache: Tuple[Optional[Tuple[int, int]], Optional[CompiledForest]] = (None, None)
+_cache_lock = threading.Lock()
+
+
+def get_numeric_model(path: pathlib.Path = NUMERIC_MODEL_PATH) -> Optional[CompiledForest]:
+    """Process-wide cached model, reloaded when the artifact's mtime/size changes. None if missing."""
+    global _cache
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    sig = (st.st_mtime_ns, st.st_size)
+    cached_sig, model = _cache
+    if cached_sig == sig:
+        return model
+    with _cache_lock:
+        if _cache[0] != sig:
+            _cache = (sig, load_compiled(path))
+        return _cache[1]
+
+
+def load_numeric_dataset(path: pathlib.Path = NUMERIC_DATA_PATH):
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    missing = set(NUMERIC_FEATURES + [LABEL_COLUMN]) - set(df.columns)
+    if missing:
+        raise ValueError(f"Dataset must contain columns: {sorted(missing)}")
+    X = df[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+    y = df[LABEL_COLUMN].astype(str).str.strip().str.lower().to_numpy()
+    return X, y
+
+
+def train_numeric_and_save() -> Dict[str, float]:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    if not NUMERIC_DATA_PATH.exists():
+        raise FileNotFoundError(f"Dataset not found at {NUMERIC_DATA_PATH}")
+    X, y = load_numeric_dataset()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    # Hold-out accuracy first, then refit on everything for the shipped artifact
+    forest = RandomForestClassifier(**FOREST_PARAMS).fit(X_train, y_train)
+    accuracy = float((forest.predict(X_test) == y_test).mean())
+    forest = RandomForestClassifier(**FOREST_PARAMS).fit(X, y)
+
+    compiled = compile_forest(forest, forest.classes_)
+    sample = X[:200]
+    if not np.allclose([compiled.predict_proba_one(row) for row in sample], forest.predict_proba(sample), atol=1e-6):
+        raise ValueError("Compiled forest disagrees with the sklearn model")
+
+    save_compiled(compiled, NUMERIC_MODEL_PATH)
+    print(f"Saved numeric model to {NUMERIC_MODEL_PATH} (hold-out accuracy {accuracy:.3f})")
+    return {"accuracy": accuracy}
+
+
+if __name__ == "__main__":
+    train_numeric_and_save()
@@ -0,0 +1,209 @@
+"""
+In-process registry for the crop recommendation artifacts.
+
+The model and label encoder are deserialized once per worker and kept in memory.
+Retraining publishes each version to its own directory (core/ml/versions/<version>/)
+and then renames one pointer file, current.json, to name it; without a pointer the
+bundled artifacts next to this module are served. Each lookup only stats the pointer
+and the artifact files; when those change the files are hashed and, if the content
+really differs, both artifacts are reloaded and swapped in together so callers never
+see a model paired with a stale encoder.
+
+The precomputed prediction table (see ``lookup.py``) is tracked the same way but
+loaded separately, so serving from it never imports sklearn.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .lookup import LOOKUP_PATH
+
+
+APP_ROOT = pathlib.Path(__file__).resolve().parent
+MODEL_PATH = APP_ROOT / "crop_model.joblib"
+LABEL_ENCODER_PATH = APP_ROOT / "label_encoder.joblib"
+# {"version": ..., "dir": "versions/<version>"}, replaced in one rename by train_model
+CURRENT_PATH = APP_ROOT / "current.json"
+
+Paths = Tuple[pathlib.Path, pathlib.Path, pathlib.Path]  # model, label encoder, lookup table
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    model: Any
+    label_encoder: Any
+    signature: Tuple[Any, ...]
+    content_hash: str
+    loaded_at: float
+
+
+def _stat_signature(paths: Tuple[pathlib.Path, ...]) -> Optional[Tuple[Any, ...]]:
+    """The paths with their mtime/size, or None if any is missing."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        sig.append((str(path), st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _update_digest(digest, path: pathlib.Path) -> None:
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+
+
+def _content_hash(paths: Tuple[pathlib.Path, ...]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        _update_digest(digest, path)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Loads the model artifacts lazily and reloads them only when they change on disk."""
+
+    def __init__(self, model_path: pathlib.Path = MODEL_PATH,
+                 label_encoder_path: pathlib.Path = LABEL_ENCODER_PATH,
+                 lookup_path: pathlib.Path = LOOKUP_PATH,
+                 current_path: pathlib.Path = CURRENT_PATH) -> None:
+        self.bundled: Paths = (pathlib.Path(model_path), pathlib.Path(label_encoder_path), pathlib.Path(lookup_path))
+        self.current_path = pathlib.Path(current_path)
+        # (pointer stat, paths it names)
+        self._current: Tuple[Optional[Tuple[int, int, int]], Paths] = (None, self.bundled)
+        self._bundle: Optional[ModelBundle] = None
+        # (signature, table or None when missing/stale)
+        self._lookup: Tuple[Optional[Tuple[Any, ...]], Any] = (None, None)
+        self._lock = threading.Lock()  # held while (re)loading, which can take seconds
+        self._stats_lock = threading.Lock()  # counters only, so cache hits never wait on a reload
+        self.load_count = 0
+        self.load_seconds_total = 0.0
+        self.last_load_seconds = 0.0
+        self.lookup_load_count = 0
+        self.hits = 0
+
+    def artifact_paths(self) -> Paths:
+        """(model, label encoder, lookup table) of the published version; the bundled files without a pointer."""
+        try:
+            st = os.stat(self.current_path)
+        except OSError:
+            return self.bundled
+        pointer = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached, paths = self._current
+        if cached == pointer:
+            return paths
+        try:
+            directory = self.current_path.parent / json.loads(self.current_path.read_text(encoding="utf-8"))["dir"]
+            paths = tuple(directory / p.name for p in self.bundled)
+        except (OSError, ValueError, KeyError, TypeError):
+            paths = self.bundled
+        self._current = (pointer, paths)
+        return paths
+
+    def available(self) -> bool:
+        return _stat_signature(self.artifact_paths()[:2]) is not None
+
+    def get(self) -> Optional[ModelBundle]:
+        """Return the current bundle, reloading first if the artifacts changed. None if missing."""
+        paths = self.artifact_paths()[:2]
+        sig = _stat_signature(paths)
+        if sig is None:
+            return None
+        bundle = self._bundle
+        if bundle is not None and bundle.signature == sig:
+            self._hit()
+            return bundle
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            bundle = self._bundle
+            if bundle is not None and bundle.signature == sig:
+                self._hit()
+                return bundle
+            self._bundle = self._load(paths, sig, bundle)
+            return self._bundle
+
+    def _hit(self) -> None:
+        with self._stats_lock:
+            self.hits += 1
+
+    def _load(self, paths: Tuple[pathlib.Path, ...], sig: Tuple[Any, ...],
+              current: Optional[ModelBundle]) -> ModelBundle:
+        content_hash = _content_hash(paths)
+        if current is not None and current.content_hash == content_hash:
+            # Touched but identical (e.g. copied back in place): keep the loaded objects
+            return ModelBundle(current.model, current.label_encoder, sig, content_hash, current.loaded_at)
+
+        import joblib  # type: ignore
+
+        started = time.perf_counter()
+        model = joblib.load(paths[0])
+        label_encoder = joblib.load(paths[1])
+        elapsed = time.perf_counter() - started
+
+        self.load_count += 1
+        self.last_load_seconds = elapsed
+        self.load_seconds_total += elapsed
+        return ModelBundle(model, label_encoder, sig, content_hash, time.time())
+
+    def get_lookup(self):
+        """
+        Return the precomputed LookupTable for the current model, or None if it is
+        missing or was built from a different model file than the one on disk.
+        """
+        model_path, _encoder_path, lookup_path = self.artifact_paths()
+        sig = _stat_signature((model_path, lookup_path))
+        if sig is None:
+            return None
+        cached_sig, table = self._lookup
+        if cached_sig == sig:
+            return table
+        with self._lock:
+            cached_sig, table = self._lookup
+            if cached_sig != sig:
+                from .lookup import load_lookup_table
+
+                try:
+                    table = load_lookup_table(lookup_path)
+                except (OSError, ValueError, KeyError):
+                    table = None
+                if table is not None:
+                    digest = hashlib.sha256()
+                    _update_digest(digest, model_path)
+                    if table.model_sha256 != digest.hexdigest():
+                        table = None
+                    else:
+                        self.lookup_load_count += 1
+                self._lookup = (sig, table)
+            return table
+
+    def clear(self) -> None:
+        with self._lock:
+            self._current = (None, self.bundled)
+            self._bundle = None
+            self._lookup = (None, None)
+
+    def stats(self) -> Dict[str, Any]:
+        bundle = self._bundle
+        return {
+            "loads": self.load_count,
+            "lookup_loads": self.lookup_load_count,
+            "hits": self.hits,
+            "last_load_ms": round(self.last_load_seconds * 1000, 2),
+            "total_load_ms": round(self.load_seconds_total * 1000, 2),
+            "loaded_at": bundle.loaded_at if bundle else None,
+            "content_hash": bundle.content_hash[:12] if bundle else None,
+            "pid": os.getpid(),
+        }
+
+
+# Process-wide registry used by the views
+registry = ModelRegistry()
@@ -1,8 +1,15 @@
+import datetime
+import hashlib
+import json
 import os
 import pathlib
-from typing import List
+import shutil
+import sys
+from typing import Callable, Dict, Optional
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.preprocessing import LabelEncoder
 from sklearn.tree import DecisionTreeClassifier
 import joblib
@@ -13,53 +20,135 @@ APP_ROOT = PROJECT_ROOT / "core" / "ml"
 DATA_PATH = APP_ROOT / "data" / "crop_dataset.csv"
 MODEL_PATH = APP_ROOT / "crop_model.joblib"
 LABEL_ENCODER_PATH = APP_ROOT / "label_encoder.joblib"
-
-
-SOIL_ORDER: List[str] = ["clay", "sandy", "loamy", "silt", "peat", "chalk"]
-SEASON_ORDER: List[str] = ["winter", "summer", "monsoon"]
-RAINFALL_ORDER: List[str] = ["low", "medium", "high"]
-
-
-def one_hot_row(soil: str, season: str, rainfall: str) -> List[int]:
-    features: List[int] = []
-    for value, allowed in [
-        (soil, SOIL_ORDER),
-        (season, SEASON_ORDER),
-        (rainfall, RAINFALL_ORDER),
-    ]:
-        for category in allowed:
-            features.append(1 if value == category else 0)
-    return features
-
-
-def train_and_save() -> None:
-    if not DATA_PATH.exists():
+VERSIONS_DIR = APP_ROOT / "versions"
+KEEP_VERSIONS = 5
+
+if __package__ in (None, ""):
+    # Allow running as a plain script: python core/ml/train_model.py
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.ml.features import (  # noqa: E402,F401
+    CATEGORICAL_ORDERS, SOIL_ORDER, SEASON_ORDER, RAINFALL_ORDER, one_hot_row,
+)
+from core.ml.ingest import dataset_files, read_dataset  # noqa: E402
+from core.ml.lookup import LOOKUP_PATH, build_lookup_table, save_lookup_table, verify_lookup_table  # noqa: E402
+from core.ml.registry import CURRENT_PATH  # noqa: E402
+
+
+def _normalized_codes(column: pd.Series, order) -> np.ndarray:
+    """
+    Position of each value in `order` after strip/lower, or -1 when it is not a known category.
+
+    Normalization runs once per distinct value (on the categorical dtype's categories),
+    not once per row.
+    """
+    cat = column if isinstance(column.dtype, pd.CategoricalDtype) else column.astype("category")
+    names = pd.Index(cat.cat.categories.astype(str)).str.strip().str.lower()
+    per_category = pd.Index(order).get_indexer(names)
+    # cat.codes is -1 for missing values; the appended -1 maps those to "unknown"
+    lookup = np.append(per_category, -1)
+    return lookup[cat.cat.codes.to_numpy()]
+
+
+def encode_dataset(df: pd.DataFrame, as_sparse: bool = True):
+    """
+    Vectorized equivalent of applying one_hot_row to every row of df.
+
+    Returns a CSR matrix (or a dense int8 array with as_sparse=False) with one column per
+    category in CATEGORICAL_ORDERS order. Unknown values leave their block all zeros,
+    exactly like one_hot_row.
+    """
+    n_rows = len(df)
+    rows, cols = [], []
+    offset = 0
+    for field, order in CATEGORICAL_ORDERS:
+        codes = _normalized_codes(df[field], order)
+        known = codes >= 0
+        rows.append(np.flatnonzero(known))
+        cols.append(codes[known] + offset)
+        offset += len(order)
+    row_idx = np.concatenate(rows)
+    col_idx = np.concatenate(cols)
+    X = sparse.csr_matrix(
+        (np.ones(len(row_idx), dtype=np.int8), (row_idx, col_idx)),
+        shape=(n_rows, offset),
+    )
+    return X if as_sparse else X.toarray()
+
+
+def _publish(version: str) -> None:
+    """Point the registry at versions/<version>: one rename swaps model, encoder and lookup together."""
+    payload = {"version": version, "dir": f"{VERSIONS_DIR.name}/{version}",
+               "published_at": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+    tmp_path = CURRENT_PATH.with_name(f".{CURRENT_PATH.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp_path, CURRENT_PATH)
+
+
+def _prune_versions(current: str, keep: int = KEEP_VERSIONS) -> None:
+    if not VERSIONS_DIR.exists():
+        return
+    versions = sorted(p for p in VERSIONS_DIR.iterdir() if p.is_dir() and p.name != current)
+    for old in versions[:max(0, len(versions) - (keep - 1))]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def train_and_save(progress: Optional[Callable[[int, str], None]] = None,
+                   version: Optional[str] = None) -> Dict[str, object]:
+    """
+    Train the categorical model and publish it.
+
+    Artifacts are written to core/ml/versions/<version>/. Only after the whole run
+    (including the lookup-table check) succeeds is the version published, by replacing
+    core/ml/current.json in one rename, so no reader can pair the new encoder with the old
+    model. The registry picks up the change on the next request.
+    """
+    def report(pct: int, stage: str) -> None:
+        if progress is not None:
+            progress(pct, stage)
+
+    if not dataset_files(DATA_PATH):
         raise FileNotFoundError(f"Dataset not found at {DATA_PATH}. Please add a CSV with columns: soil_type,season,rainfall_level,crop")
 
-    df = pd.read_csv(DATA_PATH)
-    required_cols = {"soil_type", "season", "rainfall_level", "crop"}
-    if not required_cols.issubset(df.columns):
-        raise ValueError(f"Dataset must contain columns: {required_cols}")
+    report(5, "Reading dataset")
+    # The base CSV plus uploaded segments, as categorical columns; ValueError if a column is missing
+    df = read_dataset(DATA_PATH)
 
-    X = [
-        one_hot_row(str(row["soil_type"]).strip().lower(),
-                    str(row["season"]).strip().lower(),
-                    str(row["rainfall_level"]).strip().lower())
-        for _, row in df.iterrows()
-    ]
+    report(20, "Encoding features")
+    X = encode_dataset(df)
 
     label_encoder = LabelEncoder()
     y = label_encoder.fit_transform(df["crop"].astype(str).str.strip().str.lower())
 
+    report(40, "Fitting model")
     model = DecisionTreeClassifier(max_depth=None, random_state=42)
     model.fit(X, y)
-
-    APP_ROOT.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    joblib.dump(label_encoder, LABEL_ENCODER_PATH)
-
-    print(f"Saved model to {MODEL_PATH}")
-    print(f"Saved label encoder to {LABEL_ENCODER_PATH}")
+    accuracy = float(model.score(X, y))
+
+    report(70, "Writing versioned artifacts")
+    version = version or datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    version_dir = VERSIONS_DIR / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    staged_model = version_dir / MODEL_PATH.name
+    staged_encoder = version_dir / LABEL_ENCODER_PATH.name
+    staged_lookup = version_dir / LOOKUP_PATH.name
+    joblib.dump(model, staged_model)
+    joblib.dump(label_encoder, staged_encoder)
+
+    report(80, "Building prediction lookup table")
+    # Dense prediction table for the serving path, tied to the exact model bytes being published
+    model_sha256 = hashlib.sha256(staged_model.read_bytes()).hexdigest()
+    table = build_lookup_table(model, label_encoder, version=version, model_sha256=model_sha256)
+    verify_lookup_table(table, model, label_encoder)
+    save_lookup_table(table, staged_lookup)
+
+    report(90, "Publishing")
+    _publish(version)
+    _prune_versions(version)
+
+    print(f"Published version {version} ({staged_model}, {staged_encoder.name}, {staged_lookup.name})")
+    report(100, "Done")
+    return {"version": version, "accuracy": accuracy, "rows": len(df)}
 
 
 if __name__ == "__main__":
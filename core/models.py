@@ -22,6 +22,14 @@ class Tip(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Category browsing, newest first; text, crop and season filters go through core_tip_fts
+            models.Index(fields=["category", "-id"], name="tip_category_id"),
+            # Admin changelist (ordered by -created_at, -pk), optionally narrowed by its category/season/date filters
+            models.Index(fields=["-created_at", "-id"], name="tip_created"),
+            models.Index(fields=["category", "-created_at", "-id"], name="tip_category_created"),
+            models.Index(fields=["season", "-created_at", "-id"], name="tip_season_created"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover
         return self.title
@@ -35,6 +43,205 @@ class ContactMessage(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='contactmessage_created'),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.name} <{self.email}>"
+
+
+class TrainingJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="0-100")
+    stage = models.CharField(max_length=120, blank=True)
+    version = models.CharField(max_length=32, blank=True, help_text="Artifact version produced by this run")
+    accuracy = models.FloatField(null=True, blank=True, help_text="Training-set accuracy of the new model")
+    rows = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(auto_now_add=True, help_text="Last progress report or heartbeat from the worker running this job")
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # At most one queued or running job, however many requests race to enqueue one
+            models.UniqueConstraint(models.Value(True), condition=models.Q(status__in=['queued', 'running']),
+                                    name='trainingjob_one_active'),
+        ]
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (self.STATUS_QUEUED, self.STATUS_RUNNING)
+
+    @property
+    def duration_seconds(self) -> float | None:
+        if not self.started_at:
+            return None
+        from django.utils import timezone
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"TrainingJob #{self.pk} ({self.status})"
+
+
+class CropPrice(models.Model):
+    """One mandi price observation, parsed to a numeric value at ingest time."""
+    date = models.DateField()
+    state = models.CharField(max_length=64, blank=True, default="Gujarat")
+    market = models.CharField(max_length=120)
+    commodity = models.CharField(max_length=120)
+    variety = models.CharField(max_length=120, blank=True)
+    price = models.FloatField(null=True, blank=True, help_text="Modal price in ₹/quintal")
+    price_text = models.CharField(max_length=64, blank=True, help_text="Price as published")
+    source = models.CharField(max_length=120, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last load or edit of this row")
+
+    class Meta:
+        ordering = ['-date', 'commodity', 'market']
+        constraints = [
+            # One row per observation: re-loading a file upserts (see load_market_data)
+            models.UniqueConstraint(fields=['date', 'market', 'commodity', 'variety', 'source'],
+                                    name='cropprice_unique_observation'),
+        ]
+        # The market page matches market/commodity substrings (icontains) within the latest date, so
+        # it is served by the date-leading indexes; the commodity/market ones serve exact lookups.
+        indexes = [
+            models.Index(fields=['commodity', 'market', '-date'], name='cropprice_commodity_market'),
+            models.Index(fields=['market', '-date'], name='cropprice_market_date'),
+            models.Index(fields=['-date', 'commodity'], name='cropprice_date_commodity'),
+            models.Index(fields=['state', '-date'], name='cropprice_state_date'),
+            models.Index(fields=['source'], name='cropprice_source'),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.commodity} @ {self.market} {self.date}: {self.price}"
+
+
+class RainfallReading(models.Model):
+    """Rainfall for a region over a reporting period, parsed to millimetres at ingest time."""
+    date = models.DateField()
+    region = models.CharField(max_length=120)
+    rainfall_mm = models.FloatField(null=True, blank=True)
+    period = models.CharField(max_length=64, blank=True)
+    source = models.CharField(max_length=120, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last load or edit of this row")
+
+    class Meta:
+        ordering = ['-date', '-rainfall_mm']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'region', 'period', 'source'], name='rainfall_unique_reading'),
+        ]
+        indexes = [
+            models.Index(fields=['region', '-date'], name='rainfall_region_date'),
+            models.Index(fields=['-date', '-rainfall_mm'], name='rainfall_date_mm'),
+            models.Index(fields=['source'], name='rainfall_source'),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.region} {self.date}: {self.rainfall_mm} mm"
+
+
+class QueryEvent(models.Model):
+    """One user query (crop suggestion or market data filter), written in batches by core.telemetry."""
+    KIND_SUGGESTION = "suggestion"
+    KIND_MARKET = "market"
+    KIND_CHOICES = [
+        (KIND_SUGGESTION, "Crop suggestion"),
+        (KIND_MARKET, "Market data"),
+    ]
+
+    created_at = models.DateTimeField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    region = models.CharField(max_length=120, blank=True)
+    crop = models.CharField(max_length=120, blank=True)
+    detail = models.CharField(max_length=255, blank=True, help_text="Compact inputs, e.g. soil/season/rainfall or the price filter")
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', '-created_at'], name='queryevent_kind_created'),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.kind} {self.created_at:%Y-%m-%d %H:%M} {self.region or self.crop}"
+
+
+class QueryRollup(models.Model):
+    """Daily query counts per (kind, dimension, key), incremented on every telemetry flush."""
+    day = models.DateField()
+    kind = models.CharField(max_length=16, choices=QueryEvent.KIND_CHOICES)
+    dimension = models.CharField(max_length=16)  # "region", "crop" or "query"
+    key = models.CharField(max_length=120)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', '-count']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'kind', 'dimension', 'key'], name='queryrollup_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', '-day'], name='queryrollup_dimension_day'),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.day} {self.kind}/{self.dimension}={self.key}: {self.count}"
+
+
+class Scheme(models.Model):
+    """One row of the government schemes table as last scraped (see scrapers.schemes.refresh_schemes)."""
+    position = models.PositiveIntegerField()
+    serial = models.CharField(max_length=16, blank=True)
+    department = models.CharField(max_length=255, blank=True)
+    title = models.CharField(max_length=500)
+    url = models.URLField(max_length=500, blank=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['position'], name='scheme_position'),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.title
+
+
+class SchemeSnapshot(models.Model):
+    """
+    Outcome of one schemes refresh; the newest successful one dates the stored Scheme rows.
+    A run of failures shares one row, updated by each retry.
+    """
+    checked_at = models.DateTimeField(auto_now_add=True)
+    ok = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=64, blank=True, help_text="Hash of the whole list, in order")
+    items = models.PositiveIntegerField(default=0)
+    changed = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    failures = models.PositiveIntegerField(default=0, help_text="Consecutive failed refreshes this row stands for")
+
+    class Meta:
+        ordering = ['-checked_at']
+        indexes = [
+            models.Index(fields=['ok', '-checked_at'], name='schemesnapshot_ok_checked'),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.checked_at:%Y-%m-%d %H:%M} {'ok' if self.ok else 'failed'} ({self.items} items)"
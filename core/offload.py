@@ -0,0 +1,68 @@
+"""
+Executor offload for CPU-bound and blocking work called from async views.
+
+An async view runs on the server's event loop, so anything that computes or blocks for
+more than a moment stalls every other request on that worker. Such work goes through
+here:
+
+- `run_cpu()` runs a function on a small, bounded thread pool. That suits pandas,
+  NumPy and the compiled model (their inner loops release the GIL) and blocking file
+  reads such as CSV, Parquet and model loads;
+- matplotlib holds the GIL throughout, so charts are drawn in the pre-render process
+  pool instead (`analytics.prerender.submit`, awaited with `wrap()`).
+
+Offloaded functions must not use the ORM: these threads are not managed by Django and
+would leak connections. Query with the async ORM (``aget``, ``acount``, ``async for``)
+in the view and offload only the computation.
+
+Optional settings:
+    OFFLOAD_THREADS  threads for run_cpu (default min(4, CPU count))
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _workers() -> int:
+    return max(1, int(getattr(settings, "OFFLOAD_THREADS", min(4, os.cpu_count() or 1))))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="cpu-offload")
+        return _executor
+
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await fn(*args, **kwargs) run on the offload pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def wrap(future: Future) -> Any:
+    """Await a concurrent.futures.Future, e.g. one from a process pool."""
+    return await asyncio.wrap_future(future)
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,180 @@
+"""
+Response cache for the anonymous public pages (home, tips, market data, schemes).
+
+Views opt in with `@cached_page(...)`, naming the data groups the page is built from and
+the query parameters it reads; PageCacheMiddleware then serves repeat GET/HEAD requests
+from the cache without running the view:
+
+- the key is the view plus its declared parameters, stripped, with blanks dropped and
+  sorted, so ``?crop=wheat&q=`` and ``?crop=wheat&utm_source=x`` share one entry;
+- only anonymous requests with no pending flash messages are served or stored, and only
+  plain 200 responses that set no cookies and flashed no messages are stored;
+- every response carries an ETag; a request whose If-None-Match matches gets a 304, and
+  on a hit that costs a single cache read.
+
+`invalidate(*groups)` drops every page built from those groups (no groups: every page).
+It is called when the data changes: Tip, CropPrice and RainfallReading save/delete
+(core.signals), dataset upload, price and rainfall loads, and schemes refreshes. Each
+group has a generation token in the cache and page keys embed the tokens of their
+groups, so invalidation is one write and old pages simply age out. `generation(*groups)`
+exposes the same token to other caches keyed on that data (core.analytics.aggregates).
+
+Invalidation only reaches processes sharing the cache. With the default local-memory
+backend each worker has its own copy and refreshes run from cron (management commands)
+are only picked up after PAGE_CACHE_TIMEOUT; use a file (or other shared) backend for
+PAGE_CACHE_ALIAS to have them apply at once.
+
+Optional settings:
+    PAGE_CACHE_ALIAS    CACHES alias holding the pages (default "default")
+    PAGE_CACHE_TIMEOUT  seconds a page may be served (default 600; 0 disables the cache)
+"""
+from __future__ import annotations
+
+import hashlib
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import urlencode
+
+ALL = "*"  # generation shared by every page
+DEFAULT_TIMEOUT = 600
+
+
+@dataclass(frozen=True)
+class PageSpec:
+    groups: Tuple[str, ...]
+    params: Tuple[str, ...]
+    on_hit: Optional[Callable] = None  # side effects the view has besides rendering, e.g. telemetry
+
+
+def cached_page(*groups: str, params: Tuple[str, ...] = (), on_hit: Optional[Callable] = None):
+    """Mark a view as cacheable for anonymous visitors; see the module docstring."""
+    def mark(view):
+        view.page_cache = PageSpec(tuple(groups), tuple(sorted(params)), on_hit)
+        return view
+    return mark
+
+
+def _cache():
+    from django.core.cache import caches
+
+    return caches[getattr(settings, "PAGE_CACHE_ALIAS", "default")]
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "PAGE_CACHE_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def _gen_key(group: str) -> str:
+    return f"page-cache:gen:{group}"
+
+
+def invalidate(*groups: str) -> None:
+    """Drop the cached pages built from any of groups, or every cached page when none are given."""
+    cache = _cache()
+    cache.set_many({_gen_key(g): uuid.uuid4().hex for g in (groups or (ALL,))}, None)
+
+
+def generation(*groups: str) -> str:
+    """Token that changes whenever any of groups (or every page) is invalidated."""
+    return _generations(_cache(), tuple(groups))
+
+
+def _generations(cache, groups: Tuple[str, ...]) -> str:
+    names = (ALL,) + groups
+    found = cache.get_many([_gen_key(g) for g in names])
+    tokens = []
+    for group in names:
+        token = found.get(_gen_key(group))
+        if token is None:
+            # Never seen, or evicted: start a new generation rather than reuse an old one
+            token = uuid.uuid4().hex
+            if not cache.add(_gen_key(group), token, None):
+                token = cache.get(_gen_key(group), token)
+        tokens.append(token)
+    return ".".join(tokens)
+
+
+def normalized_query(query, params: Tuple[str, ...]) -> str:
+    pairs = []
+    for name in params:
+        value = (query.get(name) or "").strip()
+        if value:
+            pairs.append((name, value))
+    return urlencode(pairs)
+
+
+def page_key(request, view, spec: PageSpec, cache=None) -> str:
+    cache = cache or _cache()
+    url = f"{request.get_host()}{request.path}?{normalized_query(request.GET, spec.params)}"
+    digest = hashlib.md5(url.encode("utf-8")).hexdigest()
+    return f"page-cache:{view.__module__}.{view.__name__}:{_generations(cache, spec.groups)}:{digest}"
+
+
+def _pending_messages(request) -> bool:
+    storage = getattr(request, "_messages", None)
+    return storage is not None and (storage.used or len(storage) > 0)
+
+
+def _cacheable_request(request) -> bool:
+    if request.method not in ("GET", "HEAD"):
+        return False
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return False
+    return not _pending_messages(request)
+
+
+def _cacheable_response(request, response) -> bool:
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    if "private" in response.get("Cache-Control", "") or "no-store" in response.get("Cache-Control", ""):
+        return False
+    return not _pending_messages(request)
+
+
+def _etag(content: bytes) -> str:
+    return '"%s"' % hashlib.md5(content).hexdigest()
+
+
+def _finish(request, response, etag: str, state: str):
+    response["ETag"] = etag
+    # Browsers keep the page but revalidate it every time; the 304 costs one cache lookup
+    patch_cache_control(response, no_cache=True)
+    response["X-Page-Cache"] = state
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+class PageCacheMiddleware(MiddlewareMixin):
+    """
+    Serves and stores @cached_page views. Place it after the auth and messages middleware.
+    MiddlewareMixin makes it usable from both WSGI and ASGI (async views) handlers.
+    """
+
+    def process_response(self, request, response):
+        key = getattr(request, "_page_cache_key", None)
+        if key is None or not _cacheable_response(request, response):
+            return response
+        etag = _etag(response.content)
+        _cache().set(key, (response.content, response["Content-Type"], etag), _timeout())
+        return _finish(request, response, etag, "miss")
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        spec = getattr(view_func, "page_cache", None)
+        if spec is None or _timeout() <= 0 or not _cacheable_request(request):
+            return None
+        cache = _cache()
+        key = page_key(request, view_func, spec, cache)
+        stored = cache.get(key)
+        if stored is None:
+            request._page_cache_key = key
+            return None
+        content, content_type, etag = stored
+        if spec.on_hit is not None:
+            spec.on_hit(request)
+        return _finish(request, HttpResponse(content, content_type=content_type), etag, "hit")
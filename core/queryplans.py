@@ -0,0 +1,122 @@
+"""
+Query-plan checks for the hot ORM queries.
+
+`hot_queries()` builds the querysets behind the busiest pages: the tips listing, the Tip
+and ContactMessage admin changelists (newest first, narrowed by each list_filter) and the
+admin's filter choices. `check()` runs EXPLAIN on each and reports the plan lines that
+read a whole table or sort it:
+
+    sqlite       SCAN <table> without an index, USE TEMP B-TREE FOR ORDER BY / DISTINCT
+    postgresql   Seq Scan, Sort
+
+Walking a table in key order is accepted where it stops after one page: an index-ordered
+``SCAN <table> USING INDEX``, and a bare primary-key SCAN for unfiltered listings with a
+LIMIT. The test suite fails when any hot query regresses; after changing a model's
+indexes or one of these queries, look at the plans with
+
+    python core/queryplans.py
+"""
+from __future__ import annotations
+
+import datetime
+import os
+import pathlib
+import re
+import sys
+from typing import Callable, Dict, List, Optional
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if __package__ in (None, ""):
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Plan lines that mean a full table read or a full sort, per database vendor
+FULL_SCAN_PATTERNS = {
+    "sqlite": (
+        re.compile(r"\bSCAN (?!.*\bUSING\b)(?!.*\bVIRTUAL TABLE\b)\S+"),
+        re.compile(r"\bUSE TEMP B-TREE FOR (?!RIGHT PART\b)(ORDER BY|DISTINCT|GROUP BY)"),
+    ),
+    "postgresql": (
+        re.compile(r"\bSeq Scan on\b"),
+        re.compile(r"^\W*Sort\b"),
+    ),
+}
+
+
+def hot_queries() -> Dict[str, Callable[[], object]]:
+    from django.utils import timezone
+
+    from core.models import ContactMessage, Tip
+    from core.tip_search import PAGE_SIZE
+
+    since = timezone.now() - datetime.timedelta(days=7)
+    # The admin orders changelists by Meta.ordering plus -pk and shows 100 rows a page
+    tip_admin = Tip.objects.order_by("-created_at", "-pk")
+    return {
+        # /tips/ without a text query (core.tip_search), newest first by id
+        "tips.latest": lambda: Tip.objects.order_by("-id")[:PAGE_SIZE + 1],
+        "tips.category": lambda: Tip.objects.filter(category="soil").order_by("-id")[:PAGE_SIZE + 1],
+        "tips.next_page": lambda: Tip.objects.filter(category="soil", id__lt=1000).order_by("-id")[:PAGE_SIZE + 1],
+        "tips.by_id": lambda: Tip.objects.filter(pk__in=[1, 2, 3]).order_by(),  # in_bulk()
+        "admin.tip": lambda: tip_admin[:100],
+        "admin.tip.category": lambda: tip_admin.filter(category="soil")[:100],
+        "admin.tip.season": lambda: tip_admin.filter(season="Winter")[:100],
+        "admin.tip.created_at": lambda: tip_admin.filter(created_at__gte=since)[:100],
+        "admin.tip.category.count": lambda: Tip.objects.filter(category="soil").order_by().values("pk"),
+        "admin.tip.season.choices": lambda: Tip.objects.distinct().order_by("season").values_list("season"),
+        "admin.contactmessage": lambda: ContactMessage.objects.order_by("-created_at", "-pk")[:100],
+        "admin.contactmessage.created_at": lambda: (
+            ContactMessage.objects.filter(created_at__gte=since).order_by("-created_at", "-pk")[:100]
+        ),
+    }
+
+
+def explain(queryset) -> List[str]:
+    """The database's plan for queryset, one line per step."""
+    return [line.strip() for line in queryset.explain().splitlines() if line.strip()]
+
+
+def full_scans(plan: List[str], vendor: str, limited_walk: bool = False) -> List[str]:
+    """Plan lines that read or sort a whole table; limited_walk accepts a bare table SCAN."""
+    patterns = FULL_SCAN_PATTERNS.get(vendor, ())
+    if limited_walk:
+        patterns = patterns[1:]
+    return [line for line in plan if any(p.search(line) for p in patterns)]
+
+
+def _limited_walk(queryset) -> bool:
+    # No WHERE and a LIMIT: the scan stops after one page of rows in key order
+    return not queryset.query.where and queryset.query.high_mark is not None
+
+
+def scan_report(queryset) -> List[str]:
+    from django.db import connection
+
+    return full_scans(explain(queryset), connection.vendor, _limited_walk(queryset))
+
+
+def check(names: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """EXPLAIN each hot query (or just names); returns {name: offending plan lines} for regressions."""
+    queries = hot_queries()
+    failures = {}
+    for name in names or list(queries):
+        bad = scan_report(queries[name]())
+        if bad:
+            failures[name] = bad
+    return failures
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "agrosmart.settings")
+    import django
+
+    django.setup()
+
+    failed = False
+    for name, build in hot_queries().items():
+        plan = explain(build())
+        bad = scan_report(build())
+        failed = failed or bool(bad)
+        print(f"{'FULL SCAN' if bad else 'ok':<10}{name}")
+        for line in plan:
+            print(f"{'':<10}  {line}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,78 @@
+"""
+Compare the HTML table backends used by the scrapers.
+
+Each saved page is parsed repeatedly with every installed backend and the throughput is
+reported in table rows per second. Without arguments the bundled fixtures are used, with
+their table bodies replicated to --rows rows so the numbers resemble a full mandi listing.
+
+    python core/scrapers/benchmark_tables.py [--rows 2000] [page.html ...]
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if __package__ in (None, ""):
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from django.conf import settings  # noqa: E402
+
+if not settings.configured:
+    settings.configure()
+
+from core.scrapers.tables import available_backends, extract_rows  # noqa: E402
+
+TESTDATA = PROJECT_ROOT / "core" / "testdata"
+
+
+def _replicate(html: str, rows: int) -> str:
+    """Repeat the data rows of the first <tbody> until it holds about `rows` rows."""
+    match = re.search(r"<tbody>(.*?)</tbody>", html, re.S)
+    if match is None:
+        return html
+    body = match.group(1)
+    count = max(body.count("<tr"), 1)
+    return html[:match.start(1)] + body * max(1, rows // count) + html[match.end(1):]
+
+
+def _pages(paths: List[str], rows: int) -> List[Tuple[str, str]]:
+    if paths:
+        return [(pathlib.Path(p).name, pathlib.Path(p).read_text(encoding="utf-8", errors="replace"))
+                for p in paths]
+    return [(f"mandi_prices.html x{rows}", _replicate((TESTDATA / "mandi_prices.html").read_text(encoding="utf-8"), rows))]
+
+
+def run(paths: Optional[List[str]] = None, rows: int = 2000, min_seconds: float = 0.5) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for page, html in _pages(paths or [], rows):
+        for backend in available_backends():
+            extract_rows(html, backend=backend)  # warm up imports
+            n = found = 0
+            started = time.perf_counter()
+            while True:
+                found = len(extract_rows(html, backend=backend))
+                n += 1
+                elapsed = time.perf_counter() - started
+                if elapsed >= min_seconds:
+                    break
+            results[f"{page} [{backend}]"] = {
+                "rows": found,
+                "ms_per_page": elapsed / n * 1000.0,
+                "rows_per_s": found * n / elapsed,
+            }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("pages", nargs="*", help="saved HTML pages (default: bundled fixture)")
+    parser.add_argument("--rows", type=int, default=2000, help="rows to replicate the fixture to")
+    args = parser.parse_args()
+    print(f"{'page [backend]':<44}{'rows':>8}{'ms/page':>10}{'rows/s':>12}")
+    for name, res in run(args.pages, args.rows).items():
+        print(f"{name:<44}{res['rows']:>8}{res['ms_per_page']:>10.2f}{res['rows_per_s']:>12.0f}")
@@ -0,0 +1,209 @@
+"""
+Pool of long-lived headless browser sessions for scrapers that need JavaScript.
+
+Starting Chrome (and resolving its driver) costs seconds, so sessions are created
+lazily up to `max_size` and reused. Before a session is handed out it gets a cheap
+health check; a session that fails it, raised an error while in use, or has served
+`max_uses` pages is quit and replaced. Callers that find every session busy wait up to
+`acquire_timeout` seconds.
+
+Optional settings:
+    SCRAPER_BROWSER_POOL_SIZE        concurrent browser sessions (default 2)
+    SCRAPER_BROWSER_MAX_USES         pages served before a session is recycled (default 50)
+    SCRAPER_BROWSER_ACQUIRE_TIMEOUT  seconds to wait for a free session (default 30)
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPoolTimeout(RuntimeError):
+    pass
+
+
+@dataclass
+class BrowserSession:
+    driver: Any
+    uses: int = 0
+
+
+@functools.lru_cache(maxsize=1)
+def _chromedriver_path() -> str:
+    # Resolved once per process: ChromeDriverManager checks/downloads on every call
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def chrome_driver() -> Any:
+    """Default factory: a headless Chrome session."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    options = ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.page_load_strategy = "eager"  # readiness is decided by an explicit element wait
+    return webdriver.Chrome(service=ChromeService(_chromedriver_path()), options=options)
+
+
+def _healthy(driver: Any) -> bool:
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver: Any) -> None:
+    try:
+        driver.quit()
+    except Exception:
+        logger.debug("Ignoring error while quitting browser", exc_info=True)
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        factory: Callable[[], Any] = chrome_driver,
+        max_size: int = 2,
+        max_uses: int = 50,
+        acquire_timeout: float = 30.0,
+    ) -> None:
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.max_uses = max(1, max_uses)
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[BrowserSession] = []
+        self._total = 0  # idle + checked out
+        self._cond = threading.Condition()
+        self.created = 0
+        self.recycled = 0
+
+    def _take(self) -> Optional[BrowserSession]:
+        """Pop an idle session or reserve a slot for a new one (None). Caller holds the lock."""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            if self._idle:
+                return self._idle.pop()
+            if self._total < self.max_size:
+                self._total += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise BrowserPoolTimeout(f"No browser session free after {self.acquire_timeout}s")
+            self._cond.wait(remaining)
+
+    def _discard(self, session: Optional[BrowserSession]) -> None:
+        if session is not None:
+            _quit(session.driver)
+            self.recycled += 1
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _checkout(self) -> BrowserSession:
+        while True:
+            with self._cond:
+                session = self._take()
+            if session is None:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    self._discard(None)
+                    raise
+                self.created += 1
+                return BrowserSession(driver)
+            if _healthy(session.driver):
+                return session
+            logger.info("Replacing unresponsive browser session")
+            self._discard(session)
+
+    def _checkin(self, session: BrowserSession, failed: bool) -> None:
+        session.uses += 1
+        if failed or session.uses >= self.max_uses:
+            self._discard(session)
+            return
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self) -> Iterator[Any]:
+        """Borrow a driver; it goes back to the pool (or is recycled) on exit."""
+        session = self._checkout()
+        failed = False
+        try:
+            yield session.driver
+        except BaseException:
+            # The page may be half-loaded or the browser wedged: don't hand it out again
+            failed = True
+            raise
+        finally:
+            self._checkin(session, failed)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+        for session in idle:
+            _quit(session.driver)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"idle": len(self._idle), "total": self._total, "created": self.created,
+                    "recycled": self.recycled}
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                max_size=getattr(settings, "SCRAPER_BROWSER_POOL_SIZE", 2),
+                max_uses=getattr(settings, "SCRAPER_BROWSER_MAX_USES", 50),
+                acquire_timeout=getattr(settings, "SCRAPER_BROWSER_ACQUIRE_TIMEOUT", 30),
+            )
+        return _pool
+
+
+def _close_pool() -> None:
+    if _pool is not None:
+        _pool.close()
+
+
+atexit.register(_close_pool)
+
+
+def fetch_rendered_html(url: str, ready_selector: str, timeout: float = 15.0, pool: Optional[BrowserPool] = None) -> str:
+    """Load url in a pooled browser and return the DOM once ready_selector matches (no fixed sleeps)."""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with (pool or get_browser_pool()).session() as driver:
+        driver.get(url)
+        try:
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+        except TimeoutException:
+            # The browser is fine, the page just never rendered what we wanted; let the parser decide
+            logger.warning("%s not found on %s after %ss", ready_selector, url, timeout)
+        return driver.page_source
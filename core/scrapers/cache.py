@@ -0,0 +1,122 @@
+"""
+Shared cache for parsed market-data source files (prices, rainfall).
+
+Parsed records are kept per worker in columnar form (one tuple per column) in a small
+LRU keyed on (path, mtime, size), so a CSV is only re-read when it changes on disk.
+Entries also expire after a TTL as a guard against coarse mtime resolution.
+
+Optional settings:
+    MARKET_DATA_CACHE_TTL          seconds an entry may be served (default 300)
+    MARKET_DATA_CACHE_MAX_ENTRIES  LRU size (default 16)
+    MARKET_DATA_CACHE_ALIAS        a Django CACHES alias used as a shared second level,
+                                   e.g. a file or Redis cache shared by all workers
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class ColumnarRecords:
+    """Immutable column-oriented table of string values."""
+    columns: Tuple[str, ...]
+    data: Tuple[Tuple[str, ...], ...]  # one tuple per column, all the same length
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def column(self, name: str) -> Tuple[str, ...]:
+        return self.data[self.columns.index(name)]
+
+    def rows(self, indices: Optional[Sequence[int]] = None) -> List[Dict[str, str]]:
+        """Materialize fresh dicts (all rows, or only the given positions)."""
+        if indices is None:
+            return [dict(zip(self.columns, values)) for values in zip(*self.data)]
+        return [{c: col[i] for c, col in zip(self.columns, self.data)} for i in indices]
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self.rows())
+
+    @classmethod
+    def from_frame(cls, df) -> "ColumnarRecords":
+        cols = tuple(str(c) for c in df.columns)
+        return cls(columns=cols, data=tuple(tuple(df[c].tolist()) for c in df.columns))
+
+
+Loader = Callable[[str], ColumnarRecords]
+
+
+class MarketDataCache:
+    def __init__(self, max_entries: int = 16, ttl: float = 300.0, backend_alias: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend_alias = backend_alias
+        self._entries: "OrderedDict[Tuple[str, str, int, int], Tuple[float, ColumnarRecords]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _backend(self):
+        if not self.backend_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.backend_alias]
+
+    def get(self, path: str, loader: Loader, namespace: str = "") -> Optional[ColumnarRecords]:
+        """
+        Return parsed records for path, calling loader(path) only when the file changed,
+        the entry expired or was evicted. Returns None if the file does not exist.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (namespace, str(path), st.st_mtime_ns, st.st_size)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        backend = self._backend()
+        backend_key = "market-data:%s:%s:%d:%d" % key
+        records = backend.get(backend_key) if backend is not None else None
+        if records is None:
+            records = loader(path)
+            if backend is not None:
+                backend.set(backend_key, records, timeout=self.ttl)
+
+        with self._lock:
+            self.misses += 1
+            # Drop entries for older versions of the same file right away
+            for stale in [k for k in self._entries if k[:2] == key[:2] and k != key]:
+                del self._entries[stale]
+            self._entries[key] = (now, records)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return records
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+market_cache = MarketDataCache(
+    max_entries=getattr(settings, "MARKET_DATA_CACHE_MAX_ENTRIES", 16),
+    ttl=getattr(settings, "MARKET_DATA_CACHE_TTL", 300),
+    backend_alias=getattr(settings, "MARKET_DATA_CACHE_ALIAS", None),
+)
@@ -0,0 +1,250 @@
+"""
+Shared asynchronous HTTP layer for the scrapers.
+
+One httpx.AsyncClient with keep-alive pooling lives on a dedicated event-loop thread for
+the whole process, so connections are reused across requests and callers. On top of it:
+
+- per-host concurrency limits (an asyncio.Semaphore per host),
+- retries with exponential backoff and jitter on connection errors, 429 and 5xx,
+- conditional GETs: ETag / Last-Modified from earlier responses are sent back, and a
+  304 answer is served from the remembered body.
+
+Sync code (views, management commands) calls `fetch_many()` / `fetch_text()`, which block
+only until the slowest of the concurrent requests finishes. Async code awaits
+`afetch_many()`.
+
+Without a deadline a dead source costs up to (retries + 1) x timeout plus backoff, about
+31 s with the defaults, which is fine for commands and background refreshes. Callers
+serving a page pass ``deadline=INTERACTIVE_DEADLINE``: every request then gives up, retries
+included, once that many seconds have passed, and the caller moves on to its fallback.
+
+Optional settings:
+    SCRAPER_HTTP_TIMEOUT        seconds per attempt (default 10)
+    SCRAPER_HTTP_PER_HOST       concurrent requests per host (default 4)
+    SCRAPER_HTTP_RETRIES        extra attempts after the first (default 2)
+    SCRAPER_HTTP_BACKOFF        base backoff in seconds, doubled per retry (default 0.5)
+    SCRAPER_HTTP_CACHE_ENTRIES  responses remembered for revalidation (default 256)
+    SCRAPER_HTTP_INTERACTIVE_DEADLINE
+                                total seconds a page waits on a fetch (default 4)
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36"
+}
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+INTERACTIVE_DEADLINE: float = getattr(settings, "SCRAPER_HTTP_INTERACTIVE_DEADLINE", 4.0)
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    url: str
+    status: int  # 0 when no response was received
+    text: str = ""
+    revalidated: bool = False  # 304: text is the remembered body
+    attempts: int = 1
+    elapsed_ms: float = 0.0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300 or self.revalidated
+
+
+class Fetcher:
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        per_host: int = 4,
+        retries: int = 2,
+        backoff: float = 0.5,
+        cache_entries: int = 256,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.per_host = max(1, per_host)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.cache_entries = cache_entries
+        self._transport = transport
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        # url -> (etag, last_modified, body); only touched on the loop thread
+        self._validators: "OrderedDict[str, Tuple[Optional[str], Optional[str], str]]" = OrderedDict()
+        self._start_lock = threading.Lock()
+
+    # -- event loop ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="scraper-http", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def close(self) -> None:
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+            except Exception:
+                pass
+            self._client = None
+        self._hosts.clear()
+        loop.call_soon_threadsafe(loop.stop)
+
+    # -- requests (run on the loop thread) ------------------------------------------
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                transport=self._transport,
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    def _remember(self, url: str, response: httpx.Response) -> None:
+        etag = response.headers.get("ETag")
+        modified = response.headers.get("Last-Modified")
+        if etag or modified:
+            self._validators[url] = (etag, modified, response.text)
+            self._validators.move_to_end(url)
+            while len(self._validators) > self.cache_entries:
+                self._validators.popitem(last=False)
+
+    async def _fetch(self, url: str, deadline: Optional[float] = None) -> FetchResult:
+        started = time.perf_counter()
+        stop = started + deadline if deadline is not None else None
+        headers = {}
+        cached = self._validators.get(url)
+        if cached is not None:
+            etag, modified, _body = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if modified:
+                headers["If-Modified-Since"] = modified
+
+        error = ""
+        status = 0
+        attempts = 0
+        for attempt in range(1, self.retries + 2):
+            timeout = self.timeout
+            if stop is not None:
+                timeout = min(timeout, stop - time.perf_counter())
+                if timeout <= 0:
+                    error = error or f"Deadline of {deadline:g}s exceeded"
+                    break
+            attempts = attempt
+            try:
+                async with self._host_limit(url):
+                    response = await self._get_client().get(url, headers=headers, timeout=timeout)
+            except httpx.HTTPError as exc:
+                error, status = f"{type(exc).__name__}: {exc}", 0
+            else:
+                status = response.status_code
+                elapsed = (time.perf_counter() - started) * 1000.0
+                if status == 304 and cached is not None:
+                    self._validators.move_to_end(url)
+                    return FetchResult(url, status, cached[2], revalidated=True, attempts=attempt, elapsed_ms=elapsed)
+                if status not in RETRY_STATUSES:
+                    if response.is_success:
+                        self._remember(url, response)
+                    return FetchResult(url, status, response.text, attempts=attempt, elapsed_ms=elapsed,
+                                       error="" if response.is_success else f"HTTP {status}")
+                error = f"HTTP {status}"
+            if attempt <= self.retries:
+                delay = self.backoff * (2 ** (attempt - 1)) * (1 + random.random() / 2)
+                if stop is not None and time.perf_counter() + delay >= stop:
+                    break  # no time left for another attempt
+                await asyncio.sleep(delay)
+        return FetchResult(url, status, attempts=attempts,
+                           elapsed_ms=(time.perf_counter() - started) * 1000.0, error=error)
+
+    async def _fetch_within(self, url: str, deadline: Optional[float]) -> FetchResult:
+        if deadline is None:
+            return await self._fetch(url)
+        started = time.perf_counter()
+        try:
+            # Also bounds time spent queued behind the per-host limit
+            return await asyncio.wait_for(self._fetch(url, deadline), deadline)
+        except asyncio.TimeoutError:
+            return FetchResult(url, 0, elapsed_ms=(time.perf_counter() - started) * 1000.0,
+                               error=f"Deadline of {deadline:g}s exceeded")
+
+    async def _fetch_all(self, urls: List[str], deadline: Optional[float] = None) -> List[FetchResult]:
+        return list(await asyncio.gather(*(self._fetch_within(url, deadline) for url in urls)))
+
+    # -- public API --------------------------------------------------------------------
+
+    def fetch_many(self, urls: Iterable[str], deadline: Optional[float] = None) -> List[FetchResult]:
+        """
+        Fetch all urls concurrently (blocking); results are in the same order. With a
+        deadline, each url gets at most that many seconds, retries included.
+        """
+        urls = list(urls)
+        if not urls:
+            return []
+        return self._submit(self._fetch_all(urls, deadline)).result()
+
+    async def afetch_many(self, urls: Iterable[str], deadline: Optional[float] = None) -> List[FetchResult]:
+        """Awaitable fetch_many for async callers on any event loop."""
+        urls = list(urls)
+        if not urls:
+            return []
+        return await asyncio.wrap_future(self._submit(self._fetch_all(urls, deadline)))
+
+    def fetch_text(self, url: str, deadline: Optional[float] = None) -> FetchResult:
+        return self.fetch_many([url], deadline)[0]
+
+
+fetcher = Fetcher(
+    timeout=getattr(settings, "SCRAPER_HTTP_TIMEOUT", 10),
+    per_host=getattr(settings, "SCRAPER_HTTP_PER_HOST", 4),
+    retries=getattr(settings, "SCRAPER_HTTP_RETRIES", 2),
+    backoff=getattr(settings, "SCRAPER_HTTP_BACKOFF", 0.5),
+    cache_entries=getattr(settings, "SCRAPER_HTTP_CACHE_ENTRIES", 256),
+)
+atexit.register(fetcher.close)
+
+
+def fetch_many(urls: Iterable[str], deadline: Optional[float] = None) -> List[FetchResult]:
+    return fetcher.fetch_many(urls, deadline)
+
+
+async def afetch_many(urls: Iterable[str], deadline: Optional[float] = None) -> List[FetchResult]:
+    return await fetcher.afetch_many(urls, deadline)
+
+
+def fetch_text(url: str, deadline: Optional[float] = None) -> FetchResult:
+    return fetcher.fetch_text(url, deadline)
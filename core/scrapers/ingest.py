@@ -0,0 +1,584 @@
+"""
+Price ingestion pipeline: many raw mandi price files and feeds -> one partitioned store.
+
+    sources (CSV / .csv.gz files, saved HTML tables, http(s) feeds)
+      -> normalize, one source per worker process: map the varied headings onto SCHEMA,
+         parse prices such as "₹2,150/qtl" to numbers, clean the text columns
+      -> dedupe on (date, market, commodity, variety); later sources win
+      -> merge into one columnar file per (state, month) partition under PRICE_STORE_DIR
+
+`read_prices()` opens only the partitions matching the requested state and date range
+and keeps recently read partitions in memory until they change on disk. The manifest
+records each partition's row count and date span; it is updated only for the
+partitions an ingest rewrote, and `search_prices()` uses it to open just the newest
+month when no date range is given. Feeds are
+downloaded concurrently through the shared fetch layer before normalizing.
+
+Partitions are Parquet when pyarrow is installed, otherwise NumPy .npz files with
+dictionary-encoded string columns (no pickling). Both read back to the same frame.
+
+Optional settings:
+    PRICE_STORE_DIR       partition root (default BASE_DIR/data/prices)
+    PRICE_STORE_FORMAT    "parquet" or "npz" (default: parquet when pyarrow is installed)
+    PRICE_INGEST_WORKERS  normalizing processes (default min(4, cpu count))
+"""
+from __future__ import annotations
+
+import datetime
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import pathlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from core import page_cache
+
+from .parsing import format_number, parse_number_series
+
+SCHEMA = ("date", "state", "district", "market", "commodity", "variety", "price", "source")
+TEXT_COLUMNS = ("state", "district", "market", "commodity", "variety", "source")
+KEY = ("date", "market", "commodity", "variety")
+REQUIRED = ("market", "commodity", "price")
+MANIFEST_NAME = "manifest.json"
+CHUNK_ROWS = 250_000
+
+# Normalized heading -> schema column. Headings are lower-cased with units in
+# parentheses and punctuation dropped first, so "Modal Price (Rs./Quintal)",
+# "modal_price" and "Modal_x0020_Price" all become "modal price".
+HEADER_ALIASES: Dict[str, str] = {
+    "date": "date", "arrival date": "date", "reported date": "date", "price date": "date",
+    "state": "state", "state name": "state",
+    "district": "district", "district name": "district",
+    "market": "market", "market name": "market", "mandi": "market", "apmc": "market",
+    "market center": "market", "city": "market",
+    "commodity": "commodity", "commodity name": "commodity", "crop": "commodity",
+    "variety": "variety", "variety name": "variety",
+    "modal price": "price", "modal": "price", "price": "price",
+}
+
+
+class IngestError(ValueError):
+    pass
+
+
+def normalize_heading(heading: str) -> str:
+    text = str(heading).replace("_x0020_", " ").lower()
+    text = re.sub(r"\(.*?\)", " ", text)
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def resolve_columns(headings: Iterable[str]) -> Dict[str, str]:
+    """{raw heading: schema column}; the first heading claiming a column wins."""
+    out: Dict[str, str] = {}
+    for heading in headings:
+        column = HEADER_ALIASES.get(normalize_heading(heading))
+        if column is not None and column not in out.values():
+            out[heading] = column
+    return out
+
+
+def state_slug(state: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(state).lower()).strip("-") or "unknown"
+
+
+def _per_value(series: pd.Series, fn) -> pd.Series:
+    """Apply a vectorized fn to the distinct values only: price files repeat the same few
+    markets, commodities and dates millions of times."""
+    codes, uniques = pd.factorize(series.fillna(""))
+    cleaned = fn(pd.Series(uniques, dtype=object)).to_numpy()
+    return pd.Series(cleaned[codes], index=series.index)
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    return _per_value(series, lambda s: s.astype(str).str.strip().str.replace(r"\s+", " ", regex=True))
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """ISO dates first, then day-first formats ("17/10/2026", "17-Oct-2026")."""
+    values = values.astype(str)
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    rest = parsed.isna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(values[rest], format="mixed", dayfirst=True, errors="coerce")
+    return parsed.dt.normalize()
+
+
+def normalize_frame(df: pd.DataFrame, source: str, state: str = "", date: Optional[datetime.date] = None) -> pd.DataFrame:
+    """
+    Map a raw price table onto SCHEMA. state and date fill sources that lack those columns
+    (or leave them blank). Rows without a market, commodity, date or positive price are dropped.
+    """
+    columns = resolve_columns(df.columns)
+    missing = [c for c in REQUIRED if c not in columns.values()]
+    if missing:
+        raise IngestError(f"{source}: no column for {', '.join(missing)} (headings: {', '.join(map(str, df.columns))})")
+    df = df[list(columns)].rename(columns=columns)
+
+    out = pd.DataFrame(index=df.index)
+    for column in TEXT_COLUMNS:
+        out[column] = _clean_text(df[column]) if column in df.columns else ""
+    out["source"] = source
+    if state:
+        out.loc[out["state"] == "", "state"] = state
+    if "date" in df.columns:
+        out["date"] = _per_value(df["date"], lambda s: _parse_dates(s.astype(str).str.strip())).astype("datetime64[ns]")
+        if date is not None:
+            out["date"] = out["date"].fillna(pd.Timestamp(date))
+    elif date is not None:
+        out["date"] = pd.Timestamp(date)
+    else:
+        raise IngestError(f"{source}: no date column; pass an observation date")
+    out["price"] = _per_value(df["price"], parse_number_series).astype(float)
+
+    keep = (out["market"] != "") & (out["commodity"] != "") & out["date"].notna() & (out["price"] > 0)
+    return out.loc[keep, list(SCHEMA)].reset_index(drop=True)
+
+
+def dedupe(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop repeated (date, market, commodity, variety) rows, case-insensitively, keeping the last."""
+    keys = pd.DataFrame({c: df[c] if c == "date" else df[c].str.casefold() for c in KEY})
+    return df[~keys.duplicated(keep="last")]
+
+
+# -- reading sources (runs in worker processes) -------------------------------------------
+
+def _read_table(text: str, html_backend: Optional[str]) -> Iterable[pd.DataFrame]:
+    if text.lstrip()[:1] == "<":
+        from .tables import extract_rows
+
+        rows = extract_rows(text, backend=html_backend)
+        if not rows:
+            return []
+        width = len(rows[0])
+        return [pd.DataFrame([r[:width] + [""] * (width - len(r)) for r in rows[1:]], columns=rows[0])]
+    return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS)
+
+
+def _normalize_source(
+    name: str, path: Optional[str], text: Optional[str], state: str,
+    date: Optional[datetime.date], html_backend: Optional[str],
+) -> Tuple[str, int, pd.DataFrame]:
+    """(name, raw row count, normalized frame) for one file (path) or downloaded feed (text)."""
+    if path is not None and not path.lower().endswith((".html", ".htm")):
+        chunks = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS,
+                             encoding="utf-8-sig", compression="infer")
+    else:
+        if path is not None:
+            text = pathlib.Path(path).read_text(encoding="utf-8", errors="replace")
+        chunks = _read_table(text or "", html_backend)
+    raw = 0
+    frames = []
+    for chunk in chunks:
+        raw += len(chunk)
+        frames.append(normalize_frame(chunk, name, state=state, date=date))
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(SCHEMA))
+    return name, raw, frame
+
+
+# -- partition files ----------------------------------------------------------------------
+
+def default_format() -> str:
+    forced = getattr(settings, "PRICE_STORE_FORMAT", None)
+    if forced:
+        return forced
+    return "parquet" if importlib.util.find_spec("pyarrow") is not None else "npz"
+
+
+def store_dir() -> pathlib.Path:
+    return pathlib.Path(getattr(settings, "PRICE_STORE_DIR", pathlib.Path(settings.BASE_DIR) / "data" / "prices"))
+
+
+def _write_npz(df: pd.DataFrame, fh) -> None:
+    arrays = {
+        "date": df["date"].to_numpy(dtype="datetime64[D]"),
+        "price": df["price"].to_numpy(dtype=float),
+    }
+    for column in TEXT_COLUMNS:
+        codes, uniques = pd.factorize(df[column], sort=True)
+        arrays[f"{column}.codes"] = codes.astype(np.int32)
+        arrays[f"{column}.values"] = np.asarray(list(uniques), dtype=str)
+    np.savez(fh, **arrays)
+
+
+def _read_npz(path: pathlib.Path, columns: Sequence[str]) -> pd.DataFrame:
+    out = {}
+    with np.load(path, allow_pickle=False) as data:
+        for column in columns:
+            if column in TEXT_COLUMNS:
+                values = data[f"{column}.values"].astype(object)
+                out[column] = values[data[f"{column}.codes"]] if len(values) else data[f"{column}.codes"].astype(object)
+            else:
+                out[column] = data[column].astype("datetime64[ns]") if column == "date" else data[column]
+    return pd.DataFrame(out, columns=list(columns))
+
+
+FORMATS = {"parquet": ".parquet", "npz": ".npz"}
+
+
+def _partition_file(directory: pathlib.Path) -> Optional[pathlib.Path]:
+    for suffix in FORMATS.values():
+        path = directory / f"part{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def _read_file(path: pathlib.Path, columns: Sequence[str] = SCHEMA) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=list(columns))
+    return _read_npz(path, columns)
+
+
+def _write_partition(directory: pathlib.Path, df: pd.DataFrame, fmt: str) -> pathlib.Path:
+    if fmt not in FORMATS:
+        raise IngestError(f"Unknown price store format {fmt!r}; expected one of {tuple(FORMATS)}")
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part{FORMATS[fmt]}"
+    tmp = directory / f".part{FORMATS[fmt]}.{os.getpid()}.tmp"
+    # Readers never see a half-written partition: write aside, then swap in
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        with open(tmp, "wb") as fh:
+            _write_npz(df, fh)
+    os.replace(tmp, path)
+    for other in FORMATS.values():
+        stale = directory / f"part{other}"
+        if stale != path and stale.exists():
+            stale.unlink()
+    return path
+
+
+def _partitions(root: pathlib.Path) -> List[Tuple[str, str, pathlib.Path]]:
+    """(state slug, "YYYY-MM", file) for every stored partition."""
+    out = []
+    for state_dir in sorted(root.glob("state=*")):
+        for month_dir in sorted(state_dir.glob("month=*")):
+            path = _partition_file(month_dir)
+            if path is not None:
+                out.append((state_dir.name[len("state="):], month_dir.name[len("month="):], path))
+    return out
+
+
+# -- ingestion ----------------------------------------------------------------------------
+
+@dataclass
+class IngestReport:
+    sources: int = 0
+    rows_read: int = 0
+    rows_valid: int = 0
+    duplicates: int = 0
+    rows_stored: int = 0
+    partitions: int = 0
+    seconds: float = 0.0
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _workers(workers: Optional[int]) -> int:
+    if workers is None:
+        workers = getattr(settings, "PRICE_INGEST_WORKERS", min(4, os.cpu_count() or 1))
+    return max(1, int(workers))
+
+
+def _expand(sources: Iterable[str]) -> List[str]:
+    out = []
+    for source in sources:
+        if os.path.isdir(source):
+            out.extend(str(p) for p in sorted(pathlib.Path(source).iterdir())
+                       if p.name.lower().endswith((".csv", ".csv.gz", ".html", ".htm")))
+        else:
+            out.append(source)
+    return out
+
+
+def ingest_prices(
+    sources: Iterable[str],
+    state: str = "",
+    date: Optional[datetime.date] = None,
+    workers: Optional[int] = None,
+    root: Optional[pathlib.Path] = None,
+    fmt: Optional[str] = None,
+) -> IngestReport:
+    """
+    Normalize every source (file, directory of files, or http(s) URL) in parallel, dedupe,
+    and merge the rows into the partitioned store. Sources are applied in the given order,
+    so for a repeated (date, market, commodity, variety) the last source wins, and new rows
+    replace stored ones. A source that fails is reported and skipped.
+    """
+    from .fetch import fetch_many
+    from .tables import default_backend
+
+    started = time.perf_counter()
+    root = pathlib.Path(root) if root is not None else store_dir()
+    fmt = fmt or default_format()
+    report = IngestReport()
+    sources = _expand(sources)
+    report.sources = len(sources)
+
+    # (name, path, text) per source, feeds downloaded together up front
+    urls = [s for s in sources if s.startswith(("http://", "https://"))]
+    fetched = {r.url: r for r in fetch_many(urls)}
+    jobs = []
+    for source in sources:
+        if source in fetched:
+            result = fetched[source]
+            if not result.ok:
+                report.errors.append((source, result.error or f"HTTP {result.status}"))
+                continue
+            jobs.append((source, None, result.text))
+        elif not os.path.exists(source):
+            report.errors.append((source, "file not found"))
+        else:
+            jobs.append((os.path.basename(source), source, None))
+
+    html_backend = default_backend()
+    results: Dict[int, Tuple[str, int, pd.DataFrame]] = {}
+    n_workers = min(_workers(workers), len(jobs))
+    if n_workers <= 1:
+        for i, (name, path, text) in enumerate(jobs):
+            try:
+                results[i] = _normalize_source(name, path, text, state, date, html_backend)
+            except Exception as exc:
+                report.errors.append((name, str(exc)))
+    else:
+        # spawn: forking a threaded web/management process is unsafe, and workers need no Django state
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {i: pool.submit(_normalize_source, name, path, text, state, date, html_backend)
+                       for i, (name, path, text) in enumerate(jobs)}
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result()
+                except Exception as exc:
+                    report.errors.append((jobs[i][0], str(exc)))
+
+    frames = []
+    for i in sorted(results):
+        _name, raw, frame = results[i]
+        report.rows_read += raw
+        report.rows_valid += len(frame)
+        frames.append(frame)
+    if frames:
+        new = dedupe(pd.concat(frames, ignore_index=True))
+        report.duplicates = report.rows_valid - len(new)
+        written, report.rows_stored = _merge(root, new, fmt)
+        report.partitions = len(written)
+    else:
+        written = []
+    _write_manifest(root, written)
+    page_cache.invalidate("prices")
+    report.seconds = round(time.perf_counter() - started, 3)
+    return report
+
+
+def _merge(root: pathlib.Path, new: pd.DataFrame, fmt: str) -> Tuple[List[str], int]:
+    """Fold new rows into their (state, month) partitions. Returns (keys of the partitions written, rows in them)."""
+    written = []
+    rows = 0
+    slugs = _per_value(new["state"], lambda s: s.map(state_slug))
+    months = new["date"].dt.to_period("M").astype(str)
+    for (slug, month), part in new.groupby([slugs, months], sort=True):
+        directory = root / f"state={slug}" / f"month={month}"
+        existing = _partition_file(directory)
+        if existing is not None:
+            part = dedupe(pd.concat([_read_file(existing), part], ignore_index=True))
+        part = part.sort_values(["date", "commodity", "market", "variety"], kind="stable").reset_index(drop=True)
+        # One spelling per state ("gujarat" / "Gujarat" share a partition): the most common one
+        part["state"] = part["state"].mode().iloc[0]
+        _write_partition(directory, part, fmt)
+        written.append(_partition_key(slug, month))
+        rows += len(part)
+    return written, rows
+
+
+def _partition_key(slug: str, month: str) -> str:
+    return f"{slug}/{month}"
+
+
+def _partition_entry(path: pathlib.Path) -> Dict[str, object]:
+    df = _read_file(path, ("date", "state"))
+    if not len(df):
+        return {"state": "", "rows": 0, "first_date": None, "last_date": None}
+    return {"state": df["state"].mode().iloc[0], "rows": len(df),
+            "first_date": df["date"].min().date().isoformat(), "last_date": df["date"].max().date().isoformat()}
+
+
+def _write_manifest(root: pathlib.Path, changed: Iterable[str] = ()) -> None:
+    """
+    Update the manifest for the partitions in changed (keys from _merge). Partitions it
+    already describes are not re-read; ones it lacks (an older or missing manifest) are.
+    """
+    known = manifest(root).get("partitions", {})
+    changed = set(changed)
+    partitions: Dict[str, Dict[str, object]] = {}
+    for slug, month, path in _partitions(root):
+        key = _partition_key(slug, month)
+        entry = known.get(key)
+        partitions[key] = entry if entry is not None and key not in changed else _partition_entry(path)
+    if not partitions and not root.exists():
+        return
+    states: Dict[str, str] = {}
+    entries = [e for e in partitions.values() if e["rows"]]
+    for key, entry in partitions.items():
+        if entry["rows"]:
+            states.setdefault(key.split("/", 1)[0], entry["state"])
+    root.mkdir(parents=True, exist_ok=True)
+    manifest_data = {
+        "states": dict(sorted(states.items(), key=lambda kv: kv[1])),
+        "rows": sum(e["rows"] for e in entries),
+        "first_date": min((e["first_date"] for e in entries), default=None),
+        "last_date": max((e["last_date"] for e in entries), default=None),
+        "partitions": partitions,
+    }
+    tmp = root / f".{MANIFEST_NAME}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(manifest_data, indent=2), encoding="utf-8")
+    os.replace(tmp, root / MANIFEST_NAME)
+
+
+# -- reading the store --------------------------------------------------------------------
+
+_cache: "OrderedDict[str, Tuple[int, int, pd.DataFrame]]" = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_PARTITIONS = 32
+_manifest_cache: Dict[str, Tuple[int, int, Dict[str, object]]] = {}
+
+
+def _load_partition(path: pathlib.Path) -> pd.DataFrame:
+    st = path.stat()
+    key = str(path)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            _cache.move_to_end(key)
+            return cached[2]
+    df = _read_file(path)
+    with _cache_lock:
+        _cache[key] = (st.st_mtime_ns, st.st_size, df)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_PARTITIONS:
+            _cache.popitem(last=False)
+    return df
+
+
+def manifest(root: Optional[pathlib.Path] = None) -> Dict[str, object]:
+    """
+    States, row count and date span of the store, and the same per partition ("<state
+    slug>/<YYYY-MM>"); empty when nothing was ingested.
+    """
+    path = (pathlib.Path(root) if root is not None else store_dir()) / MANIFEST_NAME
+    try:
+        st = path.stat()
+        cached = _manifest_cache.get(str(path))
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    _manifest_cache[str(path)] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
+def read_prices(
+    state: Optional[str] = None,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    root: Optional[pathlib.Path] = None,
+) -> pd.DataFrame:
+    """Stored rows for a state (any state when None) with start <= date <= end, in SCHEMA columns."""
+    root = pathlib.Path(root) if root is not None else store_dir()
+    slug = state_slug(state) if state else None
+    lo = start.strftime("%Y-%m") if start else None
+    hi = end.strftime("%Y-%m") if end else None
+    frames = [
+        _load_partition(path)
+        for part_slug, month, path in _partitions(root)
+        if (slug is None or part_slug == slug) and (lo is None or month >= lo) and (hi is None or month <= hi)
+    ]
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype="datetime64[ns]" if c == "date" else float if c == "price" else object)
+                             for c in SCHEMA})
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if start:
+        df = df[df["date"] >= pd.Timestamp(start)]
+    if end:
+        df = df[df["date"] <= pd.Timestamp(end)]
+    return df
+
+
+def latest_date(state: Optional[str] = None, root: Optional[pathlib.Path] = None) -> Optional[datetime.date]:
+    """Newest stored date for a state (any state when None), from the manifest; None if unknown."""
+    partitions = manifest(root).get("partitions")
+    if not partitions:
+        return None
+    slug = state_slug(state) if state else None
+    dates = [entry["last_date"] for key, entry in partitions.items()
+             if entry.get("last_date") and (slug is None or key.split("/", 1)[0] == slug)]
+    return datetime.date.fromisoformat(max(dates)) if dates else None
+
+
+def search_prices(
+    state: Optional[str] = None,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    query: str = "",
+    root: Optional[pathlib.Path] = None,
+) -> pd.DataFrame:
+    """
+    read_prices() for the market page: without a date range only the newest date in the
+    selection is kept (as the CropPrice table is shown), and query matches market,
+    commodity or variety.
+    """
+    if not start and not end:
+        # Only the month holding the newest date is read, found from the manifest
+        latest = latest_date(state, root=root)
+        if latest is not None:
+            start = end = latest
+    df = read_prices(state, start, end, root=root)
+    if not start and not end and len(df):
+        df = df[df["date"] == df["date"].max()]
+    if query:
+        match = np.zeros(len(df), dtype=bool)
+        for column in ("market", "commodity", "variety"):
+            match |= df[column].str.contains(query, case=False, regex=False).to_numpy()
+        df = df[match]
+    return df.sort_values(["commodity", "market"], kind="stable")
+
+
+class FrameRows(Sequence):
+    """A frame as a lazily materialized list of price row dicts (what Paginator needs)."""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.df = df
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._rows(self.df.iloc[index])
+        return self._rows(self.df.iloc[[index]])[0]
+
+    @staticmethod
+    def _rows(part: pd.DataFrame) -> List[Dict[str, object]]:
+        return [
+            {
+                "commodity": r.commodity,
+                "variety": r.variety,
+                "price": format_number(r.price),
+                "market": r.market,
+                "state": r.state,
+                "date": r.date.date(),
+            }
+            for r in part.itertuples(index=False)
+        ]
@@ -0,0 +1,47 @@
+"""
+Prices and rainfall together, for pages that show both.
+
+Local sources (database, then CSV) are read first, through the async ORM, with CSV reads on
+the offload pool. Any dataset still empty is fetched from the web in one concurrent batch
+through the shared fetch layer, so the wait is the slowest source rather than the sum of
+them, and never more than the fetch layer's INTERACTIVE_DEADLINE. Parsing runs on the
+offload pool, so the event loop stays free. Sample rows remain the last resort.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .fetch import INTERACTIVE_DEADLINE, afetch_many
+from .prices import PRICES_URL, alocal_prices, parse_prices_html, sample_prices
+from .rainfall import RAINFALL_URL, alocal_rainfall, parse_rainfall_html, sample_rainfall
+
+Rows = List[Dict[str, str]]
+
+# name -> (async local reader, web url, html parser, sample rows)
+SOURCES: Dict[str, Tuple[Callable, str, Callable, Callable]] = {
+    "prices": (alocal_prices, PRICES_URL, parse_prices_html, sample_prices),
+    "rainfall": (alocal_rainfall, RAINFALL_URL, parse_rainfall_html, sample_rainfall),
+}
+
+
+async def aget_market_data(
+    region: Optional[str] = None, price_region: Optional[str] = None, names=("prices", "rainfall")
+) -> Dict[str, Rows]:
+    """
+    {name: rows} for the requested sources. region filters rainfall; price_region filters
+    prices by market (both default to no filter), matching get_crop_prices/get_rainfall.
+    """
+    from core.offload import run_cpu
+
+    regions = {"prices": price_region, "rainfall": region}
+    local = await asyncio.gather(*(SOURCES[name][0](regions[name]) for name in names))
+    out: Dict[str, Rows] = {name: rows for name, rows in zip(names, local) if rows}
+    missing = [name for name in names if name not in out]
+
+    fetched = await afetch_many([SOURCES[m][1] for m in missing], deadline=INTERACTIVE_DEADLINE)
+    for name, result in zip(missing, fetched):
+        _local, _url, parse, sample = SOURCES[name]
+        rows = await run_cpu(parse, result.text, regions[name]) if result.ok else []
+        out[name] = rows or sample(regions[name])
+    return {name: out[name] for name in names}
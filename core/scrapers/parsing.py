@@ -0,0 +1,41 @@
+"""Helpers for turning scraped/CSV text values into numbers."""
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+# First number in the text, allowing thousands separators: "₹2,150/qtl" -> "2,150"
+_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+
+
+def parse_number(text: object) -> Optional[float]:
+    """Parse values like "₹2,150/qtl", "331", " 12.4 mm". Returns None when there is no number."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text) if text == text else None  # NaN check
+    match = _NUMBER_RE.search(str(text))
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def format_number(value: Optional[float]) -> str:
+    """Inverse for display: 2150.0 -> "2150", 12.4 -> "12.4", None -> ""."""
+    if value is None:
+        return ""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def parse_number_series(values):
+    """Vectorized parse_number over a sequence/Series: same rules, returns a float Series with NaN for misses."""
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype="object")
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    text = series.astype(str).str.extract(f"({_NUMBER_RE.pattern})", expand=False)
+    return pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce")
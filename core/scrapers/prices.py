@@ -1,81 +1,169 @@
 from __future__ import annotations
 
-import requests
-from bs4 import BeautifulSoup
 from typing import List, Dict
 import os
 from django.conf import settings
 import pandas as pd
 
+from .cache import ColumnarRecords, market_cache
+from .fetch import fetch_text
+from .parsing import format_number
+from .search import SubstringIndex
+from .tables import extract_rows
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36"
-}
 
+PRICES_CSV_PATH = os.path.join(settings.BASE_DIR, 'core', 'ml', 'data', 'gujarat_crop_prices.csv')
 
-def get_crop_prices(region: str | None = None) -> List[Dict[str, str]]:
+
+def _parse_prices_csv(csv_path: str) -> ColumnarRecords:
+    # Expected columns: Commodity, Variety, Price (₹/quintal), Market
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    source = {
+        'commodity': 'Commodity',
+        'variety': 'Variety',
+        'price': 'Price (₹/quintal)',
+        'market': 'Market',
+    }
+    out = pd.DataFrame({
+        key: (df[col] if col in df.columns else pd.Series('', index=df.index)).astype(str).str.strip()
+        for key, col in source.items()
+    })
+    out = out[(out['commodity'] != '') & (out['market'] != '')]
+    return ColumnarRecords.from_frame(out)
+
+
+def price_queryset(region: str | None = None, query: str | None = None):
     """
-    Scrape crop prices by region.
+    Latest-day CropPrice rows with the filters pushed down to SQL, or None when nothing has
+    been loaded (see `manage.py load_market_data`). region matches the market; query matches
+    market, commodity or variety.
+    """
+    from django.db.models import Max
+    from core.models import CropPrice
 
-    NOTE: Many official portals use dynamic content or have anti-scraping. For demo reliability, this function
-    first tries to read a local Gujarat CSV, then scrapes a public HTML table example when available,
-    and finally falls back to sample data if all else fails.
+    latest = CropPrice.objects.aggregate(latest=Max('date'))['latest']
+    return None if latest is None else _latest_prices(latest, region, query)
+
+
+async def aprice_queryset(region: str | None = None, query: str | None = None):
+    """price_queryset() for async views: the latest date is read through the async ORM."""
+    from django.db.models import Max
+    from core.models import CropPrice
+
+    latest = (await CropPrice.objects.aaggregate(latest=Max('date')))['latest']
+    return None if latest is None else _latest_prices(latest, region, query)
+
+
+def _latest_prices(latest, region, query):
+    from django.db.models import Q
+    from core.models import CropPrice
+
+    qs = CropPrice.objects.filter(date=latest)
+    if region:
+        qs = qs.filter(market__icontains=region)
+    if query:
+        qs = qs.filter(Q(market__icontains=query) | Q(commodity__icontains=query) | Q(variety__icontains=query))
+    return qs.order_by('commodity', 'market').values('commodity', 'variety', 'price', 'price_text', 'market')
+
+
+def price_rows(values) -> List[Dict[str, str]]:
+    """Convert price_queryset() values to the dict shape returned by get_crop_prices."""
+    return [
+        {
+            'commodity': v['commodity'],
+            'variety': v['variety'],
+            'price': v['price_text'] or format_number(v['price']),
+            'market': v['market'],
+        }
+        for v in values
+    ]
+
+
+def get_price_index() -> SubstringIndex | None:
+    """
+    Search index over the local CSV records, rebuilt only when the file changes.
+    None when the CSV is unavailable (callers then fall back to the list from get_crop_prices).
+    Only consulted when neither the price store nor the CropPrice table has rows.
     """
-    # 1) Preferred source: local CSV core/ml/data/gujarat_crop_prices.csv
+    def build(path: str) -> SubstringIndex:
+        records = market_cache.get(path, _parse_prices_csv, namespace='prices')
+        if records is None:
+            raise FileNotFoundError(path)
+        return SubstringIndex(records, ('market', 'commodity', 'variety'))
+
+    index = market_cache.get(PRICES_CSV_PATH, build, namespace='prices-index')
+    if index is None or not len(index):
+        return None
+    return index
+
+
+PRICES_URL = getattr(settings, 'MARKET_PRICES_URL', "https://www.agrimarketwatch.com/sample-prices")  # placeholder example-like URL
+
+
+def local_prices(region: str | None = None) -> List[Dict[str, str]]:
+    """Prices from the CropPrice table (filtered in SQL), else the local CSV; [] if neither has rows."""
+    # 1) Preferred source: CropPrice table, filtered in SQL
     try:
-        csv_path = os.path.join(settings.BASE_DIR, 'core', 'ml', 'data', 'gujarat_crop_prices.csv')
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            # Expected columns: Commodity, Variety, Price (₹/quintal), Market
-            out: List[Dict[str, str]] = []
-            for _, row in df.iterrows():
-                commodity = str(row.get('Commodity', '')).strip()
-                variety = str(row.get('Variety', '')).strip()
-                price = str(row.get('Price (₹/quintal)', '')).strip()
-                market = str(row.get('Market', '')).strip()
-                if not commodity or not market:
-                    continue
-                out.append({
-                    'commodity': commodity,
-                    'variety': variety,
-                    'price': price,
-                    'market': market,
-                })
-            if region:
-                out = [r for r in out if region.lower() in r.get('market', '').lower()]
+        qs = price_queryset(region=region)
+        if qs is not None:
+            out = price_rows(qs)
             if out:
                 return out
     except Exception:
-        # If CSV read fails, proceed to web/placeholder
+        # Table missing (migrations not applied) or DB unavailable: use the CSV
         pass
+    return _csv_prices(region)
+
 
-    # 2) Secondary attempt: placeholder scrape
-    url = "https://www.agrimarketwatch.com/sample-prices"  # placeholder example-like URL
+async def alocal_prices(region: str | None = None) -> List[Dict[str, str]]:
+    """local_prices() for async views: the table through the async ORM, the CSV on the offload pool."""
+    from core.offload import run_cpu
 
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        if resp.ok and "<table" in resp.text:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            table = soup.find("table")
-            rows = table.find_all("tr") if table else []
-            out: List[Dict[str, str]] = []
-            for tr in rows[1:]:
-                tds = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
-                if len(tds) >= 4:
-                    out.append({
-                        "commodity": tds[0],
-                        "variety": tds[1],
-                        "price": tds[2],
-                        "market": tds[3],
-                    })
-            if region:
-                out = [r for r in out if region.lower() in r.get("market", "").lower()]
+        qs = await aprice_queryset(region=region)
+        if qs is not None:
+            out = price_rows([v async for v in qs])
             if out:
                 return out
     except Exception:
         pass
+    return await run_cpu(_csv_prices, region)
 
-    # Fallback sample data
+
+def _csv_prices(region: str | None) -> List[Dict[str, str]]:
+    # 2) Local CSV core/ml/data/gujarat_crop_prices.csv (parsed once per file change)
+    try:
+        records = market_cache.get(PRICES_CSV_PATH, _parse_prices_csv, namespace='prices')
+        if records is not None:
+            if region:
+                q = region.lower()
+                return records.rows([i for i, v in enumerate(records.column('market')) if q in v.lower()])
+            return records.rows()
+    except Exception:
+        # If CSV read fails, proceed to web/placeholder
+        pass
+    return []
+
+
+def parse_prices_html(html: str, region: str | None = None) -> List[Dict[str, str]]:
+    """Rows of the first HTML table as commodity, variety, price, market."""
+    if "<table" not in html:
+        return []
+    out: List[Dict[str, str]] = []
+    for tds in extract_rows(html)[1:]:
+        if len(tds) >= 4:
+            out.append({
+                "commodity": tds[0],
+                "variety": tds[1],
+                "price": tds[2],
+                "market": tds[3],
+            })
+    if region:
+        out = [r for r in out if region.lower() in r.get("market", "").lower()]
+    return out
+
+
+def sample_prices(region: str | None = None) -> List[Dict[str, str]]:
     sample = [
         {"commodity": "Wheat", "variety": "Durum", "price": "₹2,150/qtl", "market": "Delhi"},
         {"commodity": "Rice", "variety": "Basmati", "price": "₹3,200/qtl", "market": "Punjab"},
@@ -84,3 +172,29 @@ def get_crop_prices(region: str | None = None) -> List[Dict[str, str]]:
     if region:
         sample = [r for r in sample if region.lower() in r["market"].lower()]
     return sample
+
+
+def get_crop_prices(region: str | None = None, deadline: float | None = None) -> List[Dict[str, str]]:
+    """
+    Scrape crop prices by region.
+
+    NOTE: Many official portals use dynamic content or have anti-scraping. For demo reliability, this function
+    first uses prices loaded into the database, then reads a local Gujarat CSV, then scrapes a public HTML table
+    example when available (through the shared pooled/conditional fetch layer), and finally falls back to sample
+    data if all else fails. deadline caps the seconds spent on the scrape, retries included (see
+    core.scrapers.fetch.INTERACTIVE_DEADLINE). See core.scrapers.market.aget_market_data to fetch prices and
+    rainfall together.
+    """
+    out = local_prices(region)
+    if out:
+        return out
+
+    # 3) Secondary attempt: placeholder scrape
+    result = fetch_text(PRICES_URL, deadline)
+    if result.ok:
+        out = parse_prices_html(result.text, region)
+        if out:
+            return out
+
+    # Fallback sample data
+    return sample_prices(region)
@@ -1,76 +1,167 @@
 from __future__ import annotations
 
-import requests
-from bs4 import BeautifulSoup
 from typing import List, Dict
 import os
 from django.conf import settings
 import pandas as pd
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36"
-}
+from .cache import ColumnarRecords, market_cache
+from .fetch import fetch_text
+from .parsing import format_number
+from .search import SubstringIndex
+from .tables import extract_rows
 
+RAINFALL_CSV_PATH = os.path.join(settings.BASE_DIR, 'core', 'ml', 'data', 'gujarat_rainfall_data.csv')
 
-def get_rainfall(region: str | None = None) -> List[Dict[str, str]]:
+
+def _parse_rainfall_csv(csv_path: str) -> ColumnarRecords:
+    # Expected columns: City, Rainfall (mm), Time Period
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+    def col(name: str) -> pd.Series:
+        return (df[name] if name in df.columns else pd.Series('', index=df.index)).astype(str).str.strip()
+
+    out = pd.DataFrame({
+        'region': col('City'),
+        'rainfall_mm': col('Rainfall (mm)'),
+        'period': col('Time Period'),
+    })
+    out = out[out['region'] != '']
+    out['source'] = 'Gujarat CSV'
+    return ColumnarRecords.from_frame(out)
+
+
+def rainfall_queryset(region: str | None = None, query: str | None = None):
     """
-    Scrape rainfall information by region.
+    Latest-day RainfallReading rows with the filters pushed down to SQL, or None when nothing
+    has been loaded. region matches the region name; query matches region or period.
+    """
+    from django.db.models import Max
+    from core.models import RainfallReading
+
+    latest = RainfallReading.objects.aggregate(latest=Max('date'))['latest']
+    return None if latest is None else _latest_rainfall(latest, region, query)
+
+
+async def arainfall_queryset(region: str | None = None, query: str | None = None):
+    """rainfall_queryset() for async views: the latest date is read through the async ORM."""
+    from django.db.models import Max
+    from core.models import RainfallReading
+
+    latest = (await RainfallReading.objects.aaggregate(latest=Max('date')))['latest']
+    return None if latest is None else _latest_rainfall(latest, region, query)
+
+
+def _latest_rainfall(latest, region, query):
+    from django.db.models import Q
+    from core.models import RainfallReading
 
-    For demo reliability, attempts to parse a simple table from a placeholder URL,
-    else returns static sample data.
+    qs = RainfallReading.objects.filter(date=latest)
+    if region:
+        qs = qs.filter(region__icontains=region)
+    if query:
+        qs = qs.filter(Q(region__icontains=query) | Q(period__icontains=query))
+    return qs.order_by('-rainfall_mm', 'region').values('region', 'rainfall_mm', 'period', 'source')
+
+
+def rainfall_rows(values) -> List[Dict[str, str]]:
+    """Convert rainfall_queryset() values to the dict shape returned by get_rainfall."""
+    return [
+        {
+            'region': v['region'],
+            'rainfall_mm': format_number(v['rainfall_mm']),
+            'period': v['period'],
+            'source': v['source'],
+        }
+        for v in values
+    ]
+
+
+def get_rainfall_index() -> SubstringIndex | None:
     """
-    # 1) Preferred source: local CSV core/ml/data/gujarat_rainfall_data.csv
+    Search index over the local CSV records, rebuilt only when the file changes.
+    None when the CSV is unavailable (callers then fall back to the list from get_rainfall).
+    Only consulted when the RainfallReading table has no rows.
+    """
+    def build(path: str) -> SubstringIndex:
+        records = market_cache.get(path, _parse_rainfall_csv, namespace='rainfall')
+        if records is None:
+            raise FileNotFoundError(path)
+        return SubstringIndex(records, ('region', 'period'))
+
+    index = market_cache.get(RAINFALL_CSV_PATH, build, namespace='rainfall-index')
+    if index is None or not len(index):
+        return None
+    return index
+
+
+RAINFALL_URL = getattr(settings, 'MARKET_RAINFALL_URL', "https://www.example.com/weather/rainfall-table")  # placeholder
+
+
+def local_rainfall(region: str | None = None) -> List[Dict[str, str]]:
+    """Readings from the RainfallReading table (filtered in SQL), else the local CSV; [] if neither has rows."""
+    # 1) Preferred source: RainfallReading table, filtered in SQL
     try:
-        csv_path = os.path.join(settings.BASE_DIR, 'core', 'ml', 'data', 'gujarat_rainfall_data.csv')
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            # Expected columns: City, Rainfall (mm), Time Period
-            out: List[Dict[str, str]] = []
-            for _, row in df.iterrows():
-                region_name = str(row.get('City', '')).strip()
-                rainfall_mm = str(row.get('Rainfall (mm)', '')).strip()
-                period = str(row.get('Time Period', '')).strip()
-                if not region_name:
-                    continue
-                out.append({
-                    'region': region_name,
-                    'rainfall_mm': rainfall_mm,
-                    'period': period,
-                    'source': 'Gujarat CSV',
-                })
-            if region:
-                out = [r for r in out if region.lower() in r.get('region', '').lower()]
+        qs = rainfall_queryset(region=region)
+        if qs is not None:
+            out = rainfall_rows(qs)
+            if out:
+                return out
+    except Exception:
+        # Table missing (migrations not applied) or DB unavailable: use the CSV
+        pass
+    return _csv_rainfall(region)
+
+
+async def alocal_rainfall(region: str | None = None) -> List[Dict[str, str]]:
+    """local_rainfall() for async views: the table through the async ORM, the CSV on the offload pool."""
+    from core.offload import run_cpu
+
+    try:
+        qs = await arainfall_queryset(region=region)
+        if qs is not None:
+            out = rainfall_rows([v async for v in qs])
             if out:
                 return out
     except Exception:
-        # If CSV read fails, fall back to web/placeholder and then to sample
         pass
+    return await run_cpu(_csv_rainfall, region)
+
 
-    # 2) Secondary attempt: placeholder scraping (kept as fallback)
-    url = "https://www.example.com/weather/rainfall-table"  # placeholder
+def _csv_rainfall(region: str | None) -> List[Dict[str, str]]:
+    # 2) Local CSV core/ml/data/gujarat_rainfall_data.csv (parsed once per file change)
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        if resp.ok and "<table" in resp.text:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            table = soup.find("table")
-            rows = table.find_all("tr") if table else []
-            out2: List[Dict[str, str]] = []
-            for tr in rows[1:]:
-                tds = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
-                if len(tds) >= 3:
-                    out2.append({
-                        "region": tds[0],
-                        "rainfall_mm": tds[1],
-                        "period": tds[2],
-                        "source": "Parsed table",
-                    })
+        records = market_cache.get(RAINFALL_CSV_PATH, _parse_rainfall_csv, namespace='rainfall')
+        if records is not None:
             if region:
-                out2 = [r for r in out2 if region.lower() in r.get("region", "").lower()]
-            if out2:
-                return out2
+                q = region.lower()
+                return records.rows([i for i, v in enumerate(records.column('region')) if q in v.lower()])
+            return records.rows()
     except Exception:
+        # If CSV read fails, fall back to web/placeholder and then to sample
         pass
+    return []
 
+
+def parse_rainfall_html(html: str, region: str | None = None) -> List[Dict[str, str]]:
+    """Rows of the first HTML table as region, rainfall_mm, period."""
+    if "<table" not in html:
+        return []
+    out: List[Dict[str, str]] = []
+    for tds in extract_rows(html)[1:]:
+        if len(tds) >= 3:
+            out.append({
+                "region": tds[0],
+                "rainfall_mm": tds[1],
+                "period": tds[2],
+                "source": "Parsed table",
+            })
+    if region:
+        out = [r for r in out if region.lower() in r.get("region", "").lower()]
+    return out
+
+
+def sample_rainfall(region: str | None = None) -> List[Dict[str, str]]:
     sample = [
         {"region": "Delhi", "rainfall_mm": "12.4", "period": "Last 24h", "source": "Sample"},
         {"region": "Mumbai", "rainfall_mm": "45.8", "period": "Last 24h", "source": "Sample"},
@@ -79,3 +170,26 @@ def get_rainfall(region: str | None = None) -> List[Dict[str, str]]:
     if region:
         sample = [r for r in sample if region.lower() in r["region"].lower()]
     return sample
+
+
+def get_rainfall(region: str | None = None, deadline: float | None = None) -> List[Dict[str, str]]:
+    """
+    Scrape rainfall information by region.
+
+    Uses readings loaded into the database first, then the local Gujarat CSV. For demo
+    reliability, attempts to parse a simple table from a placeholder URL (through the shared
+    fetch layer), else returns static sample data. deadline caps the seconds spent on the
+    scrape, retries included (see core.scrapers.fetch.INTERACTIVE_DEADLINE).
+    """
+    out = local_rainfall(region)
+    if out:
+        return out
+
+    # 3) Secondary attempt: placeholder scraping (kept as fallback)
+    result = fetch_text(RAINFALL_URL, deadline)
+    if result.ok:
+        out = parse_rainfall_html(result.text, region)
+        if out:
+            return out
+
+    return sample_rainfall(region)
@@ -1,89 +1,296 @@
 from __future__ import annotations
 
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict
-import time
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urljoin
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+import datetime
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core import page_cache
+
+from .browser import BrowserPool, fetch_rendered_html
+from .tables import extract_rows
+
+logger = logging.getLogger(__name__)
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36"
 }
 
+SCHEMES_URL = "https://agri.gujarat.gov.in/Scheme"
+# The table is filled in by JavaScript; its first row marks the page as ready
+SCHEMES_READY_SELECTOR = "#tblSchemes tbody tr"
+
+
+def parse_schemes_html(html: str, base_url: str = SCHEMES_URL, limit: int | None = None) -> List[Dict[str, str]]:
+    """Extract {title, url, cols: [serial, department, scheme, url]} rows from the schemes page."""
+    items: List[Dict[str, str]] = []
+
+    # 1) Site-specific: parse schemes table (body rows only; header rows have no td)
+    current_dept = ""
+    for tds in extract_rows(html, table_id="tblSchemes", with_links=True, data_only=True):
+        if len(tds) < 3:
+            continue
+
+        # Two layouts expected due to rowspan on Department column:
+        # A) 4 tds => [serial, department, scheme, link]
+        # B) 3 tds => [serial, scheme, link] (department carried from previous row)
+        serial = tds[0][0]
+        if len(tds) >= 4:
+            dept_text = tds[1][0]
+            if dept_text:
+                current_dept = dept_text
+            department = current_dept
+            scheme_td_index = 2
+            link_td_index = 3
+        else:  # len == 3
+            department = current_dept
+            scheme_td_index = 1
+            link_td_index = 2
 
-def get_schemes(limit: int | None = 10) -> List[Dict[str, str]]:
+        # Scheme name and link
+        scheme_name = tds[scheme_td_index][0]
+        href = tds[link_td_index][1]
+        full_url = urljoin(base_url, href) if href else base_url
+
+        if scheme_name or department:
+            title = scheme_name or department
+            cols = [serial, department, scheme_name, full_url]
+            items.append({"title": title, "url": full_url, "cols": cols})
+            if limit is not None and len(items) >= limit:
+                break
+    return items
+
+
+def get_schemes(limit: int | None = 10, url: str = SCHEMES_URL, pool: Optional[BrowserPool] = None) -> List[Dict[str, str]]:
     """
     Scrape latest government schemes from Gujarat Agriculture site.
-    Falls back to sample items if scraping fails.
+    Uses a pooled headless browser and waits for the schemes table rather than a fixed delay.
+    Returns an empty list if scraping fails.
     """
-    url = "https://agri.gujarat.gov.in/Scheme"
-    items: List[Dict[str, str]] = []
-
     try:
-        # Selenium-only scraping (per user request)
-        options = ChromeOptions()
-        options.add_argument("--headless=new")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-dev-shm-usage")
-        driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-        try:
-            driver.get(url)
-            time.sleep(5)  # wait for JavaScript to load
-            html = driver.page_source
-        finally:
-            driver.quit()
-
-        soup = BeautifulSoup(html, "html.parser")
-
-        # 1) Site-specific: parse schemes table
-        rows = soup.select("#tblSchemes tbody tr")
-        if rows:
-            current_dept = ""
-            for tr in rows:
-                tds = tr.find_all("td")
-                if len(tds) < 3:
-                    continue
-
-                # Two layouts expected due to rowspan on Department column:
-                # A) 4 tds => [serial, department, scheme, link]
-                # B) 3 tds => [serial, scheme, link] (department carried from previous row)
-                serial = tds[0].get_text(strip=True)
-                if len(tds) >= 4:
-                    dept_cell = tds[1]
-                    dept_text = dept_cell.get_text(strip=True)
-                    if dept_text:
-                        current_dept = dept_text
-                    department = current_dept
-                    scheme_td_index = 2
-                    link_td_index = 3
-                else:  # len == 3
-                    department = current_dept
-                    scheme_td_index = 1
-                    link_td_index = 2
-
-                # Scheme name and link
-                scheme_name = tds[scheme_td_index].get_text(strip=True) if len(tds) > scheme_td_index else ""
-                link_tag = tds[link_td_index].find("a") if len(tds) > link_td_index else None
-                href = link_tag.get("href") if link_tag else ""
-                full_url = urljoin(url, href) if href else url
-
-                if scheme_name or department:
-                    title = scheme_name or department
-                    cols = [serial, department, scheme_name, full_url]
-                    items.append({"title": title, "url": full_url, "cols": cols})
-
-        if items:
-            if limit is not None:
-                items = items[:limit]
-            return items
-
+        html = fetch_rendered_html(url, SCHEMES_READY_SELECTOR,
+                                   timeout=getattr(settings, "SCHEMES_WAIT_TIMEOUT", 15), pool=pool)
+        return parse_schemes_html(html, base_url=url, limit=limit)
     except Exception as e:
         print(f"[Error] Could not scrape schemes: {e}")
 
     # Fallback: return empty list if nothing scraped
     return []
+
+
+# Stored snapshot ---------------------------------------------------------------
+#
+# A refresh (management command `refresh_schemes`, or a background revalidation) scrapes
+# the site and reconciles the Scheme table by per-row content hash: unchanged rows are not
+# written, new rows are inserted, vanished rows are deleted. A failed or empty scrape keeps
+# the previous rows and is recorded on one failure row per run of failures. The view serves
+# the stored rows and, when the last good refresh is older than SCHEMES_REFRESH_INTERVAL
+# seconds (default 6h), queues a revalidation in the background: not before
+# SCHEMES_RETRY_BACKOFF seconds (default 300, doubled per consecutive failure up to the
+# refresh interval) have passed since a failed one, and never when
+# SCHEMES_BACKGROUND_REFRESH is False (refreshes then come only from the command; the
+# test runner turns it off).
+
+REFRESH_INTERVAL = datetime.timedelta(seconds=getattr(settings, "SCHEMES_REFRESH_INTERVAL", 6 * 3600))
+RETRY_BACKOFF = datetime.timedelta(seconds=getattr(settings, "SCHEMES_RETRY_BACKOFF", 300))
+_CHECKED_KEY = "schemes:last-good-refresh"
+_RETRY_KEY = "schemes:retry-after"
+_NO_WAIT = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: Optional[Future] = None
+_lock = threading.Lock()
+
+
+def _row_hash(item: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(item["cols"], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _new_scheme(digest: str, position: int, item: Dict[str, str]):
+    from core.models import Scheme
+
+    serial, department, _name, link = item["cols"]
+    return Scheme(position=position, serial=serial[:16], department=department[:255],
+                  title=item["title"][:500], url=link[:500], content_hash=digest)
+
+
+def refresh_schemes(url: str = SCHEMES_URL, pool: Optional[BrowserPool] = None, html: Optional[str] = None):
+    """Scrape (or parse the given html) and store the result. Returns the SchemeSnapshot recorded."""
+    from core.models import Scheme, SchemeSnapshot
+
+    try:
+        if html is None:
+            html = fetch_rendered_html(url, SCHEMES_READY_SELECTOR,
+                                       timeout=getattr(settings, "SCHEMES_WAIT_TIMEOUT", 15), pool=pool)
+        items = parse_schemes_html(html, base_url=url)
+        if not items:
+            raise ValueError("no schemes found on the page")
+    except Exception as exc:
+        logger.warning("Schemes refresh failed: %s", exc)
+        return _record_failure(str(exc))
+
+    rows: Dict[str, Tuple[int, Dict[str, str]]] = {}
+    for item in items:
+        rows.setdefault(_row_hash(item), (len(rows), item))
+    list_hash = hashlib.sha256("".join(rows).encode("ascii")).hexdigest()
+
+    last = SchemeSnapshot.objects.filter(ok=True).only("content_hash").first()
+    changed = last is None or last.content_hash != list_hash
+    if changed:
+        with transaction.atomic():
+            existing = {s.content_hash: s for s in Scheme.objects.all()}
+            Scheme.objects.filter(content_hash__in=set(existing) - set(rows)).delete()
+            moved = []
+            for digest, (position, item) in rows.items():
+                scheme = existing.get(digest)
+                if scheme is not None and scheme.position != position:
+                    scheme.position = position
+                    moved.append(scheme)
+            Scheme.objects.bulk_update(moved, ["position"])
+            Scheme.objects.bulk_create([
+                _new_scheme(digest, position, item)
+                for digest, (position, item) in rows.items() if digest not in existing
+            ])
+    snapshot = SchemeSnapshot.objects.create(ok=True, content_hash=list_hash, items=len(rows), changed=changed)
+    cache.set(_CHECKED_KEY, snapshot.checked_at, None)
+    cache.set(_RETRY_KEY, _NO_WAIT, None)
+    page_cache.invalidate("schemes")  # the page shows the refresh time even when nothing changed
+    return snapshot
+
+
+def retry_delay(failures: int) -> datetime.timedelta:
+    """How long a background refresh waits after the given number of consecutive failures."""
+    return min(RETRY_BACKOFF * 2 ** min(max(0, failures - 1), 20), REFRESH_INTERVAL)
+
+
+def _retry_after(snapshot) -> datetime.datetime:
+    if snapshot is None or snapshot.ok:
+        return _NO_WAIT
+    return snapshot.checked_at + retry_delay(snapshot.failures)
+
+
+def _record_failure(error: str):
+    """Count a failed refresh on the current run's failure row, starting one if needed."""
+    from core.models import SchemeSnapshot
+
+    with transaction.atomic():
+        last = SchemeSnapshot.objects.select_for_update().first()
+        if last is not None and not last.ok:
+            last.failures += 1
+            last.error = error
+            last.checked_at = timezone.now()
+            last.save(update_fields=["failures", "error", "checked_at"])
+            snapshot = last
+        else:
+            snapshot = SchemeSnapshot.objects.create(ok=False, error=error, failures=1)
+    cache.set(_RETRY_KEY, _retry_after(snapshot), None)
+    return snapshot
+
+
+def _stale(checked: Optional[datetime.datetime]) -> bool:
+    return checked is None or timezone.now() - checked > REFRESH_INTERVAL
+
+
+def _background_refresh_allowed() -> bool:
+    return getattr(settings, "SCHEMES_BACKGROUND_REFRESH", True)
+
+
+def _sync_retry_after() -> datetime.datetime:
+    from core.models import SchemeSnapshot
+
+    retry_after = cache.get(_RETRY_KEY)
+    if retry_after is None:
+        retry_after = _retry_after(SchemeSnapshot.objects.first())
+        cache.set(_RETRY_KEY, retry_after, None)
+    return retry_after
+
+
+async def _async_retry_after() -> datetime.datetime:
+    from core.models import SchemeSnapshot
+
+    retry_after = await cache.aget(_RETRY_KEY)
+    if retry_after is None:
+        retry_after = _retry_after(await SchemeSnapshot.objects.afirst())
+        await cache.aset(_RETRY_KEY, retry_after, None)
+    return retry_after
+
+
+def _last_good_refresh() -> Optional[datetime.datetime]:
+    from core.models import SchemeSnapshot
+
+    checked = cache.get(_CHECKED_KEY)
+    if checked is None:
+        snapshot = SchemeSnapshot.objects.filter(ok=True).only("checked_at").first()
+        if snapshot is not None:
+            checked = snapshot.checked_at
+            cache.set(_CHECKED_KEY, checked, None)
+    return checked
+
+
+def _run_refresh() -> None:
+    try:
+        refresh_schemes()
+    except Exception:
+        logger.exception("Background schemes refresh failed")
+    finally:
+        close_old_connections()
+
+
+def schedule_refresh() -> Future:
+    """Queue a background refresh unless one is already queued or running."""
+    global _executor, _pending
+    with _lock:
+        if _pending is not None and not _pending.done():
+            return _pending
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="schemes-refresh")
+        _pending = _executor.submit(_run_refresh)
+        return _pending
+
+
+def stored_schemes(limit: int | None = 10) -> Tuple[List[Dict[str, str]], Optional[datetime.datetime]]:
+    """
+    Most recent good snapshot as (items, refreshed_at), in get_schemes() shape. Never scrapes:
+    a missing or stale snapshot at most queues a background refresh.
+    """
+    checked = _last_good_refresh()
+    if _background_refresh_allowed() and _stale(checked) and _sync_retry_after() <= timezone.now():
+        schedule_refresh()
+    items = [_item(*row) for row in _stored_rows(limit)]
+    return items, checked
+
+
+async def astored_schemes(limit: int | None = 10) -> Tuple[List[Dict[str, str]], Optional[datetime.datetime]]:
+    """stored_schemes() for async views, through the async cache and ORM APIs."""
+    from core.models import SchemeSnapshot
+
+    checked = await cache.aget(_CHECKED_KEY)
+    if checked is None:
+        snapshot = await SchemeSnapshot.objects.filter(ok=True).only("checked_at").afirst()
+        if snapshot is not None:
+            checked = snapshot.checked_at
+            await cache.aset(_CHECKED_KEY, checked, None)
+    if _background_refresh_allowed() and _stale(checked) and await _async_retry_after() <= timezone.now():
+        schedule_refresh()
+    items = [_item(*row) async for row in _stored_rows(limit)]
+    return items, checked
+
+
+def _stored_rows(limit: int | None):
+    from core.models import Scheme
+
+    qs = Scheme.objects.values_list("serial", "department", "title", "url")
+    return qs[:limit] if limit is not None else qs
+
+
+def _item(serial: str, department: str, title: str, url: str) -> Dict[str, str]:
+    return {"title": title, "url": url, "cols": [serial, department, title, url]}
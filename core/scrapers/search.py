@@ -0,0 +1,88 @@
+"""
+Trigram index for case-insensitive substring filters over ColumnarRecords.
+
+Every indexed field value is lower-cased and split into overlapping 3-character grams.
+A query looks up the posting list of each of its own trigrams, intersects them starting
+with the rarest, and only verifies the surviving candidates with a real substring test.
+Queries shorter than three characters fall back to a scan of the normalized values.
+
+The index only serves the local-CSV fallback of the market page. When the partitioned
+price store (core.scrapers.ingest) or the CropPrice/RainfallReading tables hold rows,
+the page filters those with pandas or SQL instead and no index is built: both narrow
+the rows to the selected dates (by default the latest one) before matching, which
+leaves little for an index to save.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from .cache import ColumnarRecords
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _contains(sorted_ids: array, value: int) -> bool:
+    pos = bisect_left(sorted_ids, value)
+    return pos < len(sorted_ids) and sorted_ids[pos] == value
+
+
+class SubstringIndex:
+    def __init__(self, records: ColumnarRecords, fields: Sequence[str]) -> None:
+        self.records = records
+        self.fields = tuple(fields)
+        # Normalized values per row, one tuple entry per field
+        self._values: List[Tuple[str, ...]] = list(zip(*(
+            tuple(str(v or "").strip().lower() for v in records.column(f)) for f in self.fields
+        ))) if len(records) else []
+        postings: Dict[str, array] = {}
+        for row_id, values in enumerate(self._values):
+            grams = set()
+            for value in values:
+                grams |= _trigrams(value)
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is None:
+                    ids = postings[gram] = array("I")
+                ids.append(row_id)  # row ids are appended in order, so lists stay sorted
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _matches(self, row_id: int, q: str) -> bool:
+        return any(q in value for value in self._values[row_id])
+
+    def search(self, query: str) -> List[int]:
+        """Row ids (ascending) whose indexed fields contain query, ignoring case and padding."""
+        q = str(query or "").strip().lower()
+        if not q:
+            return list(range(len(self._values)))
+        if len(q) < 3:
+            return [i for i in range(len(self._values)) if self._matches(i, q)]
+        lists = []
+        for gram in _trigrams(q):
+            ids = self._postings.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+        rarest, others = lists[0], lists[1:]
+        if len(rarest) * 16 < sum(len(ids) for ids in others):
+            # Selective query: walk the rarest posting list and binary-search the others,
+            # so cost scales with the smallest list rather than the table size
+            candidates = [i for i in rarest if all(_contains(ids, i) for ids in others)]
+        else:
+            # Posting lists of similar size: plain set intersection is cheaper
+            common = set(rarest)
+            for ids in others:
+                common.intersection_update(ids)
+            candidates = sorted(common)
+        # Trigram hits can come from different fields or positions; confirm the real substring
+        return [i for i in candidates if self._matches(i, q)]
+
+    def rows(self, row_ids: Sequence[int]) -> List[Dict[str, str]]:
+        return self.records.rows(row_ids)
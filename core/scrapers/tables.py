@@ -0,0 +1,157 @@
+"""
+Pluggable HTML table extraction for the scrapers.
+
+`extract_rows()` returns the rows of one table as lists of cell strings (or (text, href)
+pairs) using the fastest parser available:
+
+    selectolax  (Lexbor, C)       pip install selectolax
+    lxml        (libxml2, C)      pip install lxml
+    html.parser (BeautifulSoup)   always available; a SoupStrainer limits tree building
+                                  to the target table instead of the whole page
+
+Cell text follows BeautifulSoup's get_text(strip=True) on every backend: each text node is
+stripped and the pieces are joined without a separator, so results do not depend on which
+parser is installed. Set SCRAPER_HTML_BACKEND to force one. Compare them with
+`python core/scrapers/benchmark_tables.py`.
+"""
+from __future__ import annotations
+
+import functools
+import importlib.util
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from django.conf import settings
+
+Cell = Union[str, Tuple[str, str]]
+Row = List[Cell]
+
+BACKEND_ORDER = ("selectolax", "lxml", "html.parser")
+_MODULES = {"selectolax": "selectolax", "lxml": "lxml", "html.parser": "bs4"}
+
+
+@functools.lru_cache(maxsize=None)
+def available_backends() -> Tuple[str, ...]:
+    return tuple(name for name in BACKEND_ORDER if importlib.util.find_spec(_MODULES[name]) is not None)
+
+
+def default_backend() -> str:
+    forced = getattr(settings, "SCRAPER_HTML_BACKEND", None)
+    if forced:
+        return forced
+    return available_backends()[0]
+
+
+def _keep(cells: Row, tag_names: List[str], data_only: bool) -> bool:
+    return bool(cells) and (not data_only or "td" in tag_names)
+
+
+# selectolax ---------------------------------------------------------------------------
+
+def _rows_selectolax(html: str, table_id: Optional[str], with_links: bool, data_only: bool) -> List[Row]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    table = tree.css_first(f'table[id="{table_id}"]' if table_id else "table")
+    if table is None:
+        return []
+    rows: List[Row] = []
+    for tr in table.css("tr"):
+        cells: Row = []
+        tags: List[str] = []
+        for cell in tr.iter():
+            if cell.tag not in ("td", "th"):
+                continue
+            tags.append(cell.tag)
+            text = cell.text(deep=True, separator="", strip=True)
+            if with_links:
+                link = cell.css_first("a[href]")
+                cells.append((text, (link.attributes.get("href") or "") if link is not None else ""))
+            else:
+                cells.append(text)
+        if _keep(cells, tags, data_only):
+            rows.append(cells)
+    return rows
+
+
+# lxml ---------------------------------------------------------------------------------
+
+def _rows_lxml(html: str, table_id: Optional[str], with_links: bool, data_only: bool) -> List[Row]:
+    import lxml.html
+
+    if not html.strip():
+        return []
+    root = lxml.html.document_fromstring(html)
+    found = root.xpath("//table[@id=$id]", id=table_id) if table_id else root.xpath("(//table)[1]")
+    if not found:
+        return []
+    rows: List[Row] = []
+    for tr in found[0].iter("tr"):
+        cells: Row = []
+        tags: List[str] = []
+        for cell in tr:
+            if cell.tag not in ("td", "th"):
+                continue
+            tags.append(cell.tag)
+            text = "".join(piece.strip() for piece in cell.itertext())
+            if with_links:
+                hrefs = cell.xpath(".//a/@href")
+                cells.append((text, str(hrefs[0]) if hrefs else ""))
+            else:
+                cells.append(text)
+        if _keep(cells, tags, data_only):
+            rows.append(cells)
+    return rows
+
+
+# BeautifulSoup ------------------------------------------------------------------------
+
+def _rows_bs4(html: str, table_id: Optional[str], with_links: bool, data_only: bool) -> List[Row]:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    only = SoupStrainer("table", id=table_id) if table_id else SoupStrainer("table")
+    soup = BeautifulSoup(html, "html.parser", parse_only=only)
+    table = soup.find("table")
+    if table is None:
+        return []
+    rows: List[Row] = []
+    for tr in table.find_all("tr"):
+        cells: Row = []
+        tags: List[str] = []
+        for cell in tr.find_all(["td", "th"], recursive=False):
+            tags.append(cell.name)
+            text = cell.get_text(strip=True)
+            if with_links:
+                link = cell.find("a", href=True)
+                cells.append((text, link["href"] if link else ""))
+            else:
+                cells.append(text)
+        if _keep(cells, tags, data_only):
+            rows.append(cells)
+    return rows
+
+
+BACKENDS: Dict[str, Callable[[str, Optional[str], bool, bool], List[Row]]] = {
+    "selectolax": _rows_selectolax,
+    "lxml": _rows_lxml,
+    "html.parser": _rows_bs4,
+}
+
+
+def extract_rows(
+    html: str,
+    table_id: Optional[str] = None,
+    with_links: bool = False,
+    data_only: bool = False,
+    backend: Optional[str] = None,
+) -> List[Row]:
+    """
+    Rows of the table with the given id (or the first table), each a list of td/th cell
+    texts; with_links makes each cell a (text, first href) pair. data_only drops rows
+    without any td (header rows).
+    """
+    name = backend or default_backend()
+    try:
+        extract = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown HTML backend {name!r}; expected one of {BACKEND_ORDER}") from None
+    return extract(html, table_id, with_links, data_only)
@@ -0,0 +1,31 @@
+"""Model signal handlers, connected in CoreConfig.ready()."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import page_cache, tip_search
+from .models import CropPrice, RainfallReading, Tip
+
+
+@receiver(post_save, sender=Tip, dispatch_uid="core.tip_search.index")
+def index_tip(sender, instance, raw=False, **kwargs):
+    tip_search.index_tip(instance)
+    page_cache.invalidate("tips")
+
+
+@receiver(post_delete, sender=Tip, dispatch_uid="core.tip_search.unindex")
+def unindex_tip(sender, instance, **kwargs):
+    tip_search.unindex_tip(instance.pk)
+    page_cache.invalidate("tips")
+
+
+@receiver(post_save, sender=CropPrice, dispatch_uid="core.page_cache.prices_saved")
+@receiver(post_delete, sender=CropPrice, dispatch_uid="core.page_cache.prices_deleted")
+def prices_changed(sender, **kwargs):
+    # Bulk loads bypass signals and invalidate themselves (load_market_data)
+    page_cache.invalidate("prices")
+
+
+@receiver(post_save, sender=RainfallReading, dispatch_uid="core.page_cache.rainfall_saved")
+@receiver(post_delete, sender=RainfallReading, dispatch_uid="core.page_cache.rainfall_deleted")
+def rainfall_changed(sender, **kwargs):
+    page_cache.invalidate("rainfall")
@@ -0,0 +1,204 @@
+"""
+Low-overhead query telemetry.
+
+Views call `record(...)`, which only appends a tuple to an in-memory ring buffer (a
+bounded deque, so a stalled database can never grow memory or block a request; the
+oldest events are dropped instead). A daemon thread drains the buffer every few
+seconds, or as soon as a batch fills up, bulk-inserts the events into QueryEvent and
+increments the per-day QueryRollup counters. Charts and reports read the rollups.
+
+Events still buffered when the process exits are written by a last flush. With
+TELEMETRY_BACKGROUND off (as under the test runner) they are dropped instead, and the
+count logged: by then the default database may be a different one, e.g. after the test
+runner has destroyed its test database.
+
+Optional settings:
+    TELEMETRY_ENABLED         record events at all (default True)
+    TELEMETRY_BACKGROUND      flush from the daemon thread (default True); when False, events
+                              wait for an explicit flush(). The test runner turns it off.
+    TELEMETRY_BUFFER_SIZE     ring buffer capacity (default 10000)
+    TELEMETRY_FLUSH_BATCH     buffered events that trigger an early flush (default 500)
+    TELEMETRY_FLUSH_INTERVAL  seconds between background flushes (default 5)
+"""
+from __future__ import annotations
+
+import atexit
+import collections
+import datetime
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# (timestamp, kind, region, crop, detail)
+Event = Tuple[float, str, str, str, str]
+
+# Which event fields are rolled up, per kind
+ROLLUP_DIMENSIONS = {
+    "suggestion": ("crop",),
+    "market": ("region", "query"),
+}
+
+
+FLUSH_BATCH = getattr(settings, "TELEMETRY_FLUSH_BATCH", 500)
+FLUSH_INTERVAL = float(getattr(settings, "TELEMETRY_FLUSH_INTERVAL", 5))
+
+_buffer: "collections.deque[Event]" = collections.deque(maxlen=getattr(settings, "TELEMETRY_BUFFER_SIZE", 10000))
+_wakeup = threading.Event()
+_flush_lock = threading.Lock()
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stats = {"recorded": 0, "dropped": 0, "flushed": 0, "flushes": 0, "last_flush_ms": 0.0}
+
+
+def _count(**deltas) -> None:
+    with _stats_lock:
+        for name, n in deltas.items():
+            _stats[name] += n
+
+
+def record(kind: str, region: str = "", crop: str = "", detail: str = "") -> None:
+    """Queue one event. Never touches the database; safe to call on the request path."""
+    if not getattr(settings, "TELEMETRY_ENABLED", True):
+        return
+    full = len(_buffer) == _buffer.maxlen
+    _buffer.append((time.time(), kind, (region or "").strip()[:120], (crop or "").strip()[:120],
+                    (detail or "").strip()[:255]))
+    _count(recorded=1, dropped=int(full))
+    if _thread is None and getattr(settings, "TELEMETRY_BACKGROUND", True):
+        _start()
+    if len(_buffer) >= FLUSH_BATCH and not _wakeup.is_set():
+        _wakeup.set()
+
+
+def _start() -> None:
+    global _thread
+    with _start_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="telemetry-flush", daemon=True)
+            _thread.start()
+
+
+def _run() -> None:
+    while True:
+        _wakeup.wait(FLUSH_INTERVAL)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Telemetry flush failed")
+        finally:
+            close_old_connections()
+
+
+def _drain() -> List[Event]:
+    events = []
+    try:
+        while True:
+            events.append(_buffer.popleft())
+    except IndexError:
+        return events
+
+
+def _rollup_counts(events: List[Event]) -> Dict[Tuple[datetime.date, str, str, str], int]:
+    counts: Dict[Tuple[datetime.date, str, str, str], int] = collections.Counter()
+    for ts, kind, region, crop, detail in events:
+        day = timezone.localdate(datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc))
+        values = {"region": region, "crop": crop, "query": detail}
+        for dimension in ROLLUP_DIMENSIONS.get(kind, ()):
+            key = values[dimension].title() if dimension != "query" else values[dimension].lower()
+            if key:
+                counts[(day, kind, dimension, key[:120])] += 1
+    return counts
+
+
+def _increment(day, kind: str, dimension: str, key: str, n: int) -> None:
+    from .models import QueryRollup
+
+    lookup = dict(day=day, kind=kind, dimension=dimension, key=key)
+    if QueryRollup.objects.filter(**lookup).update(count=F("count") + n):
+        return
+    try:
+        with transaction.atomic():
+            QueryRollup.objects.create(count=n, **lookup)
+    except IntegrityError:
+        # Another worker created the row first
+        QueryRollup.objects.filter(**lookup).update(count=F("count") + n)
+
+
+def flush() -> int:
+    """Write everything buffered so far. Returns the number of events written."""
+    from .models import QueryEvent
+
+    with _flush_lock:
+        events = _drain()
+        if not events:
+            return 0
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                QueryEvent.objects.bulk_create([
+                    QueryEvent(
+                        created_at=datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc),
+                        kind=kind, region=region, crop=crop, detail=detail,
+                    )
+                    for ts, kind, region, crop, detail in events
+                ], batch_size=500)
+                for (day, kind, dimension, key), n in _rollup_counts(events).items():
+                    _increment(day, kind, dimension, key, n)
+        except Exception:
+            _count(dropped=len(events))
+            raise
+        with _stats_lock:
+            _stats["flushed"] += len(events)
+            _stats["flushes"] += 1
+            _stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return len(events)
+
+
+def discard() -> int:
+    """Drop everything buffered without writing it. Returns the number of events dropped."""
+    with _flush_lock:
+        dropped = len(_drain())
+    _count(dropped=dropped)
+    return dropped
+
+
+def _at_exit() -> None:
+    if getattr(settings, "TELEMETRY_BACKGROUND", True):
+        try:
+            flush()
+        except Exception:
+            logger.exception("Telemetry flush at exit failed")
+        return
+    dropped = discard()
+    if dropped:
+        logger.warning("Dropped %d telemetry events still buffered at exit", dropped)
+
+
+atexit.register(_at_exit)
+
+
+def top(dimension: str, kind: Optional[str] = None, days: int = 30, limit: int = 8) -> Dict[str, int]:
+    """Most frequent keys for a rolled-up dimension over the last `days` days, busiest first."""
+    from .models import QueryRollup
+
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    qs = QueryRollup.objects.filter(dimension=dimension, day__gte=since)
+    if kind:
+        qs = qs.filter(kind=kind)
+    rows = qs.values("key").annotate(total=Sum("count")).order_by("-total", "key")[:limit]
+    return {row["key"]: int(row["total"]) for row in rows}
+
+
+def stats() -> Dict[str, float]:
+    with _stats_lock:
+        return dict(_stats, buffered=len(_buffer))
@@ -0,0 +1,20 @@
+"""
+Test runner for the project (settings.TEST_RUNNER).
+
+Background work that page views would otherwise start is turned off during tests:
+
+- telemetry's flush thread, which writes through its own connection, outside each
+  test's transaction. Tests that check telemetry call core.telemetry.flush() themselves,
+  and whatever is left is dropped at exit rather than flushed;
+- the schemes refresh a page view queues when no snapshot is stored, which would start
+  a real browser and scrape the live site. Tests refresh from fixture HTML.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.TELEMETRY_BACKGROUND = False
+        settings.SCHEMES_BACKGROUND_REFRESH = False
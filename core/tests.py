@@ -1,3 +1,1339 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import csv
+import datetime
+import functools
+import io
+import multiprocessing
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from . import telemetry, views
+from .analytics import aggregates, prerender
+from .analytics.charts import draw_prices, render_timed
+from .analytics.registry import Chart, ChartRegistry
+from .jobs import claim_job, run_job
+from .importtime import parse_importtime, profile_import, budget_ms
+from .ml import train_model
+from .ml.batch import encode_records, recommend_batch
+from .ml.features import all_combinations, one_hot_row
+from .ml import ingest as dataset_ingest
+from .ml.ingest import DATASET_COLUMNS, MODE_APPEND, MODE_REPLACE, DatasetValidationError, ingest_dataset, read_dataset
+from .ml.numeric_model import compile_forest, load_numeric_dataset
+from .ml.registry import ModelRegistry
+from .ml.train_model import encode_dataset
+from .models import ContactMessage, CropPrice, QueryEvent, QueryRollup, RainfallReading, Scheme, SchemeSnapshot, Tip, TrainingJob
+from .queryplans import check as check_query_plans, scan_report
+from .scrapers.browser import BrowserPool, BrowserPoolTimeout
+from .scrapers.cache import ColumnarRecords, MarketDataCache
+from .scrapers import ingest, schemes
+from .scrapers.fetch import Fetcher
+from .scrapers.prices import parse_prices_html
+from .scrapers.schemes import get_schemes, parse_schemes_html, refresh_schemes, stored_schemes
+from .scrapers.search import SubstringIndex
+from .scrapers.tables import available_backends, extract_rows
+from .tip_search import fts_available, search_tips
+
+TESTDATA = pathlib.Path(__file__).resolve().parent / "testdata"
+
+
+class EncodeDatasetTests(SimpleTestCase):
+    def test_matches_one_hot_row(self):
+        df = pd.DataFrame({
+            "soil_type": ["clay", " Sandy", "LOAMY ", "silt", "peat", "chalk", "rock", None],
+            "season": ["winter", "Summer", "monsoon", " MONSOON", "spring", "winter", "summer", "winter"],
+            "rainfall_level": ["low", "medium", "HIGH", "high", "low", None, "medium", "extreme"],
+        })
+        expected = [
+            one_hot_row(str(row["soil_type"]).strip().lower(),
+                        str(row["season"]).strip().lower(),
+                        str(row["rainfall_level"]).strip().lower())
+            for _, row in df.iterrows()
+        ]
+        self.assertEqual(encode_dataset(df).toarray().tolist(), expected)
+        self.assertEqual(encode_dataset(df.astype("category"), as_sparse=False).tolist(), expected)
+
+
+
+def rendered_schemes_page() -> str:
+    """The fixture page as it looks after its script has filled the table."""
+    html = (TESTDATA / "schemes_page.html").read_text(encoding="utf-8")
+    rows = html.split('<script type="text/html" id="scheme-rows">', 1)[1].split("</script>", 1)[0]
+    return html.replace("<tbody></tbody>", f"<tbody>{rows}</tbody>")
+
+
+class SchemesParserTests(SimpleTestCase):
+    def test_parses_rowspan_layouts(self):
+        items = parse_schemes_html(rendered_schemes_page(), base_url="http://example.test/Scheme")
+        self.assertEqual([it["cols"] for it in items], [
+            ["1", "Agriculture", "Tractor Subsidy", "http://example.test/Scheme/Detail/1"],
+            ["2", "Agriculture", "Drip Irrigation Assistance", "http://example.test/Scheme/Detail/2"],
+            ["3", "Horticulture", "Mango Orchard Support", "http://example.test/Scheme"],
+        ])
+        self.assertEqual(len(parse_schemes_html(rendered_schemes_page(), limit=2)), 2)
+
+    def test_unrendered_page_has_no_rows(self):
+        self.assertEqual(parse_schemes_html((TESTDATA / "schemes_page.html").read_text(encoding="utf-8")), [])
+
+
+class TableBackendTests(SimpleTestCase):
+    def test_backends_agree_with_html_parser(self):
+        pages = [
+            ((TESTDATA / "mandi_prices.html").read_text(encoding="utf-8"), None),
+            ((TESTDATA / "mandi_prices.html").read_text(encoding="utf-8"), "rainfall"),
+            (rendered_schemes_page(), "tblSchemes"),
+        ]
+        for html, table_id in pages:
+            expected = extract_rows(html, table_id, with_links=True, backend="html.parser")
+            for backend in available_backends():
+                with self.subTest(backend=backend, table=table_id):
+                    self.assertEqual(extract_rows(html, table_id, with_links=True, backend=backend), expected)
+                    self.assertEqual(extract_rows(html, table_id, data_only=True, backend=backend),
+                                     extract_rows(html, table_id, data_only=True, backend="html.parser"))
+
+    def test_parse_prices_html(self):
+        rows = parse_prices_html((TESTDATA / "mandi_prices.html").read_text(encoding="utf-8"))
+        self.assertEqual(rows[0], {"commodity": "Wheat", "variety": "Lokwan", "price": "\u20b92,150/qtl", "market": "Rajkot"})
+        self.assertEqual(rows[1]["price"], "\u20b97,420/qtl")
+        self.assertEqual([r["commodity"] for r in rows], ["Wheat", "Cotton", "Groundnut", "Cumin"])
+
+
+class MarketDataCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.loads = []
+
+    def write(self, name, text, mtime_ns=None):
+        path = self.tmp / name
+        path.write_text(text, encoding="utf-8")
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return str(path)
+
+    def loader(self, path):
+        self.loads.append(pathlib.Path(path).name)
+        return ColumnarRecords.from_frame(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+    def test_columnar_records(self):
+        records = ColumnarRecords.from_frame(pd.DataFrame({"market": ["Rajkot", "Pune"], "price": ["2150", "1300"]}))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records.column("market"), ("Rajkot", "Pune"))
+        self.assertEqual(records.rows([1]), [{"market": "Pune", "price": "1300"}])
+        self.assertEqual(list(records), records.rows())
+        rows = records.rows()
+        rows[0]["market"] = "changed"
+        self.assertEqual(records.rows()[0]["market"], "Rajkot")  # callers get fresh dicts
+        self.assertEqual(len(ColumnarRecords((), ())), 0)
+
+    def test_reloads_when_the_file_changes(self):
+        cache = MarketDataCache()
+        path = self.write("prices.csv", "market\nRajkot\n", mtime_ns=1_000_000_000)
+        self.assertIsNone(cache.get(str(self.tmp / "missing.csv"), self.loader))
+        first = cache.get(path, self.loader)
+        self.assertIs(cache.get(path, self.loader), first)
+        self.assertIsNot(cache.get(path, self.loader, namespace="other"), first)
+        self.assertEqual(self.loads, ["prices.csv", "prices.csv"])
+
+        # Same size, newer mtime: reloaded, and the old version's entry is dropped
+        self.write("prices.csv", "market\nGondal\n", mtime_ns=2_000_000_000)
+        self.assertEqual(cache.get(path, self.loader).column("market"), ("Gondal",))
+        self.assertEqual(cache.stats(), {"entries": 2, "hits": 1, "misses": 3})
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = MarketDataCache(ttl=60)
+        path = self.write("rainfall.csv", "region\nKutch\n")
+        with mock.patch("core.scrapers.cache.time") as clock:
+            clock.monotonic.return_value = 1000.0
+            cache.get(path, self.loader)
+            clock.monotonic.return_value = 1059.0
+            cache.get(path, self.loader)
+            clock.monotonic.return_value = 1061.0
+            cache.get(path, self.loader)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = MarketDataCache(max_entries=2)
+        a, b, c = (self.write(f"{name}.csv", "market\nRajkot\n") for name in "abc")
+        cache.get(a, self.loader)
+        cache.get(b, self.loader)
+        cache.get(a, self.loader)  # a is now the most recently used
+        cache.get(c, self.loader)  # evicts b
+        cache.get(a, self.loader)
+        cache.get(b, self.loader)
+        self.assertEqual(self.loads, ["a.csv", "b.csv", "c.csv", "b.csv"])
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_shared_backend_serves_other_workers(self):
+        path = self.write("prices.csv", "market\nRajkot\n")
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        MarketDataCache(backend_alias="default").get(path, self.loader)
+        other = MarketDataCache(backend_alias="default")
+        self.assertEqual(other.get(path, self.loader).column("market"), ("Rajkot",))
+        self.assertEqual(self.loads, ["prices.csv"])
+
+
+class SubstringIndexTests(TestCase):
+    def setUp(self):
+        markets = ["Rajkot", "Gondal", "Pune", "Madurai", "Unjha"]
+        commodities = ["Wheat", "Cotton", "Onion", "Rice", "Cumin", "Groundnut"]
+        rows = [{"market": f" {markets[i % 5]} ", "commodity": commodities[i % 6].upper() if i % 4 else commodities[i % 6],
+                 "variety": "Wheat Lokwan" if i == 7 else ""} for i in range(300)]
+        self.records = ColumnarRecords.from_frame(pd.DataFrame(rows))
+        self.index = SubstringIndex(self.records, ("market", "commodity", "variety"))
+
+    def scan(self, query):
+        q = query.strip().lower()
+        return [i for i, row in enumerate(self.records.rows())
+                if any(q in row[f].strip().lower() for f in ("market", "commodity", "variety"))]
+
+    def test_matches_a_plain_scan(self):
+        queries = ["", "  ", "r", "U", "on", "ot", " Wh", "wheat", "RAJKOT", "jkot", "lokwan", "kot w", "wheat lok",
+                   "ndnu", "groundnut", "nutx", "zzz", "Cumin"]
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), self.scan(query))
+        self.assertEqual(self.index.search("wheat lok"), [7])  # one rare trigram: the binary-search path
+        self.assertEqual(self.index.rows([7]), [self.records.rows()[7]])
+        self.assertEqual(len(SubstringIndex(ColumnarRecords.from_frame(pd.DataFrame({"market": []})), ("market",))), 0)
+
+    def test_market_page_pages_index_results(self):
+        tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        csv_path = tmp / "prices.csv"
+        pd.DataFrame({"Commodity": ["Wheat", "Cotton"] * 6, "Variety": "", "Price (₹/quintal)": "2150",
+                      "Market": [f"Market {i:02d}" for i in range(12)]}).to_csv(csv_path, index=False)
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        with override_settings(PRICE_STORE_DIR=tmp / "store"), \
+                mock.patch("core.scrapers.prices.PRICES_CSV_PATH", str(csv_path)), \
+                mock.patch.object(views, "MARKET_PAGE_SIZE", 4):
+            pages = [self.client.get("/market-data/", {"price": "wh", "price_page": n}).context for n in (1, 2, 9)]
+        self.assertEqual([row["market"] for row in pages[0]["prices"]], ["Market 00", "Market 02", "Market 04", "Market 06"])
+        self.assertEqual([row["market"] for row in pages[1]["prices"]], ["Market 08", "Market 10"])
+        self.assertEqual(pages[1]["prices_page"].paginator.num_pages, 2)
+        self.assertEqual(pages[2]["prices_page"].number, 2)  # out of range: the last page
+
+
+class SchemeSnapshotTests(TestCase):
+    def test_refresh_only_writes_changed_rows(self):
+        html = rendered_schemes_page()
+        self.assertTrue(refresh_schemes(html=html).changed)
+        ids = list(Scheme.objects.values_list("id", flat=True))
+
+        again = refresh_schemes(html=html)
+        self.assertTrue(again.ok)
+        self.assertFalse(again.changed)
+        self.assertEqual(list(Scheme.objects.values_list("id", flat=True)), ids)
+
+        updated = refresh_schemes(html=html.replace("Mango Orchard Support", "Mango Orchard Aid"))
+        self.assertTrue(updated.changed)
+        self.assertEqual(list(Scheme.objects.values_list("id", flat=True))[:2], ids[:2])
+        items, refreshed_at = stored_schemes(limit=None)
+        self.assertEqual(refreshed_at, updated.checked_at)
+        self.assertEqual([it["title"] for it in items],
+                         ["Tractor Subsidy", "Drip Irrigation Assistance", "Mango Orchard Aid"])
+
+    def test_failed_refresh_keeps_last_good_snapshot(self):
+        refresh_schemes(html=rendered_schemes_page())
+        with self.assertLogs("core.scrapers.schemes", "WARNING"):
+            failed = refresh_schemes(html="<html><body>Maintenance</body></html>")
+        self.assertFalse(failed.ok)
+        self.assertEqual(Scheme.objects.count(), 3)
+
+    def test_failures_share_a_row_and_back_off(self):
+        caches["default"].clear()
+        refresh_schemes(html=rendered_schemes_page())
+        with self.assertLogs("core.scrapers.schemes", "WARNING"):
+            for _ in range(3):
+                failed = refresh_schemes(html="<html><body>Maintenance</body></html>")
+        self.assertEqual(SchemeSnapshot.objects.count(), 2)
+        self.assertEqual(failed.failures, 3)
+        self.assertEqual(schemes.retry_delay(3), schemes.RETRY_BACKOFF * 4)
+        self.assertEqual(schemes.retry_delay(50), schemes.REFRESH_INTERVAL)
+
+        # A stale snapshot is not refreshed again until the backoff has passed
+        SchemeSnapshot.objects.filter(ok=True).update(checked_at=timezone.now() - 2 * schemes.REFRESH_INTERVAL)
+        caches["default"].clear()
+        pending = schemes._pending
+        with override_settings(SCHEMES_BACKGROUND_REFRESH=True):
+            stored_schemes()
+        self.assertIs(schemes._pending, pending)
+
+        refresh_schemes(html=rendered_schemes_page())
+        with self.assertLogs("core.scrapers.schemes", "WARNING"):
+            refresh_schemes(html="")
+        self.assertEqual(SchemeSnapshot.objects.filter(ok=False).count(), 2)  # a new run, a new row
+
+    def test_page_views_do_not_scrape_in_tests(self):
+        pending = schemes._pending
+        self.assertEqual(self.client.get("/schemes/").status_code, 200)
+        self.assertIs(schemes._pending, pending)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("browser gone")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class BrowserPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        self.drivers = []
+
+        def factory():
+            self.drivers.append(FakeDriver())
+            return self.drivers[-1]
+        return BrowserPool(factory=factory, **kwargs)
+
+    def test_reuses_and_recycles_after_max_uses(self):
+        pool = self.make_pool(max_size=1, max_uses=2)
+        for _ in range(3):
+            with pool.session():
+                pass
+        self.assertEqual(len(self.drivers), 2)
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertFalse(self.drivers[1].quit_called)
+
+    def test_replaces_unhealthy_and_failed_sessions(self):
+        pool = self.make_pool(max_size=1)
+        with pool.session() as driver:
+            pass
+        driver.alive = False
+        with pool.session() as replacement:
+            self.assertIsNot(replacement, driver)
+        with self.assertRaises(ValueError):
+            with pool.session():
+                raise ValueError("page blew up")
+        self.assertEqual(pool.stats()["total"], 0)
+        self.assertEqual(len(self.drivers), 2)
+
+    def test_bounded_size(self):
+        pool = self.make_pool(max_size=1, acquire_timeout=0.05)
+        with pool.session():
+            with self.assertRaises(BrowserPoolTimeout):
+                with pool.session():
+                    pass
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _find_chrome():
+    return next((shutil.which(name) for name in ("google-chrome", "chromium", "chromium-browser", "chrome")
+                 if shutil.which(name)), None)
+
+
+@unittest.skipUnless(_find_chrome(), "Chrome/Chromium is not installed")
+class SchemesBrowserTests(SimpleTestCase):
+    """Runs the real scraper against the fixture page served from a local HTTP server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handler = functools.partial(QuietHandler, directory=str(TESTDATA))
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.pool = BrowserPool(max_size=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_waits_for_table_and_reuses_browser(self):
+        url = f"http://127.0.0.1:{self.server.server_port}/schemes_page.html"
+        for _ in range(2):
+            items = get_schemes(limit=None, url=url, pool=self.pool)
+            self.assertEqual([it["title"] for it in items],
+                             ["Tractor Subsidy", "Drip Irrigation Assistance", "Mango Orchard Support"])
+        self.assertEqual(self.pool.stats()["created"], 1)
+
+
+class FetcherTests(SimpleTestCase):
+    def make_fetcher(self, handler):
+        fetcher = Fetcher(backoff=0, transport=httpx.MockTransport(handler))
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+    def test_retries_then_revalidates_with_etag(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if len(seen) == 1:
+                return httpx.Response(503)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text="<table></table>", headers={"ETag": '"v1"'})
+
+        fetcher = self.make_fetcher(handler)
+        first = fetcher.fetch_text("http://example.test/prices")
+        self.assertEqual((first.status, first.attempts, first.text), (200, 2, "<table></table>"))
+        second = fetcher.fetch_text("http://example.test/prices")
+        self.assertTrue(second.revalidated)
+        self.assertEqual(second.text, "<table></table>")
+        self.assertEqual(seen, [None, None, '"v1"'])
+
+    def test_gives_up_after_retries(self):
+        fetcher = self.make_fetcher(lambda request: httpx.Response(500))
+        result = fetcher.fetch_many(["http://example.test/a", "http://other.test/b"])
+        self.assertEqual([(r.ok, r.attempts) for r in result], [(False, 3), (False, 3)])
+
+    def test_deadline_bounds_retries_and_slow_responses(self):
+        async def slow(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, text="late")
+
+        fetcher = Fetcher(retries=10, backoff=0.05, transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        self.addCleanup(fetcher.close)
+        started = time.perf_counter()
+        result = fetcher.fetch_text("http://example.test/prices", deadline=0.3)
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertFalse(result.ok)
+        self.assertLess(result.attempts, 11)
+        self.assertEqual(result.error, "HTTP 503")
+
+        started = time.perf_counter()
+        result = self.make_fetcher(slow).fetch_many(["http://example.test/a", "http://other.test/b"], deadline=0.2)
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual([r.status for r in result], [0, 0])
+        self.assertTrue(all(r.error for r in result))
+
+
+AGMARK_CSV = """State Name,District Name,Market Name,Commodity,Variety,Min Price (Rs./Quintal),Modal Price (Rs./Quintal),Reported Date
+Gujarat,Rajkot,Rajkot,Wheat,Lokwan,2000,"\u20b92,150/qtl",17/10/2026
+Gujarat,Rajkot,Gondal, Cotton ,Shankar-6,7000,"Rs. 7,420",2026-10-16
+Gujarat,Junagadh,Junagadh,Groundnut,Bold,,-,2026-10-16
+Maharashtra,Pune,Pune,Onion,Red,1000,1300,16-Oct-2026
+"""
+FEED_CSV = """state,market,commodity,variety,modal_price,arrival_date
+gujarat,Rajkot,WHEAT,lokwan,2199,2026-10-17
+,Madurai,Rice,Ponni,"3,400",2026-09-30
+"""
+
+
+class PriceIngestTests(TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        (self.tmp / "agmark.csv").write_text(AGMARK_CSV, encoding="utf-8")
+        (self.tmp / "feed.csv").write_text(FEED_CSV, encoding="utf-8")
+        self.store = self.tmp / "store"
+
+    def ingest(self, *names, **kwargs):
+        return ingest.ingest_prices([str(self.tmp / n) for n in names], workers=1, root=self.store, fmt="npz", **kwargs)
+
+    def test_normalizes_headings_and_prices(self):
+        df = ingest.normalize_frame(pd.read_csv(self.tmp / "agmark.csv", dtype=str, keep_default_na=False), "agmark.csv")
+        self.assertEqual(list(df.columns), list(ingest.SCHEMA))
+        self.assertEqual(df["price"].tolist(), [2150.0, 7420.0, 1300.0])  # "-" is not quoted
+        self.assertEqual(df["commodity"].tolist(), ["Wheat", "Cotton", "Onion"])
+        self.assertEqual([d.date().isoformat() for d in df["date"]], ["2026-10-17", "2026-10-16", "2026-10-16"])
+        with self.assertRaises(ingest.IngestError):
+            ingest.normalize_frame(pd.DataFrame({"foo": ["1"]}), "bad.csv")
+
+    def test_dedupes_and_partitions_by_state_and_month(self):
+        report = self.ingest("agmark.csv", "feed.csv", state="Tamil Nadu", date=datetime.date(2026, 10, 17))
+        self.assertEqual((report.rows_read, report.rows_valid, report.duplicates), (6, 5, 1))
+        self.assertEqual(sorted(p.parent.name + "/" + p.name for p in self.store.glob("state=*/month=*/part.npz")), [
+            "month=2026-09/part.npz", "month=2026-10/part.npz", "month=2026-10/part.npz",
+        ])
+        # The later feed row replaced the Rajkot wheat price, whatever its casing
+        wheat = ingest.read_prices("gujarat", root=self.store).query("market == 'Rajkot'")
+        self.assertEqual(wheat[["commodity", "price", "source"]].values.tolist(), [["WHEAT", 2199.0, "feed.csv"]])
+
+        # Re-ingesting the same file replaces rows instead of adding them
+        self.ingest("agmark.csv", state="Tamil Nadu")
+        self.assertEqual(ingest.manifest(self.store)["rows"], 4)
+        self.assertEqual(ingest.read_prices("Gujarat", root=self.store)["price"].tolist(), [7420.0, 2150.0])
+
+    def test_reads_by_state_and_date_range(self):
+        self.ingest("agmark.csv", "feed.csv", state="Tamil Nadu")
+        self.assertEqual(set(ingest.manifest(self.store)["states"].values()), {"Gujarat", "Maharashtra", "Tamil Nadu"})
+        sept = ingest.read_prices(start=datetime.date(2026, 9, 1), end=datetime.date(2026, 9, 30), root=self.store)
+        self.assertEqual(sept["market"].tolist(), ["Madurai"])
+        self.assertEqual(len(ingest.read_prices("Kerala", root=self.store)), 0)
+        latest = ingest.search_prices("Gujarat", query="wheat", root=self.store)
+        self.assertEqual(ingest.FrameRows(latest)[0:1], [{
+            "commodity": "WHEAT", "variety": "lokwan", "price": "2199", "market": "Rajkot",
+            "state": "Gujarat", "date": datetime.date(2026, 10, 17),
+        }])
+
+    def test_manifest_is_updated_per_partition_and_prunes_searches(self):
+        self.ingest("agmark.csv", "feed.csv", state="Tamil Nadu")
+        path = self.store / ingest.MANIFEST_NAME
+        data = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual(sorted(data["partitions"]), ["gujarat/2026-10", "maharashtra/2026-10", "tamil-nadu/2026-09"])
+        self.assertEqual(data["partitions"]["gujarat/2026-10"]["last_date"], "2026-10-17")
+        # Partitions an ingest did not touch keep their entries rather than being re-read
+        data["partitions"]["tamil-nadu/2026-09"]["rows"] = 99
+        path.write_text(json.dumps(data), encoding="utf-8")
+        self.ingest("agmark.csv", state="Tamil Nadu")
+        data = ingest.manifest(self.store)
+        self.assertEqual(data["partitions"]["tamil-nadu/2026-09"]["rows"], 99)
+        self.assertEqual(data["rows"], 99 + 3)
+
+        # Without dates only the month holding the newest date is opened
+        ingest._cache.clear()
+        self.assertEqual(ingest.search_prices(root=self.store)["market"].tolist(), ["Rajkot"])
+        self.assertTrue(ingest._cache)
+        self.assertTrue(all("month=2026-10" in key for key in ingest._cache))
+        self.assertEqual(ingest.search_prices("Tamil Nadu", root=self.store)["market"].tolist(), ["Madurai"])
+
+    def test_market_page_filters_stored_prices(self):
+        self.ingest("agmark.csv", "feed.csv", state="Tamil Nadu")
+        with override_settings(PRICE_STORE_DIR=self.store):
+            response = self.client.get("/market-data/", {"state": "Gujarat", "from": "2026-10-01", "to": "2026-10-31"})
+        self.assertEqual([r["market"] for r in response.context["prices"]], ["Gondal", "Rajkot"])
+
+    def test_worker_pool_matches_serial_ingest(self):
+        serial = self.ingest("agmark.csv", "feed.csv", state="Tamil Nadu")
+        names = [str(self.tmp / n) for n in ("agmark.csv", "feed.csv", "missing.csv")]
+        pooled = ingest.ingest_prices(names, state="Tamil Nadu", workers=2, root=self.tmp / "pooled", fmt="npz")
+        self.assertEqual((pooled.rows_read, pooled.rows_valid, pooled.duplicates, pooled.rows_stored),
+                         (serial.rows_read, serial.rows_valid, serial.duplicates, serial.rows_stored))
+        self.assertEqual(pooled.errors, [(names[2], "file not found")])
+        # Sources are applied in order whichever worker finishes first
+        self.assertTrue(ingest.read_prices(root=self.tmp / "pooled").equals(ingest.read_prices(root=self.store)))
+
+    def test_command_rerenders_charts(self):
+        command = "core.management.commands.ingest_prices.call_command"
+        for args, renders in (((), True), (("--no-charts",), False)):
+            with self.subTest(args=args), mock.patch(command) as render:
+                call_command("ingest_prices", str(self.tmp / "agmark.csv"), "--store", str(self.store),
+                             "--format", "npz", "--workers", "1", *args, stdout=io.StringIO())
+            self.assertEqual(render.called, renders)
+            if renders:
+                self.assertEqual(render.call_args.args, ("render_charts",))
+
+
+
+class AnalyticsTests(TestCase):
+    URL = "/api/analytics/prices/"
+
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        patcher = override_settings(PRICE_STORE_DIR=self.tmp / "store")
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        aggregates.frames.clear()
+        self.addCleanup(aggregates.frames.clear)
+        day = datetime.date(2026, 10, 17)
+        CropPrice.objects.bulk_create([
+            CropPrice(date=day, market="Rajkot", commodity="Wheat", price=2100),
+            CropPrice(date=day, market="Gondal", commodity="Wheat", price=2300),
+            CropPrice(date=day, market="Rajkot", commodity="Cotton", price=7400),
+            CropPrice(date=day, market="Rajkot", commodity="Onion", price=0),  # not quoted
+            CropPrice(date=day - datetime.timedelta(days=7), market="Rajkot", commodity="Wheat", price=1900),
+            CropPrice(date=day - datetime.timedelta(days=40), market="Rajkot", commodity="Rice", price=3000),
+        ])
+
+    def test_rollup_and_timeline(self):
+        latest = aggregates.rollup("prices", "commodity")
+        self.assertEqual((latest.labels, latest.values), (["Cotton", "Wheat"], [7400.0, 2200.0]))
+        month = aggregates.rollup("prices", "commodity", agg="count", days=30, ascending=True, top=1)
+        self.assertEqual((month.labels, month.values), (["Cotton"], [1]))
+        weekly = aggregates.timeline("prices", freq="week", agg="max")
+        self.assertEqual(weekly.values, [3000.0, 1900.0, 7400.0])
+        self.assertEqual(aggregates.timeline("prices", freq="day", agg="count", days=10).values[0], 1)
+        for kwargs in ({"top": 0}, {"top": -1}, {"days": -5}, {"group_by": "crop"}, {"agg": "mode"}):
+            with self.subTest(**kwargs), self.assertRaises(aggregates.AggregationError):
+                aggregates.rollup("prices", **dict({"group_by": "commodity"}, **kwargs))
+
+    def test_cached_frame_costs_no_queries(self):
+        aggregates.rollup("prices", "commodity")
+        with self.assertNumQueries(0):
+            aggregates.rollup("prices", "market", agg="count")
+        builds = aggregates.frames.builds
+        CropPrice.objects.create(date=datetime.date(2026, 10, 17), market="Morbi", commodity="Wheat", price=2000)
+        self.assertEqual(aggregates.rollup("prices", "market", agg="count").labels[0], "Rajkot")
+        self.assertEqual(aggregates.frames.builds, builds + 1)  # the save bumped the prices generation
+        self.assertIn("Morbi", aggregates.rollup("prices", "market").labels)
+
+    def test_reloaded_prices_rebuild_the_frame(self):
+        path = self.tmp / "prices.csv"
+        for price in ("2000", "3000"):
+            path.write_text(f"Commodity,Variety,Price (\u20b9/quintal),Market\nBajra,,{price},Rajkot\n", encoding="utf-8")
+            call_command("load_market_data", "--prices", str(path), "--date", "2026-10-18", "--no-charts",
+                         stdout=io.StringIO())
+            result = aggregates.rollup("prices", "commodity")
+            self.assertEqual((result.labels, result.values), (["Bajra"], [float(price)]))
+        self.assertEqual(CropPrice.objects.filter(commodity="Bajra").count(), 1)  # upserted in place
+
+    def test_price_store_is_preferred(self):
+        (self.tmp / "agmark.csv").write_text(AGMARK_CSV, encoding="utf-8")
+        ingest.ingest_prices([str(self.tmp / "agmark.csv")], workers=1, root=self.tmp / "store", fmt="npz")
+        result = aggregates.rollup("prices", "state", agg="count", days=30)
+        self.assertEqual(dict(zip(result.labels, result.values)), {"Gujarat": 2, "Maharashtra": 1})
+
+    def test_price_store_reads_the_trailing_months(self):
+        (self.tmp / "agmark.csv").write_text(AGMARK_CSV, encoding="utf-8")
+        (self.tmp / "old.csv").write_text("state,market,commodity,price,date\n"
+                                          "Gujarat,Rajkot,Wheat,1800,2025-10-31\n"
+                                          "Gujarat,Rajkot,Wheat,1900,2025-11-01\n", encoding="utf-8")
+        ingest.ingest_prices([str(self.tmp / n) for n in ("old.csv", "agmark.csv")], workers=1,
+                             root=self.tmp / "store", fmt="npz")
+        # Four partitions: gujarat 2025-10, 2025-11 and 2026-10, maharashtra 2026-10
+        for months, expected, opened in ((12, [1900.0], 3), (0, [1800.0, 1900.0], 4), (1, [], 2)):
+            aggregates.frames.clear()
+            ingest._cache.clear()
+            with self.subTest(months=months), override_settings(ANALYTICS_STORE_MONTHS=months):
+                frame = aggregates.frames.get(aggregates.DATASETS["prices"])
+                self.assertEqual(frame.loc[frame["date"].dt.year == 2025, "price"].tolist(), expected)
+                self.assertEqual(len(ingest._cache), opened)
+
+    def test_api(self):
+        response = self.client.get(self.URL, {"group_by": "market", "agg": "max", "top": "1"})
+        self.assertEqual(response.json()["rows"], [{"label": "Rajkot", "value": 7400.0}])
+        series = self.client.get(self.URL, {"timeline": "month", "agg": "count"}).json()["rows"]
+        self.assertEqual([row["value"] for row in series], [1, 4])
+        self.assertEqual(self.client.get("/api/analytics/soil/").status_code, 404)
+        for params in ({"top": "-1"}, {"days": "-1"}, {"days": "0"}, {"top": "x"}, {"timeline": "year"}):
+            with self.subTest(**params):
+                response = self.client.get(self.URL, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_insights_csv(self):
+        response = self.client.get("/admin-dashboard/download-insights.csv", {"report": "prices"})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response.content.decode("utf-8").splitlines(),
+                         ["Commodity,Avg Price (₹/quintal)", "Cotton,7400.0", "Wheat,2200.0"])
+        self.assertEqual(self.client.get("/admin-dashboard/download-insights.csv", {"report": "soil"}).status_code, 404)
+
+
+class LoadMarketDataTests(TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.write("prices.csv", "Commodity,Variety,Price (\u20b9/quintal),Market\n"
+                                 "Wheat,Lokwan,2150,Rajkot\nCotton,Shankar-6,7420,Gondal\nCotton,Shankar-6,7400,Gondal\n")
+        self.write("rain.csv", "City,Rainfall (mm),Time Period\nRajkot,12,Last 24 hours\nSurat,30,Last 24 hours\n")
+
+    def write(self, name, text):
+        (self.tmp / name).write_text(text, encoding="utf-8")
+
+    def load(self, date="2026-10-17", *args):
+        call_command("load_market_data", "--prices", str(self.tmp / "prices.csv"), "--rainfall", str(self.tmp / "rain.csv"),
+                     "--date", date, "--no-charts", *args, stdout=io.StringIO())
+
+    def test_reloading_upserts_instead_of_duplicating(self):
+        self.load()
+        self.assertEqual((CropPrice.objects.count(), RainfallReading.objects.count()), (2, 2))
+        self.assertEqual(CropPrice.objects.get(commodity="Cotton").price, 7400.0)  # last repeat in the file wins
+
+        self.write("prices.csv", "Commodity,Variety,Price (\u20b9/quintal),Market\nWheat,Lokwan,2199,Rajkot\n")
+        self.load()
+        self.assertEqual((CropPrice.objects.count(), RainfallReading.objects.count()), (2, 2))
+        wheat = CropPrice.objects.get(commodity="Wheat")
+        self.assertEqual((wheat.price, wheat.price_text), (2199.0, "2199"))
+
+        self.load("2026-10-18")  # a new day is a new observation
+        self.assertEqual(CropPrice.objects.count(), 3)
+        self.load("2026-10-18", "--replace")
+        self.assertEqual(CropPrice.objects.count(), 1)
+
+class StartupImportTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        log = ("import time: self [us] | cumulative | imported package\n"
+               "import time:       120 |        120 |   core.forms\n"
+               "import time:       300 |        420 | core.views\n")
+        records = parse_importtime(log)
+        self.assertEqual([(r.name, r.self_us, r.cumulative_us, r.depth) for r in records],
+                         [("core.forms", 120, 120, 1), ("core.views", 300, 420, 0)])
+
+    def test_urlconf_cold_import_stays_light(self):
+        profile = profile_import("core.urls")
+        self.assertTrue(profile.loaded("core.views"))
+        self.assertEqual(profile.heavy(), [], "heavy packages imported with the URLconf; import them where used")
+        self.assertLessEqual(profile.total_ms, budget_ms(),
+                             "\n".join(f"{r.name}: {r.cumulative_us / 1000:.1f} ms" for r in profile.slowest(10)))
+
+
+class TipSearchTests(TestCase):
+    def setUp(self):
+        self.drip = Tip.objects.create(title="Drip irrigation basics", content="Water early in the morning.",
+                                       category="watering", crop="Wheat, Rice", season="Summer")
+        self.mites = Tip.objects.create(title="Controlling mites", content="Irrigating regularly keeps mites down.",
+                                        category="pest", crop="Cotton", season="Monsoon")
+        self.soil = Tip.objects.create(title="Soil testing", content="Send a sample to the lab every season.", category="soil")
+
+    def ids(self, **kwargs):
+        return [t.pk for t in search_tips(**kwargs).tips]
+
+    def test_ranks_title_hits_first_and_filters(self):
+        self.assertTrue(fts_available())
+        page = search_tips(q="irrigation")
+        self.assertTrue(page.ranked)
+        self.assertEqual([t.pk for t in page.tips], [self.drip.pk, self.mites.pk])  # stemmed: irrigating
+        self.assertIn("<mark>", str(page.tips[1].snippet))
+        self.assertEqual(self.ids(q="irrig", crop="cott"), [self.mites.pk])
+        self.assertEqual(self.ids(season="summer"), [self.drip.pk])
+        self.assertEqual(self.ids(q="irrigation", category="pest"), [self.mites.pk])
+        self.assertEqual(self.ids(), [self.soil.pk, self.mites.pk, self.drip.pk])  # newest first
+        # User input never reaches FTS5 as query syntax
+        self.assertEqual(self.ids(q='soil*" OR'), [])  # OR is just another required term
+        self.assertEqual(self.ids(q='(soil*"'), [self.soil.pk])
+        self.assertEqual(self.ids(q='"*'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.soil.title = "Mulching guide"
+        self.soil.save()
+        self.assertEqual(self.ids(q="mulching"), [self.soil.pk])
+        self.assertEqual(self.ids(q="testing"), [])
+        self.drip.delete()
+        self.assertEqual(self.ids(q="irrigation"), [self.mites.pk])
+
+    def test_keyset_pages_cover_every_result_once(self):
+        for i in range(5):
+            Tip.objects.create(title=f"Irrigation schedule {i}", content="irrigation " * (i + 1), category="watering")
+        for kwargs in ({"q": "irrigation"}, {"category": "watering"}, {}):
+            seen, cursor = [], None
+            while True:
+                page = search_tips(cursor=cursor, limit=2, **kwargs)
+                seen += [t.pk for t in page.tips]
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            self.assertEqual(seen, self.ids(limit=100, **kwargs))
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_tips_page_is_routed(self):
+        response = self.client.get("/tips/", {"q": "irrigation", "after": "not-a-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Drip irrigation basics")
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        failures = check_query_plans()
+        self.assertEqual(failures, {}, "\n".join(f"{name}: {lines}" for name, lines in failures.items()))
+
+    def test_reports_unindexed_filters_and_sorts(self):
+        self.assertTrue(scan_report(ContactMessage.objects.filter(email="a@example.com").order_by()))
+        self.assertTrue(scan_report(Tip.objects.order_by("title")[:20]))
+        self.assertEqual(scan_report(Tip.objects.order_by("-id")[:20]), [])
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.tip = Tip.objects.create(title="Mulch before the heat", content="Keeps moisture in.", crop="Wheat")
+
+    def test_serves_repeats_from_cache_with_etag(self):
+        first = self.client.get("/tips/", {"crop": "Wheat"})
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        self.assertContains(first, "Mulch before the heat")
+        # Blank and unknown parameters do not split the cache
+        again = self.client.get("/tips/", {"crop": " Wheat", "q": "", "utm_source": "sms"})
+        self.assertEqual(again["X-Page-Cache"], "hit")
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(self.client.get("/tips/", {"crop": "Wheat"}, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get("/tips/", {"crop": "Rice"})["X-Page-Cache"], "miss")
+
+    def test_tip_save_invalidates_tips_pages(self):
+        self.client.get("/tips/")
+        self.client.get("/")
+        Tip.objects.create(title="Stake tall tomatoes", content="Before flowering.")
+        fresh = self.client.get("/tips/")
+        self.assertEqual(fresh["X-Page-Cache"], "miss")
+        self.assertContains(fresh, "Stake tall tomatoes")
+        self.assertEqual(self.client.get("/")["X-Page-Cache"], "hit")
+
+    def test_skips_signed_in_users(self):
+        self.client.force_login(User.objects.create_user("farmer", password="x"))
+        self.client.get("/tips/")
+        self.assertNotIn("X-Page-Cache", self.client.get("/tips/"))
+
+    def test_file_backend_and_schemes_refresh(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                        "pages": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp}},
+                PAGE_CACHE_ALIAS="pages"):
+            html = rendered_schemes_page()
+            refresh_schemes(html=html)
+            self.assertEqual(self.client.get("/schemes/")["X-Page-Cache"], "miss")
+            self.assertEqual(self.client.get("/schemes/")["X-Page-Cache"], "hit")
+            refresh_schemes(html=html.replace("Mango Orchard Support", "Mango Orchard Aid"))
+            fresh = self.client.get("/schemes/")
+            self.assertEqual(fresh["X-Page-Cache"], "miss")
+            self.assertContains(fresh, "Mango Orchard Aid")
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    async def test_market_page_pages_stored_prices(self):
+        day = datetime.date(2026, 10, 17)
+        await CropPrice.objects.abulk_create([
+            CropPrice(date=day, market=f"Market {i:02d}", commodity="Wheat", price=2000 + i, price_text=f"{2000 + i}")
+            for i in range(60)
+        ] + [CropPrice(date=day - datetime.timedelta(days=1), market="Old", commodity="Wheat", price=1)])
+        response = await self.async_client.get("/market-data/", {"price": "wheat", "price_page": "2"})
+        self.assertEqual(response.status_code, 200)
+        page = response.context["prices_page"]
+        self.assertEqual((page.number, page.paginator.count), (2, 60))
+        self.assertEqual([r["market"] for r in page.object_list], [f"Market {i:02d}" for i in range(50, 60)])
+
+    async def test_schemes_page_reads_snapshot(self):
+        await sync_to_async(refresh_schemes)(html=rendered_schemes_page())
+        response = await self.async_client.get("/schemes/")
+        self.assertContains(response, "Drip Irrigation Assistance")
+        self.assertEqual(len(response.context["items"]), 3)
+        # The page cache middleware runs under ASGI too
+        self.assertEqual((await self.async_client.get("/schemes/"))["X-Page-Cache"], "hit")
+
+
+class TelemetryTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        telemetry.discard()  # events other tests left buffered
+        self.addCleanup(telemetry.discard)
+
+    def test_flush_writes_events_and_daily_rollups(self):
+        telemetry.record("market", region=" rajkot ", detail="Wheat")
+        telemetry.record("market", region="Rajkot")
+        telemetry.record("suggestion", crop="rice", detail="clay/winter/high")
+        self.assertEqual(telemetry.stats()["buffered"], 3)
+        self.assertEqual(QueryEvent.objects.count(), 0)  # record() never writes
+
+        self.assertEqual(telemetry.flush(), 3)
+        self.assertEqual(telemetry.flush(), 0)
+        self.assertEqual(QueryEvent.objects.count(), 3)
+        self.assertEqual(telemetry.top("region", kind="market"), {"Rajkot": 2})
+        self.assertEqual(telemetry.top("query"), {"wheat": 1})
+        self.assertEqual(telemetry.top("crop", kind="suggestion"), {"Rice": 1})
+
+        # Later flushes add to the same day's counters
+        telemetry.record("market", region="RAJKOT")
+        telemetry.flush()
+        self.assertEqual(QueryRollup.objects.get(dimension="region", key="Rajkot").count, 3)
+
+    def test_market_page_records_searches_once(self):
+        self.client.get("/market-data/", {"region": "Surat"})
+        self.client.get("/market-data/", {"region": "Surat", "price_page": "2"})
+        self.client.get("/market-data/", {"region": "Surat"})  # a cache hit still counts
+        telemetry.flush()
+        self.assertEqual(telemetry.top("region", kind="market"), {"Surat": 2})
+
+    def test_disabled_and_discarded_events_are_not_written(self):
+        with override_settings(TELEMETRY_ENABLED=False):
+            telemetry.record("market", region="Rajkot")
+        self.assertEqual(telemetry.stats()["buffered"], 0)
+        telemetry.record("market", region="Rajkot")
+        self.assertEqual(telemetry.discard(), 1)
+        self.assertEqual(telemetry.flush(), 0)
+        self.assertFalse(QueryEvent.objects.exists())
+
+    def test_buffered_events_are_flushed_at_exit_unless_background_is_off(self):
+        telemetry.record("market", region="Rajkot")
+        with self.assertLogs("core.telemetry", "WARNING"):
+            telemetry._at_exit()  # the test runner turns TELEMETRY_BACKGROUND off
+        self.assertFalse(QueryEvent.objects.exists())
+        telemetry.record("market", region="Surat")
+        with override_settings(TELEMETRY_BACKGROUND=True):
+            telemetry._at_exit()
+        self.assertEqual(list(QueryEvent.objects.values_list("region", flat=True)), ["Surat"])
+
+
+class RetrainTests(TransactionTestCase):
+    """Publishing is pointed at a temporary directory; run_job closes connections, hence TransactionTestCase."""
+
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        shutil.copyfile(train_model.DATA_PATH, self.tmp / "crop_dataset.csv")
+        for name, value in (("DATA_PATH", self.tmp / "crop_dataset.csv"), ("VERSIONS_DIR", self.tmp / "versions"),
+                            ("CURRENT_PATH", self.tmp / "current.json")):
+            patcher = mock.patch.object(train_model, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.registry = ModelRegistry(current_path=self.tmp / "current.json")
+
+    def train(self, version):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return train_model.train_and_save(version=version)
+
+    def test_publishes_each_version_with_one_pointer_swap(self):
+        self.assertEqual(self.registry.artifact_paths(), self.registry.bundled)
+        self.train("20260101T000000Z")
+        first = self.registry.get()
+        self.assertEqual(self.registry.artifact_paths()[0].parent, self.tmp / "versions" / "20260101T000000Z")
+        self.assertIsNotNone(self.registry.get_lookup())  # built from the same model bytes
+
+        self.train("20260102T000000Z")
+        second = self.registry.get()
+        self.assertEqual(self.registry.artifact_paths()[1].parent, self.tmp / "versions" / "20260102T000000Z")
+        self.assertNotEqual(second.signature, first.signature)
+        self.assertEqual(second.model.predict([one_hot_row("clay", "winter", "low")]).tolist(),
+                         first.model.predict([one_hot_row("clay", "winter", "low")]).tolist())
+
+    def test_pruning_keeps_the_published_version(self):
+        for name in ("a", "b", "c", "d", "e", "f", "g"):
+            (self.tmp / "versions" / name).mkdir(parents=True)
+        train_model._prune_versions("a", keep=3)
+        self.assertEqual(sorted(p.name for p in (self.tmp / "versions").iterdir()), ["a", "f", "g"])
+
+    def test_one_active_job_at_a_time(self):
+        job, created = claim_job()
+        self.assertTrue(created)
+        self.assertEqual(claim_job(), (job, False))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrainingJob.objects.create()
+
+        # Age alone does not make a job stale, only a missing heartbeat does
+        TrainingJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - datetime.timedelta(hours=2))
+        self.assertEqual(claim_job(), (job, False))
+        TrainingJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(hours=2))
+        fresh, created = claim_job()
+        self.assertTrue(created)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TrainingJob.STATUS_FAILED)
+        self.assertIn("Abandoned", job.error)
+
+    def test_failed_run_is_recorded_and_reported(self):
+        (self.tmp / "crop_dataset.csv").unlink()
+        job, _ = claim_job()
+        with self.assertLogs("core.jobs", "ERROR"):
+            job = run_job(job.pk)
+        self.assertEqual(job.status, TrainingJob.STATUS_FAILED)
+        self.assertIn("Dataset not found", job.error)
+        self.assertFalse((self.tmp / "current.json").exists())
+
+        url = f"/admin-dashboard/jobs/{job.pk}/"
+        self.assertEqual(self.client.get(url).status_code, 302)  # staff only
+        self.client.force_login(User.objects.create_user("staff", password="x", is_staff=True))
+        status = self.client.get(url).json()
+        self.assertEqual((status["id"], status["status"]), (job.pk, "failed"))
+        self.assertIsNotNone(status["duration_seconds"])
+        self.assertTrue(claim_job()[1])  # a failed job does not block the next one
+
+    def test_progress_keeps_a_long_run_alive_and_abandoned_runs_stay_failed(self):
+        job, _ = claim_job()
+        seen = {}
+
+        def train(progress):
+            # Started more than STALE_AFTER ago, but reporting progress
+            TrainingJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - datetime.timedelta(hours=3),
+                                                         heartbeat_at=timezone.now() - datetime.timedelta(hours=3))
+            progress(40, "Fitting model")
+            seen["claim"] = claim_job()
+            # Then silent long enough for another worker to give up on it
+            TrainingJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(hours=2))
+            seen["next"] = claim_job()
+            return {"version": "v2", "accuracy": 1.0, "rows": 10}
+
+        with mock.patch.object(train_model, "train_and_save", side_effect=train), \
+                mock.patch.object(prerender, "schedule"), self.assertLogs("core.jobs", "WARNING"):
+            finished = run_job(job.pk)
+        self.assertEqual(seen["claim"][0].pk, job.pk)
+        self.assertFalse(seen["claim"][1])
+        self.assertTrue(seen["next"][1])
+        # The late outcome does not revive the abandoned job, nor collide with the new one
+        self.assertEqual(finished.status, TrainingJob.STATUS_FAILED)
+        self.assertIn("Abandoned", finished.error)
+        self.assertEqual(finished.version, "")
+        self.assertEqual(TrainingJob.objects.get(pk=seen["next"][0].pk).status, TrainingJob.STATUS_QUEUED)
+        # Nor does running it again
+        with self.assertLogs("core.jobs", "WARNING"):
+            self.assertEqual(run_job(job.pk).status, TrainingJob.STATUS_FAILED)
+
+
+class DatasetIngestTests(SimpleTestCase):
+    HEADER = "soil_type,season,rainfall_level,crop\r\n"
+
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.dataset = self.tmp / "crop_dataset.csv"
+        self.dataset.write_bytes((self.HEADER + "clay,winter,low,wheat").encode())  # no trailing newline
+
+    def ingest(self, text, mode=MODE_APPEND):
+        data = text.encode() if isinstance(text, str) else text
+        # Small chunks split rows (and multi-byte characters) across chunk boundaries
+        return ingest_dataset([data[i:i + 7] for i in range(0, len(data), 7)], self.dataset, mode=mode)
+
+    def rows(self):
+        return [DATASET_COLUMNS] + read_dataset(self.dataset).astype(str).values.tolist()
+
+    def files(self):
+        # Dataset files plus any temp file left behind in the segment directory
+        directory = dataset_ingest.segment_dir(self.dataset)
+        leftovers = sorted(n for n in os.listdir(directory) if n.startswith(".")) if directory.exists() else []
+        return [p.name for p in dataset_ingest.dataset_files(self.dataset)] + leftovers
+
+    def test_validates_rows_and_appends(self):
+        result = self.ingest("Season,SOIL_TYPE,rainfall_level,crop\n"
+                             "Summer, Sandy ,LOW,Pearl Millet\n"
+                             "summer,lava,low,maize\n"
+                             "winter,clay,low,\n"
+                             "winter,clay,low,wheat,extra\n"
+                             "monsoon,loamy,high,rice\n")
+        self.assertEqual((result.accepted, result.rejected), (2, 3))
+        self.assertEqual(result.errors, ["line 3: invalid soil_type 'lava'", "line 4: missing crop", "line 5: too many fields"])
+        self.assertEqual(self.rows(), [DATASET_COLUMNS, ["clay", "winter", "low", "wheat"],
+                                       ["sandy", "summer", "low", "pearl millet"], ["loamy", "monsoon", "high", "rice"]])
+        # The base is untouched; the upload is one new segment
+        self.assertEqual(self.dataset.read_bytes(), (self.HEADER + "clay,winter,low,wheat").encode())
+        self.assertEqual(len(self.files()), 2)
+
+    def test_replace_and_other_layouts(self):
+        self.dataset.write_text("crop,season,soil_type,rainfall_level\nwheat,winter,clay,low\n", encoding="utf-8")
+        self.ingest(self.HEADER + "peat,summer,medium,jute\n")
+        self.assertEqual(self.rows()[1:], [["clay", "winter", "low", "wheat"], ["peat", "summer", "medium", "jute"]])
+        result = self.ingest(self.HEADER + "silt,monsoon,high,rice\n", mode=MODE_REPLACE)
+        self.assertEqual(result.mode, MODE_REPLACE)
+        self.assertEqual(self.rows(), [DATASET_COLUMNS, ["silt", "monsoon", "high", "rice"]])
+        self.assertEqual(self.files(), ["crop_dataset.csv"])
+
+    def test_rejected_uploads_leave_the_dataset_untouched(self):
+        before = self.dataset.read_bytes()
+        bad = [
+            "soil_type,season,crop\nclay,winter,wheat\n",
+            self.HEADER + "lava,winter,low,wheat\n",
+            (self.HEADER + "clay,winter,low,wheat\n").encode() + b"clay,winter,low,caf\xe9\n",
+            b"soil_\xfftype,season,rainfall_level,crop\n",
+        ]
+        for body in bad:
+            with self.subTest(body=body), self.assertRaises(DatasetValidationError):
+                self.ingest(body)
+        with self.assertRaises(DatasetValidationError) as caught:
+            self.ingest(bad[2])
+        self.assertIn("not valid UTF-8", str(caught.exception))
+        self.assertEqual(self.dataset.read_bytes(), before)
+        self.assertEqual(self.files(), ["crop_dataset.csv"])
+
+    def test_failed_append_rolls_back(self):
+        before = self.dataset.read_bytes()
+        with mock.patch("core.ml.ingest.os.replace", side_effect=OSError("disk full")), self.assertRaises(OSError):
+            self.ingest(self.HEADER + "clay,summer,high,rice\n")
+        self.assertEqual(self.dataset.read_bytes(), before)
+        self.assertEqual(self.files(), ["crop_dataset.csv"])
+
+    def test_segments_are_folded_into_the_base(self):
+        with mock.patch.object(dataset_ingest, "MAX_SEGMENTS", 2):
+            for crop in ("rice", "jute"):
+                self.ingest(self.HEADER + f"clay,summer,high,{crop}\n")
+            self.assertEqual(len(self.files()), 3)
+            self.ingest(self.HEADER + "clay,summer,high,maize\n")
+        self.assertEqual(self.files(), ["crop_dataset.csv"])
+        self.assertEqual([r[3] for r in self.rows()[1:]], ["wheat", "rice", "jute", "maize"])
+        with open(self.dataset, encoding="utf-8", newline="") as fh:
+            self.assertEqual(next(csv.reader(fh)), DATASET_COLUMNS)
+
+    def test_concurrent_appends_from_several_processes(self):
+        body = (self.HEADER + "".join(f"clay,summer,high,crop{i}\r\n" for i in range(50))).encode()
+        with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(ingest_dataset, [body], self.dataset) for _ in range(8)]
+            self.assertEqual([f.result().accepted for f in futures], [50] * 8)
+        # Uploads from separate processes each land in their own segment; no row is lost
+        self.assertEqual(len(self.rows()), 1 + 1 + 8 * 50)
+        self.assertEqual(read_dataset(self.dataset)["crop"].value_counts()["crop7"], 8)
+
+
+class ChartPrerenderTests(TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        patcher = override_settings(CHART_CACHE_DIR=self.tmp)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.data = {}
+        self.registry = ChartRegistry()
+        for name, _fmt, _size in prerender.DASHBOARD_CHARTS:
+            self.registry.register(Chart(name, name, (3, 2), functools.partial(self.data.get, name), draw_prices))
+        for name, value in (("charts", self.registry), ("submit", self.submit)):
+            patcher = mock.patch.object(prerender, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def submit(plan):
+        # Draw in this process instead of the spawn pool
+        future = Future()
+        future.set_result(render_timed(plan.draw, plan.data, plan.figsize, plan.fmt))
+        return future
+
+    def prerender(self):
+        with self.assertLogs("core.analytics.prerender", "INFO"):
+            return prerender.prerender()
+
+    def test_registry(self):
+        self.assertIsNone(self.registry.render("rainfall_by_region"))
+        self.assertIsNone(self.registry.plan("rainfall_by_region"))
+        self.data["rainfall_by_region"] = {"labels": ["Kutch"], "values": [12.5]}
+        plan = self.registry.plan("rainfall_by_region", size="lg")
+        self.assertEqual(plan.figsize, (4.5, 3.0))
+        self.assertNotEqual(plan.key, self.registry.plan("rainfall_by_region").key)
+        self.assertTrue(self.registry.render("rainfall_by_region", fmt="svg").lstrip().startswith(b"<?xml"))
+        for kwargs in ({"fmt": "gif"}, {"size": "xl"}):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                self.registry.plan("rainfall_by_region", **kwargs)
+        with self.assertRaises(KeyError):
+            self.registry.plan("unknown")
+        key = self.registry.image_key("rainfall_by_region")
+        self.assertTrue((self.tmp / f"{key}.png").exists())
+        with mock.patch.object(self.registry, "render") as render:
+            self.assertEqual(self.registry.image_key("rainfall_by_region"), key)
+        render.assert_not_called()
+
+    def test_manifest_records_empty_charts_then_draws(self):
+        manifest = self.prerender()
+        self.assertTrue(all(entry["empty"] for entry in manifest.values()))
+        self.assertEqual(set(prerender.ready_charts()), {name for name, _fmt, _size in prerender.DASHBOARD_CHARTS})
+
+        self.data["rainfall_by_region"] = {"labels": ["Kutch", "Surat"], "values": [12.5, 80.0]}
+        manifest = self.prerender()
+        self.assertTrue(manifest["rainfall_by_region"]["rendered"])
+        self.assertIsNotNone(manifest["rainfall_by_region"]["render_ms"])
+        self.assertTrue(manifest["avg_price_by_commodity"]["empty"])
+        ready = prerender.ready_charts()
+        self.assertTrue(ready["rainfall_by_region"]["url"].startswith("/charts/"))
+        self.assertNotIn("url", ready["avg_price_by_commodity"])
+        self.assertFalse(self.prerender()["rainfall_by_region"]["rendered"])  # unchanged data reuses the image
+
+    def test_dashboard_shows_no_data_without_rescheduling(self):
+        self.client.force_login(User.objects.create_user("staff", password="x", is_staff=True))
+        with mock.patch.object(prerender, "schedule") as schedule:
+            self.assertContains(self.client.get("/admin-dashboard/"), "Chart is being rendered", count=2)
+            schedule.assert_called_once()
+            self.prerender()
+            schedule.reset_mock()
+            response = self.client.get("/admin-dashboard/")
+        self.assertContains(response, "No data to chart yet", count=2)
+        schedule.assert_not_called()
+
+    def test_render_charts_command(self):
+        self.data["avg_price_by_commodity"] = {"labels": ["Wheat"], "values": [2150.0]}
+        out = io.StringIO()
+        with self.assertLogs("core.analytics.prerender", "INFO"):
+            call_command("render_charts", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertRegex(lines[0], r"^avg_price_by_commodity: rendered in [0-9.]+ ms$")
+        self.assertEqual(lines[1:], ["rainfall_by_region: no data to draw", "1 dashboard chart(s) ready, 1 without data"])
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        for source in ModelRegistry().bundled:
+            shutil.copy2(source, self.tmp / source.name)
+        self.registry = ModelRegistry(*(self.tmp / p.name for p in ModelRegistry().bundled),
+                                      current_path=self.tmp / "current.json")
+
+    def test_reloads_model_and_encoder_together(self):
+        import joblib
+
+        first = self.registry.get()
+        self.assertIs(self.registry.get(), first)
+        model_path, encoder_path, _lookup = self.registry.bundled
+
+        # Touched but byte-identical: the signature changes, the sha does not, nothing is reloaded
+        os.utime(model_path, ns=(1_000_000_000, 1_000_000_000))
+        touched = self.registry.get()
+        self.assertIsNot(touched, first)
+        self.assertIs(touched.model, first.model)
+        self.assertEqual(self.registry.load_count, 1)
+
+        # Only the encoder file changed: both artifacts are loaded again as one bundle
+        encoder = joblib.load(encoder_path)
+        encoder.classes_ = encoder.classes_[::-1]
+        joblib.dump(encoder, encoder_path)
+        reloaded = self.registry.get()
+        self.assertEqual(self.registry.load_count, 2)
+        self.assertIsNot(reloaded.model, first.model)
+        self.assertEqual(list(reloaded.label_encoder.classes_), list(first.label_encoder.classes_[::-1]))
+        self.assertNotEqual(reloaded.content_hash, first.content_hash)
+
+        # Publishing a version through the pointer switches to its files
+        version = self.tmp / "versions" / "v2"
+        version.mkdir(parents=True)
+        for path in self.registry.bundled:
+            shutil.copy2(path, version / path.name)
+        self.registry.current_path.write_text(json.dumps({"version": "v2", "dir": "versions/v2"}), encoding="utf-8")
+        self.assertEqual(self.registry.artifact_paths()[0], version / model_path.name)
+        published = self.registry.get()
+        self.assertEqual(published.signature[0][0], str(version / model_path.name))
+        self.assertIs(published.model, reloaded.model)  # same bytes, so no second deserialization
+
+    def test_lookup_table_matches_the_model(self):
+        table = self.registry.get_lookup()
+        self.assertIsNotNone(table)
+        bundle = self.registry.get()
+        combos = list(all_combinations())
+        X = [one_hot_row(*combo) for combo in combos]
+        self.assertEqual([table.predict(*combo) for combo in combos],
+                         [str(c) for c in bundle.label_encoder.inverse_transform(bundle.model.predict(X))])
+        proba = bundle.model.predict_proba(X)
+        classes = [str(c) for c in bundle.label_encoder.inverse_transform(bundle.model.classes_)]
+        for combo, row in zip(combos, proba):
+            got = table.predict_proba(*combo)
+            self.assertEqual(list(got), classes)
+            self.assertTrue(np.allclose(list(got.values()), row), combo)
+        self.assertIs(self.registry.get_lookup(), table)
+        self.assertEqual(self.registry.lookup_load_count, 1)
+
+    def test_stale_lookup_table_is_rejected(self):
+        lookup_path = self.registry.bundled[2]
+        payload = json.loads(lookup_path.read_text(encoding="utf-8"))
+        lookup_path.write_text(json.dumps(dict(payload, model_sha256="0" * 64)), encoding="utf-8")
+        self.assertIsNone(self.registry.get_lookup())
+        lookup_path.write_text(json.dumps(dict(payload, soil_order=["clay"])), encoding="utf-8")
+        self.assertIsNone(self.registry.get_lookup())  # built for another feature layout
+        self.assertEqual(self.registry.lookup_load_count, 0)
+        lookup_path.write_text(json.dumps(payload), encoding="utf-8")
+        self.assertIsNotNone(self.registry.get_lookup())
+
+    def test_hits_are_counted_while_a_reload_holds_the_lock(self):
+        self.registry.get()
+        hits = self.registry.hits
+        with self.registry._lock:  # as during a slow reload
+            workers = [threading.Thread(target=lambda: [self.registry.get() for _ in range(200)]) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(timeout=10)
+            self.assertFalse(any(worker.is_alive() for worker in workers))
+        self.assertEqual(self.registry.hits - hits, 800)
+        self.assertEqual(self.registry.stats()["hits"], self.registry.hits)
+
+
+class NumericModelTests(SimpleTestCase):
+    def test_compiled_forest_matches_sklearn(self):
+        from sklearn.ensemble import RandomForestClassifier
+
+        X, y = load_numeric_dataset()
+        forest = RandomForestClassifier(n_estimators=5, max_depth=8, random_state=0).fit(X[::2], y[::2])
+        compiled = compile_forest(forest, forest.classes_)
+        sample = X[1::20]
+        self.assertTrue(np.allclose([compiled.predict_proba_one(row) for row in sample],
+                                    forest.predict_proba(sample), atol=1e-6))
+        self.assertEqual([compiled.predict_one(row) for row in sample], forest.predict(sample).tolist())
+
+
+class NumericApiTests(SimpleTestCase):
+    URL = "/api/crop-recommendations/numeric/"
+    VALID = {"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82, "ph": 6.5, "rainfall": 203}
+
+    def post(self, body):
+        return self.client.post(self.URL, body if isinstance(body, str) else json.dumps(body),
+                                content_type="application/json")
+
+    def test_recommends_for_valid_readings(self):
+        response = self.post(dict(self.VALID, top_k=2))
+        self.assertEqual(response.status_code, 200)
+        crops = response.json()["crops"]
+        self.assertEqual(len(crops), 2)
+        self.assertEqual(crops[0]["crop"], "rice")
+
+    def test_rejects_bad_readings(self):
+        bad = [
+            '{"N": NaN, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82, "ph": 6.5, "rainfall": 203}',
+            dict(self.VALID, N="nan"),
+            dict(self.VALID, rainfall="inf"),
+            dict(self.VALID, rainfall="-Infinity"),
+            dict(self.VALID, ph=15),
+            dict(self.VALID, humidity=-1),
+            dict(self.VALID, K=True),
+            dict(self.VALID, P=[42]),
+            {name: v for name, v in self.VALID.items() if name != "ph"},
+            dict(self.VALID, top_k="inf"),
+            "[1, 2]",
+            "not json",
+        ]
+        for body in bad:
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+        self.assertIn('"ph" must be between 0 and 14', self.post(dict(self.VALID, ph=15)).json()["error"])
+
+
+class BatchRecommendationTests(SimpleTestCase):
+    URL = "/api/crop-recommendations/"
+    RECORDS = [
+        {"soil_type": " Clay", "season": "WINTER", "rainfall_level": "low"},
+        {"soil_type": "lava", "season": "winter", "rainfall_level": "low"},
+        {"soil_type": "sandy", "season": "summer", "rainfall_level": "high"},
+        "not a record",
+    ]
+
+    def test_encodes_like_one_hot_row_and_reports_invalid_records(self):
+        batch = encode_records(self.RECORDS)
+        self.assertEqual(batch.valid_index.tolist(), [0, 2])
+        self.assertEqual(batch.X.tolist(), [one_hot_row("clay", "winter", "low"), one_hot_row("sandy", "summer", "high")])
+        self.assertIn("invalid soil_type 'lava'", batch.errors[1])
+        self.assertEqual(sorted(batch.errors), [1, 3])
+
+    def test_scores_match_the_model(self):
+        bundle = ModelRegistry().get()
+        results = list(recommend_batch(bundle.model, bundle.label_encoder, self.RECORDS, top_k=2))
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3])
+        self.assertIn("error", results[1])
+        expected = bundle.label_encoder.inverse_transform(bundle.model.predict([one_hot_row("clay", "winter", "low")]))[0]
+        self.assertEqual(results[0]["crops"][0]["crop"], expected)
+        self.assertLessEqual(len(results[0]["crops"]), 2)
+
+    def post(self, body, key="secret", **extra):
+        if key:
+            extra["HTTP_AUTHORIZATION"] = f"Bearer {key}"
+        return self.client.post(self.URL, body if isinstance(body, str) else json.dumps(body),
+                                content_type="application/json", **extra)
+
+    @override_settings(BATCH_API_KEYS=["secret"])
+    def test_endpoint(self):
+        response = self.post({"records": self.RECORDS})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(b"".join(response.streaming_content))["results"]
+        self.assertEqual([("crops" in r, "error" in r) for r in results],
+                         [(True, False), (False, True), (True, False), (False, True)])
+
+        self.assertEqual(self.post({"records": self.RECORDS}, key=None).status_code, 401)
+        self.assertEqual(self.post({"records": self.RECORDS}, key="guess").status_code, 401)
+        # Refused from Content-Length alone, before the body is read
+        self.assertEqual(self.post({"records": self.RECORDS}, CONTENT_LENGTH=str(64 * 1024 * 1024)).status_code, 413)
+        self.assertEqual(self.post("{").status_code, 400)
+        self.assertEqual(self.post({"records": []}).status_code, 400)
+        self.assertEqual(self.post({"records": self.RECORDS, "top_k": "x"}).status_code, 400)
+
+    def test_refuses_every_request_without_configured_keys(self):
+        self.assertEqual(self.post({"records": self.RECORDS}).status_code, 401)
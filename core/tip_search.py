@@ -0,0 +1,268 @@
+"""
+Full-text search over agronomy tips.
+
+Tip titles, content, crops and seasons are mirrored into an SQLite FTS5 table
+(``core_tip_fts``, rowid = Tip id). Signal handlers (core.signals) keep it in step with
+every Tip save and delete, and ``manage.py rebuild_tip_index`` rebuilds it after bulk
+loads, which bypass signals.
+
+`search_tips()` serves the tips page:
+
+- a text query is matched through the FTS index (porter stemming, prefix terms) and
+  ranked by bm25, with title hits weighted above content hits;
+- crop and season filters are FTS column filters and category is an indexed equality,
+  so no filter turns into a ``LIKE '%..%'`` scan;
+- unranked results are newest first by id (ids follow created_at, which is set on
+  insert and not editable), so they come straight off the primary key or FTS rowid
+  order without a sort;
+- results are paged with an opaque keyset cursor, (score, id) when ranked, otherwise
+  the last id, so deep pages cost the same as the first.
+
+On databases without FTS5 the same API falls back to icontains filters.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = "core_tip_fts"
+FTS_COLUMNS = ("title", "content", "crop", "season")
+# bm25 column weights, in FTS_COLUMNS order
+WEIGHTS = (10.0, 1.0, 2.0, 2.0)
+PAGE_SIZE = 20
+MAX_TERMS = 8
+
+_HIT_START, _HIT_END = "\x02", "\x03"
+_available: Optional[bool] = None
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TipPage:
+    tips: list  # Tip instances; ranked results carry a .snippet with <mark>ed hits
+    next_cursor: Optional[str]
+    ranked: bool
+
+
+# -- index maintenance --------------------------------------------------------------------
+
+def fts_available() -> bool:
+    """Whether the FTS table exists (SQLite built with FTS5 and migrations applied)."""
+    global _available
+    if _available is None:
+        if connection.vendor != "sqlite":
+            _available = False
+        else:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                    _available = cursor.fetchone() is not None
+            except DatabaseError:
+                _available = False
+    return _available
+
+
+def reset_availability() -> None:
+    global _available
+    _available = None
+
+
+def create_index(schema_editor=None) -> bool:
+    """Create and fill the FTS table. Returns False when SQLite lacks FTS5."""
+    conn = schema_editor.connection if schema_editor is not None else connection
+    if conn.vendor != "sqlite":
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(FTS_COLUMNS)}, tokenize = 'porter unicode61 remove_diacritics 2')"
+            )
+    except DatabaseError:
+        return False
+    rebuild_index(conn)
+    reset_availability()
+    return True
+
+
+def drop_index(schema_editor=None) -> None:
+    conn = schema_editor.connection if schema_editor is not None else connection
+    if conn.vendor == "sqlite":
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    reset_availability()
+
+
+def rebuild_index(conn=None) -> int:
+    """Re-index every tip from core_tip. Returns the number of rows indexed."""
+    conn = conn or connection
+    columns = ", ".join(FTS_COLUMNS)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM core_tip")
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def index_tip(tip) -> None:
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [tip.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [tip.pk] + [getattr(tip, c) or "" for c in FTS_COLUMNS],
+        )
+
+
+def unindex_tip(pk: int) -> None:
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+# -- queries ------------------------------------------------------------------------------
+
+def terms(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower())[:MAX_TERMS]
+
+
+def match_expression(q: str = "", crop: str = "", season: str = "") -> str:
+    """FTS5 MATCH string; every user term is quoted (no query-syntax injection) and prefix-matched."""
+    def phrase(words: Sequence[str]) -> str:
+        return " AND ".join(f'"{w}"*' for w in words)
+
+    parts = []
+    if terms(q):
+        parts.append(f"({phrase(terms(q))})")
+    for column, value in (("crop", crop), ("season", season)):
+        if terms(value):
+            parts.append(f"{column} : ({phrase(terms(value))})")
+    return " AND ".join(parts)
+
+
+def _encode(values: Tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed page cursor") from None
+    if (not isinstance(values, list) or len(values) != 2 or not isinstance(values[1], int)
+            or not isinstance(values[0], (int, float, type(None)))):
+        raise InvalidCursor("Malformed page cursor")
+    return values
+
+
+def _highlight(snippet: str) -> str:
+    return mark_safe(escape(snippet).replace(_HIT_START, "<mark>").replace(_HIT_END, "</mark>"))
+
+
+def _fts_page(expr: str, category: str, ranked: bool, after: Optional[list], limit: int):
+    from .models import Tip
+
+    score = f"bm25({FTS_TABLE}, {', '.join(map(str, WEIGHTS))})"
+    where = [f"{FTS_TABLE} MATCH %s"]
+    params: list = [expr]
+    if category:
+        where.append("t.category = %s")
+        params.append(category)
+    if ranked:
+        order = f"{score}, t.id"
+        if after is not None:
+            if after[0] is None:
+                raise InvalidCursor("Cursor does not belong to a ranked search")
+            where.append(f"({score} > %s OR ({score} = %s AND t.id > %s))")
+            params += [float(after[0]), float(after[0]), int(after[1])]
+    else:
+        order = f"{FTS_TABLE}.rowid DESC"
+        if after is not None:
+            where.append(f"{FTS_TABLE}.rowid < %s")
+            params.append(int(after[1]))
+    sql = (
+        f"SELECT t.id, {score}, "
+        f"snippet({FTS_TABLE}, 1, char(2), char(3), '…', 24) "
+        f"FROM {FTS_TABLE} JOIN core_tip t ON t.id = {FTS_TABLE}.rowid "
+        f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit + 1])
+        rows = cursor.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    by_id = Tip.objects.in_bulk([r[0] for r in rows])
+    tips = []
+    for tip_id, rank, snippet in rows:
+        tip = by_id[tip_id]
+        tip.snippet = _highlight(snippet) if ranked else None
+        tips.append(tip)
+    last = None
+    if more and rows:
+        tip_id, rank, _snippet = rows[-1]
+        last = _encode((rank if ranked else None, tip_id))
+    return tips, last
+
+
+def _orm_page(q: str, category: str, crop: str, season: str, after: Optional[list], limit: int):
+    from .models import Tip
+
+    qs = Tip.objects.all()
+    if category:
+        qs = qs.filter(category=category)
+    # Only used without FTS5: plain substring filters
+    if q:
+        qs = qs.filter(Q(title__icontains=q) | Q(content__icontains=q))
+    if crop:
+        qs = qs.filter(crop__icontains=crop)
+    if season:
+        qs = qs.filter(season__icontains=season)
+    if after is not None:
+        qs = qs.filter(id__lt=after[1])
+    tips = list(qs.order_by("-id")[:limit + 1])
+    more = len(tips) > limit
+    tips = tips[:limit]
+    for tip in tips:
+        tip.snippet = None
+    last = _encode((None, tips[-1].pk)) if more and tips else None
+    return tips, last
+
+
+def search_tips(
+    q: str = "",
+    category: str = "",
+    crop: str = "",
+    season: str = "",
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> TipPage:
+    """
+    One page of tips. With a text query results are ordered by relevance, otherwise newest
+    first. Pass the returned next_cursor back to get the following page.
+    """
+    after = _decode(cursor) if cursor else None
+    expr = match_expression(q, crop, season)
+    ranked = bool(terms(q))
+    if expr and fts_available():
+        tips, last = _fts_page(expr, category, ranked, after, limit)
+        return TipPage(tips, last, ranked)
+    if not expr and (q or crop or season):
+        # Only punctuation typed: nothing can match
+        return TipPage([], None, False)
+    tips, last = _orm_page(q, category, crop, season, after, limit)
+    return TipPage(tips, last, False)
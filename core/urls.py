@@ -4,9 +4,16 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('crop-suggestion/', views.crop_suggestion, name='crop_suggestion'),
+    path('api/crop-recommendations/', views.crop_recommendations_api, name='crop_recommendations_api'),
+    path('api/crop-recommendations/numeric/', views.numeric_recommendation_api, name='numeric_recommendation_api'),
     path('market-data/', views.market_data, name='market_data'),
+    path('tips/', views.tips, name='tips'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/jobs/<int:job_id>/', views.training_job_status, name='training_job_status'),
     path('admin-dashboard/download-insights.csv', views.download_insights_csv, name='download_insights_csv'),
+    path('api/analytics/<slug:dataset>/', views.analytics_api, name='analytics_api'),
+    path('charts/<slug:name>/', views.named_chart, name='named_chart'),
+    path('charts/<str:key>.<str:fmt>', views.chart_image, name='chart_image'),
     path('contact/', views.contact, name='contact'),
     path('schemes/', views.schemes, name='schemes'),
 ]
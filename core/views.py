@@ -1,76 +1,68 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.conf import settings
 from django.contrib import messages
 from .forms import CropRecommendationForm, ContactMessageForm
-from django.db.models import Q
+from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.admin.views.decorators import staff_member_required
 import os
-import io
-import base64
-# matplotlib is used elsewhere in analytics; import pyplot for ad-hoc chart
-from matplotlib import pyplot as plt  # type: ignore
-# Scrapers for Phase 3
-from .scrapers.prices import get_crop_prices
-from .scrapers.rainfall import get_rainfall
-from .scrapers.schemes import get_schemes
+import datetime
+import hmac
+# Scrapers for Phase 3. The market-data scrapers (pandas, httpx) are imported inside
+# market_data, so loading the URLconf stays cheap: see core/importtime.py.
+from .scrapers.schemes import astored_schemes
 # Analytics for Phase 4
-from .analytics.charts import build_from_dataset
-from django.http import HttpResponse
-from .ml import train_model
-
+from .analytics.charts import CONTENT_TYPES as CHART_CONTENT_TYPES
+from .analytics.chart_cache import chart_path, is_stored, store
+from .analytics.registry import charts
+from .analytics import prerender
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST
+import json
+from asgiref.sync import sync_to_async
+from concurrent.futures.process import BrokenProcessPool
+from . import page_cache, telemetry
+from .offload import run_cpu, wrap
+from .jobs import active_job, enqueue_retrain
+from .ml.ingest import MODE_APPEND, MODE_REPLACE, DatasetValidationError, ingest_dataset
+from .models import TrainingJob
+from .ml.features import one_hot_row
+from .ml.registry import registry as model_registry
+
+@page_cache.cached_page()
 def home(request):
     return render(request, 'pages/home.html')
 
 def crop_suggestion(request):
     form = CropRecommendationForm(request.POST or None)
 
-    model_path = os.path.join(settings.BASE_DIR, 'core', 'ml', 'crop_model.joblib')
-    label_path = os.path.join(settings.BASE_DIR, 'core', 'ml', 'label_encoder.joblib')
-
     prediction = None
     recommended_crops = None
-    model_loaded = os.path.exists(model_path) and os.path.exists(label_path)
+    model_loaded = model_registry.available()
 
     if request.method == 'POST' and form.is_valid():
         if not model_loaded:
             messages.error(request, 'Model not found. Please run the training script to generate the model.')
         else:
+            soil = form.cleaned_data['soil_type']
+            season = form.cleaned_data['season']
+            rainfall = form.cleaned_data['rainfall_level']
             try:
-                import joblib  # type: ignore
+                # Fast path: precomputed table written alongside the model by train_and_save
+                table = model_registry.get_lookup()
+                if table is not None:
+                    prediction = table.predict(soil, season, rainfall)
+                else:
+                    bundle = model_registry.get()
+                    if bundle is None:
+                        raise FileNotFoundError('model artifacts disappeared')
+                    y_pred = bundle.model.predict([one_hot_row(soil, season, rainfall)])[0]
+                    prediction = bundle.label_encoder.inverse_transform([y_pred])[0]
+                recommended_crops = [prediction]
+                telemetry.record('suggestion', crop=str(prediction), detail=f'{soil}/{season}/{rainfall}')
             except Exception as exc:
-                messages.error(request, f'Prediction dependencies missing: {exc}')
-            else:
-                try:
-                    model = joblib.load(model_path)
-                    label_encoder = joblib.load(label_path)
-
-                    soil = form.cleaned_data['soil_type']
-                    season = form.cleaned_data['season']
-                    rainfall = form.cleaned_data['rainfall_level']
-
-                    # One-hot encoding must match training pipeline. Training script will define order
-                    # Here we recreate feature vector in the same order as training
-                    categorical_orders = {
-                        'soil_type': ['clay', 'sandy', 'loamy', 'silt', 'peat', 'chalk'],
-                        'season': ['winter', 'summer', 'monsoon'],
-                        'rainfall_level': ['low', 'medium', 'high'],
-                    }
-
-                    features = []
-                    for value, allowed in [
-                        (soil, categorical_orders['soil_type']),
-                        (season, categorical_orders['season']),
-                        (rainfall, categorical_orders['rainfall_level']),
-                    ]:
-                        for category in allowed:
-                            features.append(1 if value == category else 0)
-
-                    y_pred = model.predict([features])[0]
-                    prediction = label_encoder.inverse_transform([y_pred])[0]
-                    recommended_crops = [prediction]
-                except Exception as exc:
-                    messages.error(request, f'Prediction failed: {exc}')
+                messages.error(request, f'Prediction failed: {exc}')
 
     context = {
         'form': form,
@@ -80,68 +72,281 @@ def crop_suggestion(request):
     }
     return render(request, 'pages/crop_suggestion.html', context)    
 
-def market_data(request):
+BATCH_MAX_RECORDS = 100_000
+# Batch bodies exceed DATA_UPLOAD_MAX_MEMORY_SIZE by design; this is their own cap
+BATCH_MAX_BYTES = getattr(settings, 'BATCH_MAX_BYTES', 16 * 1024 * 1024)
+
+
+def _api_key_ok(request) -> bool:
+    """Authorization: Bearer <key>, for a key listed in settings.BATCH_API_KEYS."""
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not key.strip():
+        return False
+    return any(hmac.compare_digest(key.strip().encode(), str(k).encode())
+               for k in getattr(settings, 'BATCH_API_KEYS', ()))
+
+
+@csrf_exempt
+@require_POST
+def crop_recommendations_api(request):
+    """
+    Batch JSON endpoint for bulk recommendations, for API clients holding a key from
+    settings.BATCH_API_KEYS (no keys configured: the endpoint refuses every request).
+    Cookies do not authenticate it, hence no CSRF check.
+
+    Body: {"records": [{"soil_type": ..., "season": ..., "rainfall_level": ...}, ...], "top_k": 3}
+    Response (streamed): {"results": [{"index": 0, "crops": [{"crop": ..., "score": ...}]}, ...]}
+    """
+    if not _api_key_ok(request):
+        response = JsonResponse({'error': 'A valid API key is required (Authorization: Bearer <key>).'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length <= 0:
+        return JsonResponse({'error': 'Content-Length is required.'}, status=411)
+    if length > BATCH_MAX_BYTES:
+        return JsonResponse({'error': f'Request body is larger than {BATCH_MAX_BYTES} bytes.'}, status=413)
+    try:
+        # The stream stops at Content-Length, now known to be within BATCH_MAX_BYTES
+        payload = json.load(request)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be valid JSON.'}, status=400)
+    records = payload.get('records') if isinstance(payload, dict) else None
+    if not isinstance(records, list) or not records:
+        return JsonResponse({'error': '"records" must be a non-empty list.'}, status=400)
+    if len(records) > BATCH_MAX_RECORDS:
+        return JsonResponse({'error': f'At most {BATCH_MAX_RECORDS} records per request.'}, status=413)
+    try:
+        top_k = int(payload.get('top_k', 3))
+    except (TypeError, ValueError, OverflowError):
+        return JsonResponse({'error': '"top_k" must be an integer.'}, status=400)
+
+    bundle = model_registry.get()
+    if bundle is None:
+        return JsonResponse({'error': 'Model not found. Please run the training script.'}, status=503)
+
+    from .ml.batch import recommend_batch
+    # Scores every record before the first byte is sent: a failure is a 500, not a truncated 200
+    results = recommend_batch(bundle.model, bundle.label_encoder, records, top_k=top_k)
+
+    def stream():
+        yield '{"results": ['
+        sep = ''
+        buf = []
+        for i, item in enumerate(results, 1):
+            buf.append(sep + json.dumps(item))
+            sep = ','
+            if i % 1000 == 0:
+                yield ''.join(buf)
+                buf = []
+        yield ''.join(buf) + ']}'
+
+    return StreamingHttpResponse(stream(), content_type='application/json')
+
+@csrf_exempt
+@require_POST
+async def numeric_recommendation_api(request):
+    """
+    Single-plot recommendation from soil nutrients and weather readings.
+
+    Body: {"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82, "ph": 6.5, "rainfall": 203, "top_k": 3}
+    """
+    from .ml.numeric_model import NUMERIC_FEATURES, get_numeric_model, parse_inputs
+
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': f'Body must be a JSON object with numeric fields: {", ".join(NUMERIC_FEATURES)}.'}, status=400)
+    try:
+        x = parse_inputs(payload)
+    except ValueError as exc:
+        return JsonResponse({'error': f'{exc}.'}, status=400)
+    try:
+        top_k = int(payload.get('top_k', 3))
+    except (TypeError, ValueError, OverflowError):
+        return JsonResponse({'error': '"top_k" must be an integer.'}, status=400)
+
+    # Loading the artifact and walking the forest are CPU work: keep them off the event loop
+    model = await run_cpu(get_numeric_model)
+    if model is None:
+        return JsonResponse({'error': 'Numeric model not found. Please run core/ml/numeric_model.py.'}, status=503)
+    crops = [{'crop': crop, 'score': round(score, 6)} for crop, score in await run_cpu(model.top_k, x, max(1, top_k))]
+    return JsonResponse({'crops': crops})
+
+
+MARKET_PAGE_SIZE = 50
+
+
+def _record_market_query(request):
+    region = (request.GET.get('region') or '').strip()
+    price_q = (request.GET.get('price') or '').strip()
+    # Count each search once, not again for every page of its results
+    if (region or price_q) and not (request.GET.get('price_page') or request.GET.get('rain_page')):
+        telemetry.record('market', region=region, detail=price_q)
+
+
+async def _page_of(qs, number, to_rows):
+    """Paginator page of a values() queryset, counted and sliced through the async ORM."""
+    paginator = Paginator(range(await qs.acount()), MARKET_PAGE_SIZE)
+    page = paginator.get_page(number)
+    window = qs[page.start_index() - 1:page.end_index()] if paginator.count else qs.none()
+    page.object_list = to_rows([row async for row in window])
+    return page
+
+
+def _list_page(rows, number):
+    return Paginator(rows, MARKET_PAGE_SIZE).get_page(number)
+
+
+@page_cache.cached_page('prices', 'rainfall', on_hit=_record_market_query,
+                        params=('region', 'price', 'state', 'from', 'to', 'price_page', 'rain_page'))
+async def market_data(request):
+    """
+    Async: its only waits are the database, local files and (when nothing is stored) the
+    web fallbacks, so under ASGI a slow upstream holds no worker thread. pandas and index
+    searches run on the offload pool.
+    """
+    from .scrapers import ingest as price_store
+    from .scrapers.market import aget_market_data
+    from .scrapers.prices import aprice_queryset, get_price_index, price_rows
+    from .scrapers.rainfall import arainfall_queryset, get_rainfall_index, rainfall_rows
+
     # Filters: region (for rainfall), price (for crop prices)
     region = (request.GET.get('region') or '').strip()
     price_q = (request.GET.get('price') or '').strip()
-    prices = []
-    rainfall = []
+    # Ingested multi-state prices (manage.py ingest_prices) can also be narrowed by state and dates
+    state = (request.GET.get('state') or '').strip()
+    date_from = (request.GET.get('from') or '').strip()
+    date_to = (request.GET.get('to') or '').strip()
+    start = end = None
+    try:
+        start = datetime.date.fromisoformat(date_from) if date_from else None
+        end = datetime.date.fromisoformat(date_to) if date_to else None
+    except ValueError:
+        messages.error(request, "Dates must be in YYYY-MM-DD format.")
+        date_from = date_to = ''
+        start = end = None
+
+    def _norm(val: object) -> str:
+        return str(val or '').strip().lower()
+
+    _record_market_query(request)
+
+    # Each dataset is filtered in SQL when it was loaded into the DB, else searched through the
+    # prebuilt trigram index over its CSV, else taken from the web/sample fallback. Fallbacks
+    # for both datasets are fetched together, so the page waits for the slower one only.
+    stored = await run_cpu(price_store.manifest)
+    price_frame = price_qs = price_index = rainfall_qs = rainfall_index = None
     try:
-        # Fetch all prices first; we'll apply precise filtering below
-        prices = get_crop_prices(region=None)
+        if stored.get('rows'):
+            price_frame = await run_cpu(price_store.search_prices, state or None, start, end, query=price_q)
+        else:
+            price_qs = await aprice_queryset(query=price_q)
+            price_index = await run_cpu(get_price_index) if price_qs is None else None
     except Exception as exc:
         messages.error(request, f"Failed to fetch prices: {exc}")
     try:
-        rainfall = get_rainfall(region=region or None)
+        rainfall_qs = await arainfall_queryset(query=region)
+        rainfall_index = await run_cpu(get_rainfall_index) if rainfall_qs is None else None
     except Exception as exc:
         messages.error(request, f"Failed to fetch rainfall: {exc}")
 
-    # Extra robust filtering on server side to ensure UI filter always works
-    def _norm(val: object) -> str:
-        return str(val or '').strip().lower()
+    fallback_names = []
+    if price_frame is None and price_qs is None and price_index is None:
+        fallback_names.append('prices')
+    if rainfall_qs is None and rainfall_index is None:
+        fallback_names.append('rainfall')
+    fallback = {}
+    if fallback_names:
+        try:
+            fallback = await aget_market_data(region=region or None, names=fallback_names)
+        except Exception as exc:
+            messages.error(request, f"Failed to fetch market data: {exc}")
+
+    prices_page = None
+    price_number = request.GET.get('price_page')
+    try:
+        if price_frame is not None:
+            prices_page = _list_page(price_store.FrameRows(price_frame), price_number)
+        elif price_qs is not None:
+            prices_page = await _page_of(price_qs, price_number, price_rows)
+        elif price_index is not None:
+            prices_page = _list_page(await run_cpu(price_index.search, price_q), price_number)
+            prices_page.object_list = price_index.rows(prices_page.object_list)
+        else:
+            prices = fallback.get('prices', [])
+            if price_q:
+                qp = _norm(price_q)
+                prices = [
+                    p for p in prices
+                    if qp in _norm(p.get('market')) or qp in _norm(p.get('commodity')) or qp in _norm(p.get('variety'))
+                ]
+            prices_page = _list_page(prices, price_number)
+    except Exception as exc:
+        messages.error(request, f"Failed to fetch prices: {exc}")
 
-    # Apply dedicated filters
-    if price_q:
-        qp = _norm(price_q)
-        prices = [
-            p for p in prices
-            if qp in _norm(p.get('market')) or qp in _norm(p.get('commodity')) or qp in _norm(p.get('variety'))
-        ]
-    if region:
-        qr = _norm(region)
-        rainfall = [
-            r for r in rainfall
-            if qr in _norm(r.get('region')) or qr in _norm(r.get('period'))
-        ]
+    rainfall_page = None
+    rain_number = request.GET.get('rain_page')
+    try:
+        if rainfall_qs is not None:
+            rainfall_page = await _page_of(rainfall_qs, rain_number, rainfall_rows)
+        elif rainfall_index is not None:
+            rainfall_page = _list_page(await run_cpu(rainfall_index.search, region), rain_number)
+            rainfall_page.object_list = rainfall_index.rows(rainfall_page.object_list)
+        else:
+            rainfall = fallback.get('rainfall', [])
+            if region:
+                qr = _norm(region)
+                rainfall = [
+                    r for r in rainfall
+                    if qr in _norm(r.get('region')) or qr in _norm(r.get('period'))
+                ]
+            rainfall_page = _list_page(rainfall, rain_number)
+    except Exception as exc:
+        messages.error(request, f"Failed to fetch rainfall: {exc}")
 
     context = {
         'region': region,
         'price': price_q,
-        'prices': prices,
-        'rainfall': rainfall,
+        'state': state,
+        'date_from': date_from,
+        'date_to': date_to,
+        'price_states': stored.get('states', {}),
+        'price_span': (stored.get('first_date'), stored.get('last_date')) if stored.get('rows') else None,
+        'prices': prices_page.object_list if prices_page else [],
+        'prices_page': prices_page,
+        'rainfall': rainfall_page.object_list if rainfall_page else [],
+        'rainfall_page': rainfall_page,
     }
     return render(request, 'pages/market_data.html', context)
 
+@page_cache.cached_page('tips', params=('q', 'category', 'crop', 'season', 'after'))
 def tips(request):
     from .models import Tip
-    qs = Tip.objects.all()
+    from .tip_search import InvalidCursor, search_tips
 
     q = request.GET.get('q', '').strip()
     category = request.GET.get('category', '').strip()
     crop = request.GET.get('crop', '').strip()
     season = request.GET.get('season', '').strip()
+    cursor = request.GET.get('after', '').strip() or None
 
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(content__icontains=q))
-    if category:
-        qs = qs.filter(category=category)
-    if crop:
-        qs = qs.filter(crop__icontains=crop)
-    if season:
-        qs = qs.filter(season__icontains=season)
+    # Ranked full-text search with keyset paging (see core/tip_search.py)
+    try:
+        page = search_tips(q=q, category=category, crop=crop, season=season, cursor=cursor)
+    except InvalidCursor:
+        page = search_tips(q=q, category=category, crop=crop, season=season)
 
     context = {
-        'tips': qs[:100],  # simple cap
+        'tips': page.tips,
+        'next_cursor': page.next_cursor,
+        'ranked': page.ranked,
+        'paged': bool(cursor),
         'q': q,
         'category': category,
         'crop': crop,
@@ -162,145 +367,115 @@ def admin_dashboard(request):
         action = request.POST.get('action')
         if action == 'upload_dataset':
             file = request.FILES.get('dataset')
+            mode = request.POST.get('mode') or MODE_APPEND
             if not file:
                 messages.error(request, 'Please choose a CSV file to upload.')
             else:
                 try:
-                    # Save uploaded file to dataset path
-                    with open(dataset_csv, 'wb+') as dest:
-                        for chunk in file.chunks():
-                            dest.write(chunk)
-                    messages.success(request, 'Dataset uploaded successfully.')
+                    result = ingest_dataset(file.chunks(), dataset_csv, mode=mode)
+                except DatasetValidationError as exc:
+                    messages.error(request, f'Dataset rejected: {exc}')
                 except Exception as exc:
                     messages.error(request, f'Failed to save dataset: {exc}')
+                else:
+                    verb = 'replaced the dataset with' if result.mode == MODE_REPLACE else 'appended'
+                    messages.success(request, f'Upload {verb} {result.accepted} rows ({result.rejected} rejected).')
+                    if result.errors:
+                        messages.warning(request, 'Rejected rows: ' + '; '.join(result.errors))
+                    prerender.schedule('dataset upload')
+                    page_cache.invalidate()
         elif action == 'retrain_model':
             try:
-                train_model.train_and_save()
-                messages.success(request, 'Model retrained and saved successfully.')
+                job, created = enqueue_retrain()
+                if created:
+                    messages.success(request, f'Retraining started in the background (job #{job.pk}).')
+                else:
+                    messages.info(request, f'Retraining job #{job.pk} is already {job.status}.')
             except Exception as exc:
-                messages.error(request, f'Failed to retrain model: {exc}')
+                messages.error(request, f'Failed to start retraining: {exc}')
+
+    # Charts are drawn off-request by the pre-render pool; the page only links to
+    # images that are already on disk and queues a render for any that are missing
+    ready = prerender.ready_charts()
+    if any(name not in ready for name, _fmt, _size in prerender.DASHBOARD_CHARTS):
+        prerender.schedule('dashboard view')
+    ctx = {
+        'rainfall_chart': ready.get('rainfall_by_region'),
+        'prices_chart': ready.get('avg_price_by_commodity'),
+    }
+    ctx['model_stats'] = model_registry.stats()
+    ctx['training_jobs'] = list(TrainingJob.objects.all()[:5])
+    ctx['active_job'] = active_job()
 
-    # Build pie chart using existing analytics (if available)
-    try:
-        charts = build_from_dataset(dataset_csv_path=dataset_csv)
-        ctx = {
-            'pie_b64': charts.pie_region_queries_b64,
-        }
-    except Exception as exc:
-        messages.error(request, f"Failed to build charts: {exc}")
-        ctx = {}
+    return render(request, 'pages/admin_dashboard.html', ctx)
 
-    # Region vs Rainfall chart from Gujarat rainfall CSV used in market-data
-    try:
-        rainfall_items = get_rainfall(region=None)
-        # Convert rainfall to numeric and aggregate by region (latest values dominate if duplicates)
-        from collections import defaultdict
-        by_region = defaultdict(float)
-
-        def to_number(text: str) -> float:
-            s = ''.join(ch for ch in str(text) if (ch.isdigit() or ch == '.' or ch == ','))
-            s = s.replace(',', '')
-            try:
-                return float(s)
-            except Exception:
-                return 0.0
-
-        for row in rainfall_items:
-            region_name = str(row.get('region', '')).strip() or 'Unknown'
-            mm = to_number(row.get('rainfall_mm', '0'))
-            # Keep the max rainfall per region to reflect peak reading
-            if mm > by_region[region_name]:
-                by_region[region_name] = mm
-
-        items = list(by_region.items())
-        # Sort by rainfall desc and take top 8
-        items.sort(key=lambda x: x[1], reverse=True)
-        top = items[:8]
-
-        rainfall_bar_b64 = None
-        if top:
-            labels = [t[0] for t in top]
-            values = [t[1] for t in top]
-            x = list(range(len(labels)))
-            plt.figure(figsize=(6, 3))
-            # Scatter points
-            plt.scatter(x, values, color='#6FB3D1', s=60, edgecolors='#2563EB', linewidths=0.6)
-            # Connect the dots with a line
-            plt.plot(x, values, color='#2563EB', linewidth=1.2, alpha=0.7)
-            plt.ylabel('Rainfall (mm)')
-            plt.xticks(x, labels, rotation=20, ha='right', fontsize=9)
-            plt.grid(True, which='both', axis='both', linestyle='--', alpha=0.3)
-            plt.tight_layout()
-            # no per-point annotations
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=160)
-            plt.close()
-            buf.seek(0)
-            rainfall_bar_b64 = base64.b64encode(buf.read()).decode('ascii')
-
-        ctx.update({'rainfall_bar_b64': rainfall_bar_b64})
-    except Exception as exc:
-        messages.error(request, f"Failed to build rainfall chart: {exc}")
+@staff_member_required
+def training_job_status(request, job_id: int):
+    job = get_object_or_404(TrainingJob, pk=job_id)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'progress': job.progress,
+        'stage': job.stage,
+        'version': job.version,
+        'accuracy': job.accuracy,
+        'rows': job.rows,
+        'error': job.error,
+        'duration_seconds': job.duration_seconds,
+    })
+
+def _serve_chart_file(path, fmt: str, cache_control: str):
+    response = FileResponse(open(path, 'rb'), content_type=CHART_CONTENT_TYPES[fmt])
+    response['Cache-Control'] = cache_control
+    return response
 
-    # Commodity vs Price chart + prices table from Gujarat prices CSV
+
+def _chart_mtime(path):
+    return datetime.datetime.fromtimestamp(path.stat().st_mtime, tz=datetime.timezone.utc)
+
+
+def chart_image(request, key: str, fmt: str):
+    path = chart_path(key, fmt)
+    if path is None or not path.exists():
+        raise Http404('Chart not found')
+
+    @condition(etag_func=lambda r: key, last_modified_func=lambda r: _chart_mtime(path))
+    def serve(request):
+        # Content-addressed: the bytes behind a key never change
+        return _serve_chart_file(path, fmt, 'public, max-age=31536000, immutable')
+    return serve(request)
+
+
+async def named_chart(request, name: str):
+    """Render (or reuse) one registered chart on demand: /charts/<name>/?format=svg&size=lg"""
+    fmt = request.GET.get('format', 'png')
+    size = request.GET.get('size', 'md')
     try:
-        prices = get_crop_prices(region=None)
-        # Normalize and compute average price per commodity
-        from collections import defaultdict
-        sums = defaultdict(float)
-        counts = defaultdict(int)
-
-        def to_number(text: str) -> float:
-            s = ''.join(ch for ch in str(text) if (ch.isdigit() or ch == '.' or ch == ','))
-            s = s.replace(',', '')
-            try:
-                return float(s)
-            except Exception:
-                return 0.0
-
-        for row in prices:
-            commodity = str(row.get('commodity', '')).strip() or 'Unknown'
-            price_val = to_number(row.get('price', '0'))
-            if price_val > 0:
-                sums[commodity] += price_val
-                counts[commodity] += 1
-
-        # Prepare data for plotting (top N commodities by avg price)
-        avg_items = [
-            (k, (sums[k] / counts[k]) if counts[k] else 0.0)
-            for k in sums.keys()
-        ]
-        # Sort by average price desc and take top 8 for readability
-        avg_items.sort(key=lambda x: x[1], reverse=True)
-        top = avg_items[:8]
-
-        prices_bar_b64 = None
-        if top:
-            labels = [t[0] for t in top]
-            values = [t[1] for t in top]
-            plt.figure(figsize=(6, 3))
-            bars = plt.bar(labels, values, color='#6FAF6F')
-            plt.ylabel('Avg Price (₹/quintal)')
-            plt.xticks(rotation=20, ha='right', fontsize=9)
-            plt.tight_layout()
-            # Add value labels on bars
-            for b in bars:
-                h = b.get_height()
-                plt.text(b.get_x() + b.get_width()/2, h, f"{h:.0f}", ha='center', va='bottom', fontsize=8)
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=160)
-            plt.close()
-            buf.seek(0)
-            prices_bar_b64 = base64.b64encode(buf.read()).decode('ascii')
-
-        # Update context with the bar chart only (table removed from UI)
-        ctx.update({
-            'prices_bar_b64': prices_bar_b64,
-        })
-    except Exception as exc:
-        messages.error(request, f"Failed to build prices chart/table: {exc}")
+        # Chart loaders read the ORM and pandas aggregates; drawing goes to the render pool
+        plan = await sync_to_async(charts.plan)(name, fmt=fmt, size=size)
+    except KeyError:
+        raise Http404('Unknown chart')
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type='text/plain')
+    if plan is None:
+        raise Http404('No data for this chart')
+    key = plan.key
+    if not is_stored(key, fmt):
+        try:
+            image, _render_ms = await wrap(prerender.submit(plan))
+        except BrokenProcessPool:
+            # The worker died mid-draw; the next submit() starts a fresh pool. Draw this one here.
+            key = await sync_to_async(charts.image_key)(name, fmt=fmt, size=size)
+        else:
+            store(key, image, fmt)
+    path = chart_path(key, fmt)
+
+    @condition(etag_func=lambda r: key, last_modified_func=lambda r: _chart_mtime(path))
+    def serve(request):
+        # The data behind a name changes over time; let clients revalidate with the ETag
+        return _serve_chart_file(path, fmt, 'public, max-age=300')
+    return serve(request)
 
-    return render(request, 'pages/admin_dashboard.html', ctx)
 
 def contact(request):
     form = ContactMessageForm(request.POST or None)
@@ -316,34 +491,62 @@ def contact(request):
         'suppress_global_messages': True,
     })
 
-def schemes(request):
-    items = []
+@page_cache.cached_page('schemes')
+async def schemes(request):
+    # Served from the stored snapshot; a stale or missing one is refreshed in the background
+    items, refreshed_at = [], None
     try:
-        items = get_schemes(limit=15)
+        items, refreshed_at = await astored_schemes(limit=15)
     except Exception as exc:
         messages.error(request, f"Failed to fetch schemes/news: {exc}")
-    return render(request, 'pages/schemes.html', { 'items': items })
+    return render(request, 'pages/schemes.html', { 'items': items, 'refreshed_at': refreshed_at })
+
+# report name -> (dataset, group_by, agg, CSV header)
+INSIGHT_REPORTS = {
+    'crops': ('crops', 'crop', 'count', ['Crop', 'Count']),
+    'prices': ('prices', 'commodity', 'mean', ['Commodity', 'Avg Price (₹/quintal)']),
+    'rainfall': ('rainfall', 'region', 'max', ['Region', 'Max Rainfall (mm)']),
+}
+
 
 def download_insights_csv(request):
-    """Provide a simple CSV of crop frequency (from dataset) as a downloadable file."""
+    """Download an aggregate as CSV: ?report=crops (default, crop frequency), prices or rainfall."""
     import csv
-    dataset_csv = os.path.join(settings.BASE_DIR, 'core', 'ml', 'data', 'crop_dataset.csv')
-    # Read counts
-    try:
-        import pandas as pd
-        df = pd.read_csv(dataset_csv)
-        counts = df['crop'].astype(str).str.strip().str.title().value_counts()
-    except Exception:
-        counts = {'Wheat': 2, 'Rice': 2, 'Maize': 1}
+    from .analytics import aggregates
+    report = request.GET.get('report', 'crops')
+    if report not in INSIGHT_REPORTS:
+        raise Http404('Unknown report')
+    dataset, group_by, agg, header = INSIGHT_REPORTS[report]
+    result = aggregates.rollup(dataset, group_by, agg=agg)
 
     response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="insights_crops.csv"'
+    response['Content-Disposition'] = f'attachment; filename="insights_{report}.csv"'
     writer = csv.writer(response)
-    writer.writerow(['Crop', 'Count'])
-    if hasattr(counts, 'items'):
-        items = counts.items()
-    else:
-        items = counts.to_dict().items()
-    for crop, count in items:
-        writer.writerow([crop, count])
+    writer.writerow(header)
+    for label, value in zip(result.labels, result.values):
+        writer.writerow([label, value if agg == 'count' else round(value, 2)])
     return response
+
+
+def analytics_api(request, dataset: str):
+    """
+    JSON aggregates: /api/analytics/<dataset>/?group_by=commodity&agg=mean&top=5&days=30
+    or a time series with ?timeline=day|week|month.
+    """
+    from .analytics import aggregates
+    ds = aggregates.DATASETS.get(dataset)
+    if ds is None:
+        return JsonResponse({'error': f'Unknown dataset {dataset!r}'}, status=404)
+    params = request.GET
+    agg = params.get('agg') or ('mean' if ds.value else 'count')
+    try:
+        top = int(params['top']) if params.get('top') else None
+        days = int(params['days']) if params.get('days') else None
+        if params.get('timeline'):
+            result = aggregates.timeline(dataset, freq=params['timeline'], agg=agg, days=days)
+        else:
+            result = aggregates.rollup(dataset, params.get('group_by') or ds.groups[0], agg=agg,
+                                       top=top, days=days, ascending=params.get('order') == 'asc')
+    except (aggregates.AggregationError, ValueError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result.as_dict())